@@ -0,0 +1,42 @@
+"""Access checks for the HTTP services' admin and directory routes.
+
+The orchestrator and the MCP server listen on every interface, and the
+orchestrator allows any CORS origin, so routes that expose profile data,
+node addresses or operational controls check the caller first. When a token
+is configured, the request must carry it in the route's header. Without a
+token, only clients on this host are served.
+
+Environment:
+    ADMIN_TOKEN   required in the X-Admin-Token header on /admin/* routes
+"""
+import hmac
+import os
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+ADMIN_PATH_PREFIX = "/admin"
+LOCAL_CLIENT_HOSTS = {"127.0.0.1", "::1"}
+
+
+def client_allowed(request, token: str, header: str) -> bool:
+    """``token`` sent in ``header`` when one is set, otherwise a client on this host"""
+    if token:
+        return hmac.compare_digest(request.headers.get(header, ""), token)
+    return request.client is not None and request.client.host in LOCAL_CLIENT_HOSTS
+
+
+def admin_allowed(request) -> bool:
+    return client_allowed(request, ADMIN_TOKEN, ADMIN_TOKEN_HEADER)
+
+
+def guard_admin_routes(app):
+    """Refuse every ``/admin`` request that ``admin_allowed`` rejects, with a 403"""
+    from fastapi import Request
+    from serialization import FastJSONResponse
+
+    @app.middleware("http")
+    async def check_admin_access(request: Request, call_next):
+        path = request.url.path
+        if (path == ADMIN_PATH_PREFIX or path.startswith(ADMIN_PATH_PREFIX + "/")) and not admin_allowed(request):
+            return FastJSONResponse(status_code=403, content={"error": "Admin access denied"})
+        return await call_next(request)
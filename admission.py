@@ -0,0 +1,187 @@
+"""Admission control shared by the orchestrator and the MCP server.
+
+Two gates run in front of expensive work:
+
+- ``RateLimiter``: token buckets keyed by user (or by tool). A request that
+  finds its bucket empty is rejected at once, with the time until the next
+  token as ``Retry-After``.
+- ``ConcurrencyLimiter``: at most ``limit`` requests in flight. Up to
+  ``max_queue`` more wait in FIFO order for at most ``max_wait`` seconds;
+  beyond that, requests are rejected immediately rather than piling up
+  LLM calls or MySQL queries.
+
+Both raise ``Rejected``; ``rejection_response`` turns it into a 429.
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, Tuple
+
+import metrics
+
+ADMISSION_REJECTED = metrics.REGISTRY.counter(
+    "admission_rejected_total", "Requests rejected by admission control", ["service", "gate", "reason"]
+)
+ADMISSION_IN_FLIGHT = metrics.REGISTRY.gauge(
+    "admission_in_flight", "Requests holding a concurrency slot", ["service", "gate"]
+)
+ADMISSION_QUEUE_DEPTH = metrics.REGISTRY.gauge(
+    "admission_queue_depth", "Requests waiting for a concurrency slot", ["service", "gate"]
+)
+ADMISSION_WAIT_SECONDS = metrics.REGISTRY.histogram(
+    "admission_wait_seconds", "Time spent waiting for a concurrency slot", ["service", "gate"]
+)
+
+
+class Rejected(Exception):
+    """The request was not admitted; retry after ``retry_after`` seconds"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_rate(value: str) -> Tuple[float, float]:
+    """``"5/10"`` -> 5 requests per second with bursts of 10; ``"5"`` -> burst of 5"""
+    rate, _, burst = value.partition("/")
+    return float(rate), float(burst or rate)
+
+
+def parse_rate_limits(value: str) -> Dict[str, Tuple[float, float]]:
+    """``"search_transactions=2/5,aggregate_transactions=1"`` -> {name: (rate, burst)}"""
+    limits = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, _, rate = item.partition("=")
+            limits[name.strip()] = parse_rate(rate.strip())
+    return limits
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+def rejection_response(error: Rejected):
+    # Imported here: the stdio MCP server uses these gates without the web stack
+    from fastapi.responses import JSONResponse
+
+    return JSONResponse(
+        status_code=429,
+        content={"error": str(error), "retry_after": round(error.retry_after, 3)},
+        headers={"Retry-After": retry_after_header(error.retry_after)},
+    )
+
+
+class RateLimiter:
+    """Token buckets per key, holding at most ``max_keys`` buckets (least recently used are dropped)"""
+
+    def __init__(self, service: str, gate: str, rate: float, burst: float, max_keys: int = 100_000):
+        self.service = service
+        self.gate = gate
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def acquire(self, key: str, cost: float = 1.0):
+        """Take ``cost`` tokens from ``key``'s bucket or raise ``Rejected``"""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        if not allowed:
+            ADMISSION_REJECTED.inc(service=self.service, gate=self.gate, reason="rate_limited")
+            raise Rejected(f"Rate limit exceeded for {self.gate} {key!r}", (cost - tokens) / self.rate)
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight requests, with a bounded FIFO wait queue"""
+
+    def __init__(self, service: str, gate: str, limit: int, max_queue: int, max_wait: float):
+        self.service = service
+        self.gate = gate
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self._waiters: "OrderedDict[asyncio.Future, None]" = OrderedDict()
+
+    def _release(self):
+        self.in_flight -= 1
+        # Hand the slot straight to the oldest waiter so it cannot be overtaken
+        while self._waiters:
+            waiter, _ = self._waiters.popitem(last=False)
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+                break
+        self._collect()
+
+    def _collect(self):
+        ADMISSION_IN_FLIGHT.set(self.in_flight, service=self.service, gate=self.gate)
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters), service=self.service, gate=self.gate)
+
+    def _reject(self, reason: str, message: str):
+        ADMISSION_REJECTED.inc(service=self.service, gate=self.gate, reason=reason)
+        # A slot frees up roughly every max_wait / limit seconds under sustained load
+        raise Rejected(message, max(self.max_wait / max(self.limit, 1), 1.0))
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of ``limit`` slots for the body of the ``async with``"""
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+        elif len(self._waiters) >= self.max_queue:
+            self._reject("queue_full", f"{self.gate} is at capacity ({self.in_flight} running, {len(self._waiters)} queued)")
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters[waiter] = None
+            self._collect()
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+            except asyncio.TimeoutError:
+                self._waiters.pop(waiter, None)
+                if waiter.done():  # granted just as the wait timed out
+                    self._release()
+                else:
+                    waiter.cancel()
+                self._collect()
+                self._reject("queue_timeout", f"{self.gate} queue wait exceeded {self.max_wait:g}s")
+            except asyncio.CancelledError:
+                self._waiters.pop(waiter, None)
+                if waiter.done() and not waiter.cancelled():
+                    self._release()
+                raise
+            finally:
+                ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - started, service=self.service, gate=self.gate)
+        self._collect()
+        try:
+            yield
+        finally:
+            self._release()
+
+    def describe(self) -> Dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "max_queue": self.max_queue,
+            "max_wait_seconds": self.max_wait,
+        }
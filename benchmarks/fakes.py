@@ -0,0 +1,152 @@
+import random
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from datetime import datetime
+from typing import List
+
+import seed_data
+
+# Text compares case-insensitively, as under MySQL's default collation
+PROFILES_DDL = """
+CREATE TABLE profiles (
+    user_id TEXT COLLATE NOCASE PRIMARY KEY,
+    user_name TEXT COLLATE NOCASE,
+    created_date TEXT,
+    phone_number TEXT COLLATE NOCASE,
+    business_name TEXT COLLATE NOCASE,
+    email_id TEXT COLLATE NOCASE,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+)"""
+
+TRANSACTIONS_DDL = """
+CREATE TABLE transactions (
+    transaction_id TEXT COLLATE NOCASE PRIMARY KEY,
+    user_id TEXT COLLATE NOCASE,
+    transaction_date TEXT,
+    amount REAL,
+    transaction_type TEXT COLLATE NOCASE,
+    description TEXT COLLATE NOCASE,
+    status TEXT COLLATE NOCASE,
+    category TEXT COLLATE NOCASE,
+    merchant_name TEXT COLLATE NOCASE
+)"""
+
+
+class FakeCursor:
+    """mysql.connector-style cursor over a sqlite3 connection"""
+
+    def __init__(self, connection: "FakeConnection", dictionary: bool = False):
+        # A weak proxy, like mysql.connector's cursors: cursors never keep their connection alive
+        self._connection = weakref.proxy(connection)
+        self._dictionary = dictionary
+        self._cursor = connection._sqlite.cursor()
+        self.column_names = ()
+
+    def execute(self, query: str, params=None):
+        started = time.perf_counter()
+        query = _FULLTEXT_RE.sub(r"FULLTEXT_RELEVANCE(\1, %s)", query).replace("%s", "?")
+        if self._connection.query_latency_ms:
+            # Per statement (prepared cursors are reused); queries on other connections overlap it
+            time.sleep(self._connection.query_latency_ms / 1000)
+        with self._connection._lock:
+            self._cursor.execute(query, tuple(params or ()))
+            self._rows = self._cursor.fetchall()
+        self.column_names = tuple(d[0] for d in self._cursor.description or ())
+        if self._connection.on_execute:
+            self._connection.on_execute(time.perf_counter() - started)
+
+    def _convert(self, row):
+        if self._dictionary:
+            return dict(zip(self.column_names, row))
+        return row
+
+    def fetchone(self):
+        if not self._rows:
+            return None
+        return self._convert(self._rows.pop(0))
+
+    def fetchmany(self, size: int = 1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return [self._convert(row) for row in rows]
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return [self._convert(row) for row in rows]
+
+    def close(self):
+        self._cursor.close()
+
+
+class FakeConnection:
+    """In-memory, seeded stand-in for a mysql.connector connection"""
+
+    def __init__(self, users: int = 100, transactions: int = 10_000, seed: int = 42,
+                 query_latency_ms: float = 0.0):
+        self._sqlite = sqlite3.connect(":memory:", check_same_thread=False)
+        self._sqlite.create_function("DATE_FORMAT", 2, _date_format, deterministic=True)
+        self._sqlite.create_function("YEARWEEK", 2, _yearweek, deterministic=True)
+        self._sqlite.create_function("FULLTEXT_RELEVANCE", -1, _fulltext_relevance, deterministic=True)
+        self._lock = threading.Lock()
+        self.query_latency_ms = query_latency_ms
+        self.on_execute = None  # Optional callback(elapsed_seconds)
+        self.user_ids = seed_database(self._sqlite, users, transactions, seed)
+        self._owner = None
+
+    def session(self) -> "FakeConnection":
+        """Another connection to the same database; closing it leaves the database open"""
+        session = object.__new__(FakeConnection)
+        session.__dict__.update(self.__dict__)
+        session._owner = self
+        return session
+
+    def cursor(self, dictionary: bool = False, **kwargs) -> FakeCursor:
+        return FakeCursor(self, dictionary=dictionary)
+
+    def is_connected(self) -> bool:
+        return True
+
+    def close(self):
+        if self._owner is None:
+            self._sqlite.close()
+
+
+def _date_format(value: str, fmt: str) -> str:
+    """MySQL DATE_FORMAT for the %Y/%m/%d specifiers the tools use"""
+    return datetime.fromisoformat(value).strftime(fmt)
+
+
+def _yearweek(value: str, mode: int = 0) -> int:
+    """MySQL YEARWEEK in ISO mode 3"""
+    year, week, _ = datetime.fromisoformat(value).isocalendar()
+    return year * 100 + week
+
+
+_FULLTEXT_RE = re.compile(r"MATCH\(([^)]*)\) AGAINST \(%s IN NATURAL LANGUAGE MODE\)")
+_WORD_RE = re.compile(r"\w+")
+
+
+def _fulltext_relevance(*args) -> float:
+    """Stand-in for MySQL MATCH ... AGAINST: query words found in the columns"""
+    *columns, query = args
+    words = set(_WORD_RE.findall(" ".join(c or "" for c in columns).lower()))
+    return float(sum(w in words for w in _WORD_RE.findall(query.lower())))
+
+
+def seed_database(conn: sqlite3.Connection, users: int, transactions: int, seed: int) -> List[str]:
+    """Create and fill the profiles and transactions tables deterministically"""
+    rng = random.Random(seed)
+    conn.execute(PROFILES_DDL)
+    conn.execute(TRANSACTIONS_DDL)
+    conn.execute("CREATE INDEX idx_tx_user_date ON transactions (user_id, transaction_date)")
+
+    start, end = datetime(2023, 1, 1), datetime(2025, 1, 1)
+    user_ids = [f"U{i:07d}" for i in range(1, users + 1)]
+    conn.executemany(f"INSERT INTO profiles ({', '.join(seed_data.PROFILE_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                     seed_data.generate_profiles(users, rng, start))
+    for batch in seed_data.batched(seed_data.generate_transactions(transactions, user_ids, rng, start, end), 10_000):
+        conn.executemany("INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+    conn.commit()
+    return user_ids
@@ -0,0 +1,156 @@
+"""Offline accuracy and latency report for the local intent router.
+
+Replays the labelled messages in ``intent_eval.jsonl`` (the tool call the
+routing LLM should make, or ``"tool": null`` when it should answer
+directly) through ``intent.IntentRouter``. For each confidence threshold it
+reports how many messages would skip the routing LLM call ("routed") and
+how many of those match the expected call exactly, after schema defaults.
+A wrong local route sends a wrong tool call, so precision matters more
+than coverage.
+
+With ``--classifier`` the optional naive Bayes classifier is evaluated by
+k-fold cross-validation over the same set, so no message is scored by a
+model trained on it.
+
+Usage:
+    python -m benchmarks.intent_eval
+    python -m benchmarks.intent_eval --classifier --folds 5 --show-errors
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.load_test import distribution
+from intent import Intent, IntentRouter, NaiveBayesClassifier, with_defaults
+
+EVAL_SET = os.path.join(os.path.dirname(__file__), "intent_eval.jsonl")
+USER_ID = "U0000001"
+THRESHOLDS = (0.75, 0.8, 0.85, 0.9, 0.95)
+
+
+def load_examples(path: str) -> List[Dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def is_correct(intent: Intent, example: Dict, tool_schemas: Dict) -> bool:
+    if intent.tool != example.get("tool"):
+        return False
+    schema = tool_schemas.get(intent.tool)
+    return with_defaults(intent.arguments, schema) == with_defaults(example.get("arguments") or {}, schema)
+
+
+def score(predictions: List[Optional[Intent]], examples: List[Dict], tool_schemas: Dict) -> Dict:
+    """Routing quality per threshold"""
+    expecting_tool = sum(1 for example in examples if example.get("tool"))
+    results = {}
+    for threshold in THRESHOLDS:
+        routed = correct = right_tool = false_routes = 0
+        for intent, example in zip(predictions, examples):
+            if intent is None or intent.confidence < threshold:
+                continue
+            routed += 1
+            correct += is_correct(intent, example, tool_schemas)
+            right_tool += intent.tool == example.get("tool")
+            false_routes += not example.get("tool")
+        results[str(threshold)] = {
+            "routed": routed,
+            "routed_rate": round(routed / len(examples), 3),
+            "precision": round(correct / routed, 3) if routed else None,
+            "tool_precision": round(right_tool / routed, 3) if routed else None,
+            "coverage": round(correct / expecting_tool, 3) if expecting_tool else None,
+            "false_routes": false_routes,
+        }
+    return results
+
+
+def errors(predictions: List[Optional[Intent]], examples: List[Dict], tool_schemas: Dict,
+           threshold: float) -> List[Dict]:
+    """Messages routed locally at ``threshold`` to the wrong call"""
+    wrong = []
+    for intent, example in zip(predictions, examples):
+        if intent is not None and intent.confidence >= threshold and not is_correct(intent, example, tool_schemas):
+            wrong.append({
+                "message": example["message"],
+                "expected": {"tool": example.get("tool"), "arguments": example.get("arguments")},
+                "routed": intent._asdict(),
+            })
+    return wrong
+
+
+def time_router(router: IntentRouter, examples: List[Dict], repeat: int) -> Dict:
+    """Per-message routing latency, in milliseconds like the load test"""
+    samples = []
+    for _ in range(repeat):
+        for example in examples:
+            started = time.perf_counter()
+            router.classify(example["message"], USER_ID)
+            samples.append(time.perf_counter() - started)
+    return distribution(samples)
+
+
+def cross_validate(examples: List[Dict], tool_schemas: Dict, folds: int) -> List[Optional[Intent]]:
+    predictions: List[Optional[Intent]] = [None] * len(examples)
+    for fold in range(folds):
+        training = [(e["message"], e.get("tool") or "none") for i, e in enumerate(examples) if i % folds != fold]
+        router = IntentRouter(tool_schemas, classifier=NaiveBayesClassifier().fit(training))
+        for i in range(fold, len(examples), folds):
+            predictions[i] = router.classify(examples[i]["message"], USER_ID)
+    return predictions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local intent router accuracy and latency")
+    parser.add_argument("--eval-set", default=EVAL_SET)
+    parser.add_argument("--classifier", action="store_true", help="also evaluate rules + naive Bayes")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=200, help="timing passes over the eval set")
+    parser.add_argument("--threshold", type=float, default=0.9, help="threshold for --show-errors")
+    parser.add_argument("--show-errors", action="store_true")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    from tool_core import tool_registry
+
+    tool_schemas = {tool.name: tool.input_schema for tool in tool_registry}
+    examples = load_examples(args.eval_set)
+    report = {
+        "config": {
+            "examples": len(examples),
+            "expecting_tool": sum(1 for e in examples if e.get("tool")),
+            "folds": args.folds if args.classifier else None,
+        },
+        "results": {},
+    }
+
+    routers = {"rules": (IntentRouter(tool_schemas), None)}
+    if args.classifier:
+        # Timing uses a model trained on everything; accuracy comes from cross-validation
+        full = NaiveBayesClassifier().fit((e["message"], e.get("tool") or "none") for e in examples)
+        routers["rules+classifier"] = (IntentRouter(tool_schemas, classifier=full),
+                                       cross_validate(examples, tool_schemas, args.folds))
+
+    for name, (router, predictions) in routers.items():
+        if predictions is None:
+            predictions = [router.classify(e["message"], USER_ID) for e in examples]
+        result = {
+            "thresholds": score(predictions, examples, tool_schemas),
+            "latency_ms": time_router(router, examples, args.repeat),
+        }
+        if args.show_errors:
+            result["errors"] = errors(predictions, examples, tool_schemas, args.threshold)
+        report["results"][name] = result
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,371 @@
+"""Load-test the /chat and tool call paths with a mock LLM and a fake database.
+
+Drives ``orchestrator.chat_endpoint``, ``mcp_server_sse.http_call_tool`` and
+the stdio server's MCP handlers (``mcp_server.MCPServer`` over in-memory
+streams, the JSON-RPC a stdio client speaks minus the pipes) in-process
+at a configurable concurrency. Both servers run on ``tool_core`` and the
+same fake database. Prints a JSON report with latency percentiles,
+throughput and a per-phase breakdown.
+
+Usage:
+    python -m benchmarks.load_test --target both --concurrency 16 --requests 500
+    python -m benchmarks.load_test --target tools --hot-fraction 0.5
+    python -m benchmarks.load_test --output run.json --baseline previous.json
+"""
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import columnar
+import seed_data
+from db import DatabaseRouter
+from benchmarks.fakes import FakeConnection
+from llm import MockBackend
+
+CHAT_MESSAGES = [
+    "Show my profile",
+    "What are my recent transactions?",
+    "Give me a summary of my spending",
+    "Search my food category transactions",
+    "Hi there, what can you do?",
+]
+
+_phases: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("phases", default=None)
+
+
+def record_phase(name: str, seconds: float):
+    """Add time spent in a phase to the request currently being measured"""
+    phases = _phases.get()
+    if phases is not None:
+        phases[name] = phases.get(name, 0.0) + seconds
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def distribution(values: List[float]) -> Dict[str, float]:
+    """Summarize a list of seconds as millisecond percentiles"""
+    return {
+        "p50": round(percentile(values, 50) * 1000, 3),
+        "p95": round(percentile(values, 95) * 1000, 3),
+        "p99": round(percentile(values, 99) * 1000, 3),
+        "mean": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "max": round(max(values) * 1000, 3) if values else 0.0,
+    }
+
+
+def install_fakes(args) -> Dict[str, object]:
+    """Import both services and swap the LLM and database for local stand-ins"""
+    import mcp_server_sse
+    import orchestrator
+    import tool_core
+
+    llm = MockBackend(
+        latency_ms=args.llm_latency_ms,
+        tokens_per_second=args.llm_tokens_per_second,
+        answer_tokens=args.llm_answer_tokens,
+    )
+    llm.on_call = lambda elapsed, routing: record_phase(
+        "llm_tool_routing" if routing else "llm_answer", elapsed
+    )
+    orchestrator.llm_client.register(llm)
+    orchestrator.LLM_ROUTING_MODEL = "mock:routing"
+    orchestrator.LLM_ANSWER_MODEL = "mock:answer"
+    # Background conversation summaries are off the response path: keep them out of the phases
+    orchestrator.llm_client.register(MockBackend(args.llm_latency_ms, args.llm_tokens_per_second), "mock-summary")
+    orchestrator.LLM_SUMMARY_MODEL = "mock-summary:summary"
+
+    databases: Dict[tuple, FakeConnection] = {}
+    databases_lock = threading.Lock()
+
+    def connect_fake(config: Dict) -> FakeConnection:
+        # Every node gets an identically seeded copy, like a caught-up replica;
+        # connections to one node (e.g. from tool worker threads) share its copy
+        node = (config['host'], config['port'])
+        with databases_lock:
+            if node not in databases:
+                databases[node] = FakeConnection(
+                    users=args.users,
+                    transactions=args.transactions,
+                    seed=args.seed,
+                    query_latency_ms=args.db_latency_ms,
+                )
+                databases[node].on_execute = lambda elapsed: record_phase("sql_execute", elapsed)
+            return databases[node].session()
+
+    replicas = [dict(tool_core.DB_CONFIG, port=3307 + i) for i in range(args.replicas)]
+    tool_core.db_router = DatabaseRouter(tool_core.DB_CONFIG, replicas, connect_fn=connect_fake)
+    tool_core.connect_to_database()
+    user_ids = tool_core.db_router.primary.connection.user_ids
+
+    if args.hot_fraction:
+        # The popular account is many clients, not one abusive user: lift its per-user limit
+        mcp_server_sse.user_rate_limiter.rate = 0
+
+    if args.columnar:
+        # Load the snapshot up front so cross-user searches are served from it
+        tool_core.columnar_engine = columnar.ColumnarEngine(
+            tool_core.db_router.open_dedicated_connection, enabled=True
+        )
+        tool_core.columnar_engine.refresh()
+
+    if args.mcp_url:
+        orchestrator.MCP_SERVER_URL = args.mcp_url
+    else:
+        async def call_mcp_tool_in_process(tool_name: str, arguments: Dict, **kwargs) -> str:
+            started = time.perf_counter()
+            response = await mcp_server_sse.http_call_tool({"tool_name": tool_name, "arguments": arguments})
+            record_phase("mcp_call", time.perf_counter() - started)
+            if response.status_code == 200:
+                return json.loads(response.body).get("result", "No result returned")
+            return f"Error calling tool: {response.status_code} - {response.body.decode()}"
+
+        orchestrator.call_mcp_tool = call_mcp_tool_in_process
+
+        async def fetch_tool_list_in_process():
+            return tool_core.tool_registry.schema_hash, tool_core.tool_registry.definitions()
+
+        orchestrator.tool_catalog.fetch = fetch_tool_list_in_process
+
+    return {"orchestrator": orchestrator, "mcp_server_sse": mcp_server_sse, "tool_core": tool_core, "user_ids": user_ids}
+
+
+async def run_load(make_request: Callable, total: int, concurrency: int, warmup: int) -> Dict:
+    """Run ``total`` requests over ``concurrency`` workers and collect timings"""
+    for i in range(warmup):
+        await make_request(i, 0)
+
+    latencies: List[float] = []
+    phase_samples: Dict[str, List[float]] = {}
+    errors = 0
+    request_numbers = iter(range(total))
+
+    async def worker(worker_id: int):
+        nonlocal errors
+        for i in request_numbers:
+            phases: Dict[str, float] = {}
+            token = _phases.set(phases)
+            started = time.perf_counter()
+            try:
+                await make_request(i, worker_id)
+            except Exception:
+                errors += 1
+            finally:
+                latencies.append(time.perf_counter() - started)
+                _phases.reset(token)
+            for name, seconds in phases.items():
+                phase_samples.setdefault(name, []).append(seconds)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    duration = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "errors": errors,
+        "duration_s": round(duration, 3),
+        "requests_per_second": round(total / duration, 2) if duration else 0.0,
+        "latency_ms": distribution(latencies),
+        "phases_ms": {name: distribution(values) for name, values in sorted(phase_samples.items())},
+    }
+
+
+def chat_workload(services: Dict, rng: random.Random) -> Callable:
+    orchestrator = services["orchestrator"]
+    user_ids = services["user_ids"]
+
+    async def make_request(i: int, worker_id: int):
+        request = orchestrator.ChatRequest(
+            user_id=rng.choice(user_ids),
+            message=CHAT_MESSAGES[i % len(CHAT_MESSAGES)],
+            conversation_id=f"bench-{worker_id}",
+        )
+        await orchestrator.chat_endpoint(request)
+
+    return make_request
+
+
+def tool_payloads(services: Dict, rng: random.Random, hot_fraction: float = 0.0) -> Callable[[int], Dict]:
+    """The tool call mix shared by the call_tool and stdio targets"""
+    user_ids = services["user_ids"]
+
+    def next_payload(i: int) -> Dict:
+        # A popular account whose summary many clients ask for at once
+        if rng.random() < hot_fraction:
+            return {"tool_name": "get_transaction_summary", "arguments": {"user_id": user_ids[0]}}
+        user_id = rng.choice(user_ids)
+        choices = [
+            ("get_profile", {"user_id": user_id}),
+            ("get_transactions", {"user_id": user_id, "limit": 10}),
+            ("get_transaction_summary", {"user_id": user_id}),
+            ("search_transactions", {"user_id": user_id, "category": "food"}),
+            ("search_transactions", {"min_amount": 100, "transaction_type": "debit", "limit": 20}),
+            ("search_transactions", {"user_id": user_id, "text": "amazon"}),
+        ]
+        tool_name, arguments = choices[i % len(choices)]
+        return {"tool_name": tool_name, "arguments": arguments}
+
+    return next_payload
+
+
+def call_tool_workload(services: Dict, rng: random.Random, hot_fraction: float = 0.0) -> Callable:
+    mcp_server_sse = services["mcp_server_sse"]
+    next_payload = tool_payloads(services, rng, hot_fraction)
+
+    async def make_request(i: int, worker_id: int):
+        response = await mcp_server_sse.http_call_tool(next_payload(i))
+        if response.status_code != 200:
+            raise RuntimeError(f"call_tool returned {response.status_code}")
+
+    return make_request
+
+
+def stdio_workload(session, services: Dict, rng: random.Random, hot_fraction: float = 0.0) -> Callable:
+    next_payload = tool_payloads(services, rng, hot_fraction)
+
+    async def make_request(i: int, worker_id: int):
+        payload = next_payload(i)
+        result = await session.call_tool(payload["tool_name"], payload["arguments"])
+        if result.isError or result.content[0].text.startswith(("Error", "Database error")):
+            raise RuntimeError(f"stdio call_tool failed: {result.content[0].text[:200]}")
+
+    return make_request
+
+
+@contextlib.asynccontextmanager
+async def stdio_session():
+    """An initialized MCP client session on the stdio server's handlers"""
+    import mcp_server
+    from mcp.shared.memory import create_connected_server_and_client_session
+
+    server = mcp_server.MCPServer(db_connect="lazy")
+    async with create_connected_server_and_client_session(server.server) as session:
+        yield session
+
+
+def compare(current: Dict, baseline: Dict) -> Dict:
+    """Percentage change of throughput and latency against a previous report"""
+    comparison = {}
+    for target, result in current["results"].items():
+        previous = baseline.get("results", {}).get(target)
+        if not previous:
+            continue
+
+        def change(now: float, before: float) -> Optional[float]:
+            return round((now - before) / before * 100, 2) if before else None
+
+        comparison[target] = {
+            "requests_per_second_pct": change(result["requests_per_second"], previous["requests_per_second"]),
+            **{
+                f"latency_{key}_pct": change(result["latency_ms"][key], previous["latency_ms"][key])
+                for key in ("p50", "p95", "p99")
+            },
+        }
+    return comparison
+
+
+async def main_async(args) -> Dict:
+    with contextlib.ExitStack() as stack:
+        if args.quiet:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+        services = install_fakes(args)
+        rng = random.Random(args.seed)
+        results = {}
+        targets = TARGET_GROUPS.get(args.target, [args.target])
+
+        for target in targets:
+            flight = services["tool_core"].tool_flight
+            flight.leaders = flight.followers = 0
+            if target == "chat":
+                results[target] = await run_load(chat_workload(services, rng), args.requests,
+                                                 args.concurrency, args.warmup)
+            elif target == "call_tool":
+                results[target] = await run_load(call_tool_workload(services, rng, args.hot_fraction),
+                                                 args.requests, args.concurrency, args.warmup)
+            else:
+                async with stdio_session() as session:
+                    results[target] = await run_load(stdio_workload(session, services, rng, args.hot_fraction),
+                                                     args.requests, args.concurrency, args.warmup)
+            if target != "chat":
+                results[target]["coalescing"] = flight.describe()
+
+    return {
+        "config": {
+            key: getattr(args, key)
+            for key in (
+                "target", "concurrency", "requests", "warmup", "scale", "users", "transactions", "seed",
+                "llm_latency_ms", "llm_tokens_per_second", "llm_answer_tokens", "db_latency_ms", "replicas", "columnar", "hot_fraction", "mcp_url",
+            )
+        },
+        "results": results,
+    }
+
+
+# --target values that run several targets: HTTP chat + call_tool, or the tool path on both transports
+TARGET_GROUPS = {"both": ["chat", "call_tool"], "tools": ["call_tool", "stdio"], "all": ["chat", "call_tool", "stdio"]}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the chat and tool call paths")
+    parser.add_argument("--target", choices=["chat", "call_tool", "stdio", *TARGET_GROUPS], default="both")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--scale", choices=sorted(seed_data.SCALE_PRESETS), default="1e4",
+                        help="Seed data size (number of transactions)")
+    parser.add_argument("--transactions", type=int, default=None, help="Override the scale preset")
+    parser.add_argument("--users", type=int, default=None, help="Default: transactions / 100")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=250.0)
+    parser.add_argument("--llm-answer-tokens", type=int, default=60)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0)
+    parser.add_argument("--replicas", type=int, default=0, help="Fake read replicas behind the router")
+    parser.add_argument("--columnar", action="store_true",
+                        help="Serve cross-user searches from the columnar snapshot (needs numpy)")
+    parser.add_argument("--hot-fraction", type=float, default=0.0,
+                        help="Share of tool calls for one popular account's summary")
+    parser.add_argument("--mcp-url", default=None, help="Call a running MCP server instead of in-process")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    parser.add_argument("--baseline", default=None, help="Previous JSON report to compare against")
+    parser.add_argument("--verbose", dest="quiet", action="store_false", help="Keep service output on stdout")
+    args = parser.parse_args(argv)
+    if args.transactions is None:
+        args.transactions = seed_data.SCALE_PRESETS[args.scale]
+    if args.users is None:
+        args.users = seed_data.users_for_scale(args.transactions)
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(main_async(args))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(report, json.load(f))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
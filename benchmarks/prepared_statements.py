@@ -0,0 +1,134 @@
+"""Compare the text protocol with cached server-side prepared statements.
+
+Runs the tool query mix through ``tool_core.run_query`` against a
+live MySQL (seed it first with ``python seed_data.py``), once with
+``USE_PREPARED_STATEMENTS`` off and once on, and prints a JSON report with
+per-mode latency, queries per second and statement cache hit rate.
+
+Usage:
+    python -m benchmarks.prepared_statements --iterations 2000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+import seed_data
+from benchmarks.load_test import distribution
+
+# Filter combinations exercised for search_transactions (keys present in the arguments)
+SEARCH_SHAPES = [
+    ("user_id",),
+    ("user_id", "category"),
+    ("category", "min_amount"),
+    ("user_id", "start_date", "end_date"),
+    ("transaction_type", "min_amount", "max_amount"),
+    ("category", "transaction_type", "start_date"),
+]
+
+
+def workload(tool_core, user_ids: List[str], rng: random.Random, iterations: int) -> List[tuple]:
+    """(tool, query, params) triples mirroring what the execute_* functions send"""
+    values = {
+        "category": lambda: rng.choice(list(seed_data.CATEGORIES)),
+        "min_amount": lambda: float(rng.choice([10, 50, 100])),
+        "max_amount": lambda: float(rng.choice([500, 1000, 5000])),
+        "start_date": lambda: "2024-01-01",
+        "end_date": lambda: "2024-06-30",
+        "transaction_type": lambda: rng.choice(["credit", "debit"]),
+    }
+    names = [name for name, _, _ in tool_core.SEARCH_FILTERS]
+    statements = []
+    for _ in range(iterations):
+        user_id = rng.choice(user_ids)
+        kind = rng.randrange(4)
+        if kind == 0:
+            statements.append(("get_profile", "SELECT * FROM profiles WHERE user_id = %s", (user_id,)))
+        elif kind == 1:
+            statements.append(("get_transactions",
+                               "SELECT COUNT(*) as total FROM transactions WHERE user_id = %s", (user_id,)))
+        else:
+            present = rng.choice(SEARCH_SHAPES)
+            shape, params = 0, []
+            for bit, name in enumerate(names):
+                if name in present:
+                    shape |= 1 << bit
+                    params.append(user_id if name == "user_id" else values[name]())
+            query, count_query = tool_core.search_queries(shape)
+            if kind == 2:
+                statements.append(("search_transactions", query, tuple(params) + (20,)))
+            else:
+                statements.append(("search_transactions", count_query, tuple(params)))
+    return statements
+
+
+def run_mode(tool_core, statements: List[tuple], prepared: bool) -> Dict:
+    tool_core.USE_PREPARED_STATEMENTS = prepared
+    latencies = []
+    started = time.perf_counter()
+    for tool, query, params in statements:
+        query_started = time.perf_counter()
+        tool_core.run_query(tool, query, params)
+        latencies.append(time.perf_counter() - query_started)
+    duration = time.perf_counter() - started
+    return {
+        "queries": len(statements),
+        "duration_s": round(duration, 3),
+        "queries_per_second": round(len(statements) / duration, 2),
+        "latency_ms": distribution(latencies),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Text protocol vs prepared statement benchmark")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    import tool_core
+    from statement_cache import all_cache_stats
+
+    if not tool_core.connect_to_database():
+        print("❌ MySQL is required for this benchmark (seed it with seed_data.py)")
+        return 1
+    connection = tool_core.db_router.primary.get_connection()
+    cursor = connection.cursor()
+    cursor.execute("SELECT user_id FROM profiles LIMIT 1000")
+    user_ids = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    if not user_ids:
+        print("❌ The profiles table is empty (seed it with seed_data.py)")
+        return 1
+
+    statements = workload(tool_core, user_ids, random.Random(args.seed), args.iterations)
+    # Warm the buffer pool so both modes read from memory
+    run_mode(tool_core, statements[: len(statements) // 10], prepared=False)
+
+    report = {
+        "config": {"iterations": args.iterations, "seed": args.seed,
+                   "search_shapes": len(SEARCH_SHAPES)},
+        "results": {
+            "text_protocol": run_mode(tool_core, statements, prepared=False),
+            "prepared": run_mode(tool_core, statements, prepared=True),
+        },
+        "statement_cache": all_cache_stats(),
+    }
+    text_qps = report["results"]["text_protocol"]["queries_per_second"]
+    prepared_qps = report["results"]["prepared"]["queries_per_second"]
+    report["speedup"] = round(prepared_qps / text_qps, 3) if text_qps else None
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
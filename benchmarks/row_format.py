@@ -0,0 +1,134 @@
+"""Microbenchmark for formatting transaction rows into tool result text.
+
+Compares the previous approach (one dict per row from ``zip(columns, row)``,
+an f-string per row, then string concatenation) with ``rows.format_rows``
+(raw tuples, a layout compiled once per column order into an f-string over
+tuple positions, one join). Rows come
+from the synthetic generator in ``seed_data`` and are shaped like cursor
+output, so no database is needed.
+
+Usage:
+    python -m benchmarks.row_format --rows 500 --repeat 50 --rounds 7
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Dict, List
+
+import seed_data
+from rows import ResultSet, format_rows
+
+COLUMNS = tuple(seed_data.TRANSACTION_COLUMNS)
+
+
+def make_rows(count: int, seed: int) -> List[tuple]:
+    """Cursor-shaped tuples: datetime dates and Decimal amounts like mysql.connector returns"""
+    rng = random.Random(seed)
+    user_ids = [f"U{i:07d}" for i in range(1, 101)]
+    rows = []
+    for row in seed_data.generate_transactions(count, user_ids, rng, datetime(2023, 1, 1), datetime(2025, 1, 1)):
+        row = dict(zip(COLUMNS, row))
+        row["transaction_date"] = datetime.fromisoformat(str(row["transaction_date"]))
+        row["amount"] = Decimal(str(row["amount"]))
+        rows.append(tuple(row[name] for name in COLUMNS))
+    return rows
+
+
+def format_dicts_search(columns, rows) -> str:
+    """The search_transactions row loop before compact rows"""
+    transactions = [dict(zip(columns, row)) for row in rows]
+    response_text = ""
+    for tx in transactions:
+        response_text += f"""
+Transaction ID: {tx['transaction_id']}
+User ID: {tx['user_id']}
+Date: {tx['transaction_date']}
+Amount: ${tx['amount']:.2f} ({tx['transaction_type']})
+Category: {tx['category']}
+Description: {tx['description']}
+Status: {tx['status']}
+Merchant: {tx['merchant_name']}
+{'-'*30}
+"""
+    return response_text
+
+
+def format_dicts_transactions(columns, rows) -> str:
+    """The get_transactions row loop before compact rows"""
+    transactions = [dict(zip(columns, row)) for row in rows]
+    formatted_transactions = []
+    for tx in transactions:
+        formatted_tx = f"""
+Transaction ID: {tx['transaction_id']}
+Date: {tx['transaction_date']}
+Amount: ${tx['amount']:.2f}
+Type: {tx['transaction_type']}
+Description: {tx['description']}
+Status: {tx['status']}
+Category: {tx['category']}
+Merchant: {tx['merchant_name']}
+                    """.strip()
+        formatted_transactions.append(formatted_tx)
+    return "\n\n".join(formatted_transactions)
+
+
+def measure(fn: Callable[[], str], rows: int, repeat: int, rounds: int) -> Dict:
+    """Best of ``rounds`` timings of ``repeat`` calls, to damp scheduler noise"""
+    fn()  # warm caches (compiled layouts)
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        timings.append(time.perf_counter() - started)
+    duration = min(timings)
+    return {
+        "rows_per_second": round(rows * repeat / duration),
+        "us_per_call": round(duration / repeat * 1e6, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Row formatting microbenchmark")
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    import tool_core
+
+    rows = make_rows(args.rows, args.seed)
+    report = {"config": {"rows": args.rows, "repeat": args.repeat, "rounds": args.rounds}, "results": {}}
+    cases = {
+        "search_transactions": (format_dicts_search, tool_core.SEARCH_RESULT_LAYOUT, ""),
+        "get_transactions": (format_dicts_transactions, tool_core.TRANSACTION_LAYOUT, "\n\n"),
+    }
+    for name, (before, layout, separator) in cases.items():
+        # The result set is built inside the timed call, as run_query does per query
+        after = lambda: format_rows(layout, ResultSet(COLUMNS, rows), separator)
+        if before(COLUMNS, rows) != after():
+            print(f"❌ {name}: compact formatting does not match the previous output")
+            return 1
+        result = {
+            "before": measure(lambda: before(COLUMNS, rows), args.rows, args.repeat, args.rounds),
+            "after": measure(after, args.rows, args.repeat, args.rounds),
+        }
+        result["speedup"] = round(result["after"]["rows_per_second"] / result["before"]["rows_per_second"], 2)
+        report["results"][name] = result
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""Response serialization time and bytes on the wire for typical payloads.
+
+Real tool results come from ``mcp_server_sse`` running in-process on the
+seeded fake database. For each payload (a /call_tool body, a /chat
+response with and without ``tool_result``, a conversation history) it
+times the following renderers:
+
+- ``fastapi_default``: ``jsonable_encoder`` then ``JSONResponse``, the path a
+  returned dict or model took before
+- ``json``: ``JSONResponse`` on the raw content
+- ``fast``: ``serialization.FastJSONResponse`` (orjson when installed)
+
+It also reports body size raw, gzip and brotli (when installed), with the
+time to compress.
+
+Usage:
+    python -m benchmarks.serialization --scale 1e4 --repeat 200
+"""
+import argparse
+import asyncio
+import contextlib
+import gzip
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import serialization
+from benchmarks.load_test import install_fakes, parse_args as load_test_args
+from serialization import FastJSONResponse
+
+
+def measure(fn: Callable[[], Any], repeat: int, rounds: int = 5) -> float:
+    """Best of ``rounds`` mean call times, in microseconds"""
+    fn()
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, time.perf_counter() - started)
+    return round(best / repeat * 1e6, 2)
+
+
+async def build_payloads(services: Dict) -> Dict[str, Any]:
+    mcp_server_sse = services["mcp_server_sse"]
+    orchestrator = services["orchestrator"]
+    user_id = services["user_ids"][0]
+
+    async def call(tool_name: str, arguments: Dict) -> Dict:
+        response = await mcp_server_sse.http_call_tool({"tool_name": tool_name, "arguments": arguments})
+        return json.loads(response.body)
+
+    payloads = {
+        "call_tool_profile": await call("get_profile", {"user_id": user_id}),
+        "call_tool_transactions_10": await call("get_transactions", {"user_id": user_id, "limit": 10}),
+        "call_tool_search_100": await call("search_transactions", {"min_amount": 10, "limit": 100}),
+        "call_tool_aggregate": await call("aggregate_transactions",
+                                          {"group_by": ["month", "category"], "measures": ["count", "sum", "p90"]}),
+    }
+    chat = orchestrator.ChatResponse(
+        response=" ".join(["answer"] * 60),
+        tool_used=True,
+        tool_result=(await call("search_transactions", {"user_id": user_id, "limit": 20}))["result"],
+        conversation_id="bench",
+        tool_result_tokens_saved=120,
+        prompt_tokens=1900,
+    )
+    payloads["chat"] = chat
+    payloads["chat_without_tool_result"] = chat.model_dump(exclude={"tool_result"})
+    history = []
+    for i in range(20):
+        history.append(orchestrator.Message(role="user", content=f"Show my transactions at merchant {i}"))
+        history.append(orchestrator.Message(role="assistant", content=" ".join(["answer"] * 60)))
+    payloads["conversation_40_messages"] = {"conversation_id": "bench", "summary": "x " * 200, "history": history}
+    return payloads
+
+
+def render_cases(content: Any) -> Dict[str, Callable[[], bytes]]:
+    cases = {
+        "fastapi_default": lambda: JSONResponse(jsonable_encoder(content)).body,
+        "fast": lambda: FastJSONResponse(content).body,
+    }
+    try:
+        JSONResponse(content)
+        cases["json"] = lambda: JSONResponse(content).body
+    except TypeError:
+        pass  # models need the encoder pass
+    return cases
+
+
+def wire_sizes(body: bytes, repeat: int) -> Dict:
+    sizes = {"raw_bytes": len(body)}
+    sizes["gzip_bytes"] = len(gzip.compress(body, compresslevel=serialization.GZIP_LEVEL))
+    sizes["gzip_us"] = measure(lambda: gzip.compress(body, compresslevel=serialization.GZIP_LEVEL), repeat)
+    if serialization.brotli is not None:
+        sizes["br_bytes"] = len(serialization.compress(body, "br"))
+        sizes["br_us"] = measure(lambda: serialization.compress(body, "br"), repeat)
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Response serialization and compression")
+    parser.add_argument("--scale", default="1e4")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        services = install_fakes(load_test_args(["--scale", args.scale, "--llm-latency-ms", "0"]))
+        payloads = asyncio.run(build_payloads(services))
+
+    report = {
+        "config": {
+            "scale": args.scale,
+            "repeat": args.repeat,
+            "orjson": serialization.orjson is not None,
+            "brotli": serialization.brotli is not None,
+            "compression_min_bytes": serialization.RESPONSE_COMPRESSION_MIN_BYTES,
+        },
+        "results": {},
+    }
+    for name, content in payloads.items():
+        cases = render_cases(content)
+        result = {"render_us": {case: measure(render, args.repeat) for case, render in cases.items()}}
+        result["speedup"] = round(result["render_us"]["fastapi_default"] / result["render_us"]["fast"], 2)
+        result.update(wire_sizes(cases["fast"](), args.repeat))
+        report["results"][name] = result
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
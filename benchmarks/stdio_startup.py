@@ -0,0 +1,206 @@
+"""Cold start of the stdio MCP server: import cost and spawn-to-first-response.
+
+Two measurements:
+
+- ``imports``: ``python -X importtime -c "import mcp_server"`` totals and the
+  most expensive imports two levels down. The same run with
+  ``mcp_server.import_server_stack()`` shows what is now deferred.
+- ``spawn``: for each mode, starts ``python mcp_server.py`` the way a
+  client does and speaks raw JSON-RPC over its pipes. It reports the
+  median milliseconds from spawn to the ``initialize`` answer, to the
+  ``tools/list`` answer and to the first ``tools/call`` answer.
+
+Modes:
+    eager       MCP_DB_CONNECT=eager, connect to MySQL before serving (the old startup)
+    background  MCP_DB_CONNECT=background, connect on a thread during the handshake (default)
+    lazy        MCP_DB_CONNECT=lazy, connect on the first tool call
+    pool        attach to ``python mcp_server.py --pool N`` through MCP_SERVER_POOL_SOCKET
+
+Without a reachable MySQL the connect fails fast and the tool call returns
+an error text. The report says whether MySQL was reachable.
+
+Usage:
+    python -m benchmarks.stdio_startup --runs 10 --modes eager,background,pool
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROTOCOL_VERSION = "2024-11-05"
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def import_times(statement: str, top: int) -> Dict:
+    """Cumulative import cost of ``statement`` and its most expensive imports two levels down"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, capture_output=True, text=True, env={**os.environ, "LOG_LEVEL": "WARNING"},
+    )
+    total_us = 0
+    modules = []
+    for line in completed.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        # Nesting shows as two more spaces per level; top-level imports have one
+        depth = (len(match.group(3)) + 1) // 2
+        if depth == 1:
+            total_us += int(match.group(2))
+        if depth <= 2:
+            modules.append((match.group(4), int(match.group(2))))
+    modules.sort(key=lambda item: item[1], reverse=True)
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "top_modules_ms": {name: round(us / 1000, 1) for name, us in modules[:top]},
+    }
+
+
+class StdioSession:
+    """A spawned server process spoken to with newline-delimited JSON-RPC"""
+
+    def __init__(self, env: Dict[str, str]):
+        self.started = time.perf_counter()
+        self.process = subprocess.Popen(
+            [sys.executable, "mcp_server.py"], cwd=ROOT, env=env,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        self.next_id = 1
+
+    def send(self, method: str, params: Dict = None, notify: bool = False):
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        if not notify:
+            message["id"] = self.next_id
+            self.next_id += 1
+        self.process.stdin.write(json.dumps(message).encode() + b"\n")
+        self.process.stdin.flush()
+        return message.get("id")
+
+    def request(self, method: str, params: Dict = None) -> float:
+        """Send a request, wait for its answer; ms since spawn"""
+        request_id = self.send(method, params)
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                raise RuntimeError(f"server exited before answering {method}")
+            if json.loads(line).get("id") == request_id:
+                return (time.perf_counter() - self.started) * 1000
+
+    def close(self):
+        self.process.stdin.close()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+def spawn_once(env: Dict[str, str]) -> Dict[str, float]:
+    session = StdioSession(env)
+    try:
+        timings = {"initialize_ms": session.request("initialize", {
+            "protocolVersion": PROTOCOL_VERSION,
+            "capabilities": {},
+            "clientInfo": {"name": "stdio-startup-benchmark", "version": "1.0"},
+        })}
+        session.send("notifications/initialized", notify=True)
+        timings["tools_list_ms"] = session.request("tools/list", {})
+        timings["first_call_ms"] = session.request(
+            "tools/call", {"name": "get_profile", "arguments": {"user_id": "U001"}})
+        return timings
+    finally:
+        session.close()
+
+
+def start_pool(size: int, socket_path: str, env: Dict[str, str]) -> subprocess.Popen:
+    pool = subprocess.Popen(
+        [sys.executable, "mcp_server.py", "--pool", str(size), "--socket", socket_path],
+        cwd=ROOT, env=env, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while not os.path.exists(socket_path):
+        if pool.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError("server pool did not start")
+        time.sleep(0.05)
+    return pool
+
+
+def run_mode(mode: str, runs: int, pool_size: int) -> Dict:
+    env = {**os.environ, "LOG_LEVEL": "WARNING"}
+    env.pop("MCP_SERVER_POOL_SOCKET", None)
+    pool = None
+    if mode == "pool":
+        socket_path = os.path.join(tempfile.mkdtemp(), "mcp_server_pool.sock")
+        pool = start_pool(pool_size, socket_path, env)
+        env["MCP_SERVER_POOL_SOCKET"] = socket_path
+    else:
+        env["MCP_DB_CONNECT"] = mode
+    try:
+        samples: List[Dict[str, float]] = []
+        for _ in range(runs):
+            if pool is not None:
+                time.sleep(0.3)  # let the pool replace the server the last run took
+            samples.append(spawn_once(env))
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.wait(timeout=10)
+    return {key: round(statistics.median(sample[key] for sample in samples), 1) for key in samples[0]}
+
+
+def mysql_reachable() -> bool:
+    try:
+        socket.create_connection(("localhost", 3306), timeout=0.5).close()
+        return True
+    except OSError:
+        return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stdio MCP server cold start")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--modes", default="eager,background,lazy,pool")
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--top", type=int, default=8, help="most expensive imports to list")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    report = {
+        "config": {
+            "runs": args.runs,
+            "modes": modes,
+            "pool_size": args.pool_size,
+            "python": sys.version.split()[0],
+            "mysql_reachable": mysql_reachable(),
+        },
+        "results": {
+            "imports": {
+                "module": import_times("import mcp_server", args.top),
+                "full_stack": import_times("import mcp_server; mcp_server.import_server_stack()", args.top),
+            },
+            "spawn": {mode: run_mode(mode, args.runs, args.pool_size) for mode in modes},
+        },
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
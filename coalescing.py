@@ -0,0 +1,77 @@
+"""Single-flight coalescing of identical concurrent calls.
+
+``SingleFlight.run(key, label, call)`` starts ``call()`` only if no call
+with the same key is already in flight. Callers arriving meanwhile
+(followers) await the same execution and get the same result or exception.
+The key is forgotten once the call finishes, so nothing is cached beyond
+the moment the result is ready.
+
+The shared execution runs as its own task and every caller awaits it
+through ``asyncio.shield``: the caller that started it can disconnect
+without cancelling the call for the others. The execution must yield to
+the event loop while it waits (tool calls run on worker threads, see
+``tool_core``); otherwise only calls arriving in the same loop iteration
+find it in flight.
+
+Futures belong to one event loop, so calls are only coalesced with others
+on the same loop (background job workers each run their own).
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+import metrics
+
+COALESCED_CALLS = metrics.REGISTRY.counter(
+    "coalesced_calls_total", "Calls that started an execution (leader) or joined one in flight (follower)",
+    ["service", "tool", "role"]
+)
+COALESCING_IN_FLIGHT = metrics.REGISTRY.gauge(
+    "coalescing_in_flight", "Distinct executions in flight", ["service"]
+)
+
+
+class SingleFlight:
+    """One execution per key at a time; concurrent callers share its outcome"""
+
+    def __init__(self, service: str, enabled: bool = True):
+        self.service = service
+        self.enabled = enabled
+        self.leaders = 0
+        self.followers = 0
+        self._in_flight: Dict[Tuple[int, str], asyncio.Task] = {}
+
+    async def run(self, key: str, label: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Result of ``call()``, or of the identical call already in flight"""
+        if not self.enabled:
+            return await call()
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        task = self._in_flight.get(flight_key)
+        if task is None:
+            self.leaders += 1
+            COALESCED_CALLS.inc(service=self.service, tool=label, role="leader")
+            task = loop.create_task(call())
+            self._in_flight[flight_key] = task
+            COALESCING_IN_FLIGHT.set(len(self._in_flight), service=self.service)
+            task.add_done_callback(lambda _: self._finished(flight_key))
+        else:
+            self.followers += 1
+            COALESCED_CALLS.inc(service=self.service, tool=label, role="follower")
+        return await asyncio.shield(task)
+
+    def _finished(self, flight_key: Tuple[int, str]):
+        task = self._in_flight.pop(flight_key, None)
+        # Nobody may be left awaiting a failed execution
+        if task is not None and not task.cancelled():
+            task.exception()
+        COALESCING_IN_FLIGHT.set(len(self._in_flight), service=self.service)
+
+    def describe(self) -> Dict:
+        calls = self.leaders + self.followers
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._in_flight),
+            "executions": self.leaders,
+            "coalesced": self.followers,
+            "coalescing_ratio": round(self.followers / calls, 4) if calls else 0.0,
+        }
@@ -0,0 +1,341 @@
+"""Columnar snapshot of the transactions table for cross-user analytics.
+
+Searches without a ``user_id`` have no selective index and scan the whole
+table in MySQL. The engine keeps an in-memory copy of ``transactions`` as
+NumPy arrays, refreshed in the background every ``COLUMNAR_REFRESH_SECONDS``,
+and answers filtered counts, aggregates and top-N by date with vectorized
+scans. Low-cardinality text columns are dictionary-encoded, so equality
+filters compare integer codes. Like MySQL's default collation, filters and
+groups on them ignore case: ``category="food"`` matches ``Food``.
+
+The engine is optional: set ``COLUMNAR_ENGINE=1`` and install numpy. Queries
+only use the snapshot when it is younger than the caller's staleness limit.
+The snapshot holds the whole table in memory, so it suits the 1e4-1e6 row
+presets rather than 1e8.
+"""
+import importlib.util
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import metrics
+from rows import ResultSet
+
+# numpy is imported when an engine is enabled: importing it costs more than
+# the rest of a server's startup, and the engine is off by default
+np = None
+
+
+def _import_numpy() -> bool:
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:  # optional dependency
+            return False
+        np = numpy
+    return True
+
+logger = logging.getLogger("columnar")
+
+COLUMNAR_ENABLED = os.getenv("COLUMNAR_ENGINE", "0") == "1"
+REFRESH_SECONDS = float(os.getenv("COLUMNAR_REFRESH_SECONDS", "60"))
+# Default freshness requirement for queries that do not state one
+MAX_STALENESS_SECONDS = float(os.getenv("COLUMNAR_MAX_STALENESS_SECONDS", "300"))
+LOAD_BATCH_SIZE = 50_000
+
+COLUMNS = (
+    "transaction_id", "user_id", "transaction_date", "amount", "transaction_type",
+    "description", "status", "category", "merchant_name",
+)
+# Dictionary-encoded columns: filters compare codes instead of strings
+CODED_COLUMNS = ("user_id", "transaction_type", "status", "category", "merchant_name")
+
+SNAPSHOT_QUERY = f"SELECT {', '.join(COLUMNS)} FROM transactions"
+
+SNAPSHOT_ROWS = metrics.REGISTRY.gauge("columnar_snapshot_rows", "Rows in the columnar snapshot")
+SNAPSHOT_AGE = metrics.REGISTRY.gauge("columnar_snapshot_age_seconds", "Age of the columnar snapshot")
+REFRESH_DURATION = metrics.REGISTRY.histogram(
+    "columnar_refresh_duration_seconds", "Time to load a columnar snapshot"
+)
+REFRESH_FAILURES = metrics.REGISTRY.counter(
+    "columnar_refresh_failures_total", "Snapshot loads that failed"
+)
+COLUMNAR_QUERIES = metrics.REGISTRY.counter(
+    "columnar_queries_total", "Tool queries answered from the snapshot", ["tool"]
+)
+
+
+class UnsupportedQuery(Exception):
+    """The snapshot cannot answer this query; use MySQL instead"""
+
+
+def _to_datetime64(value) -> "np.datetime64":
+    if isinstance(value, str) and len(value) == 10:
+        value += " 00:00:00"
+    return np.datetime64(value, "s")
+
+
+class ColumnarSnapshot:
+    """Immutable column arrays for one load of the transactions table"""
+
+    def __init__(self, columns: Dict[str, list], loaded_at: float):
+        self.loaded_at = loaded_at
+        self.rows = len(columns["transaction_id"])
+        self.values: Dict[str, Any] = {}
+        self.codes: Dict[str, Dict[str, Any]] = {}  # casefolded value -> codes of its spellings
+        self.groups: Dict[str, Any] = {}  # code -> first code with the same casefolded value
+        self.columns: Dict[str, Any] = {}
+        for name in COLUMNS:
+            data = columns[name]
+            if name in CODED_COLUMNS:
+                values, codes = np.unique(
+                    np.array(["" if v is None else v for v in data], dtype=object), return_inverse=True
+                )
+                self.values[name] = values
+                spellings: Dict[str, List[int]] = {}
+                for code, value in enumerate(values):
+                    spellings.setdefault(str(value).casefold(), []).append(code)
+                self.codes[name] = {key: np.array(group, dtype=np.int32) for key, group in spellings.items()}
+                groups = np.arange(len(values), dtype=np.int32)
+                for group in spellings.values():
+                    groups[group] = group[0]
+                self.groups[name] = groups
+                self.columns[name] = codes.astype(np.int32)
+            elif name == "transaction_date":
+                self.columns[name] = np.array(data, dtype="datetime64[s]")
+            elif name == "amount":
+                self.columns[name] = np.array(data, dtype=np.float64)
+            else:
+                self.columns[name] = np.array(data, dtype=object)
+
+    @classmethod
+    def load(cls, connection, batch_size: int = LOAD_BATCH_SIZE) -> "ColumnarSnapshot":
+        """Read the whole table in batches from a dedicated connection"""
+        columns: Dict[str, list] = {name: [] for name in COLUMNS}
+        cursor = connection.cursor()
+        try:
+            cursor.execute(SNAPSHOT_QUERY)
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                for name, values in zip(COLUMNS, zip(*batch)):
+                    columns[name].extend(values)
+        finally:
+            cursor.close()
+        return cls(columns, time.time())
+
+    @property
+    def age_seconds(self) -> float:
+        return time.time() - self.loaded_at
+
+    def mask(self, filters: Dict[str, Any]):
+        """Boolean row mask for search_transactions-style filters"""
+        mask = np.ones(self.rows, dtype=bool)
+        for name, value in filters.items():
+            if name in CODED_COLUMNS:
+                codes = self.codes[name].get(str(value).casefold())
+                if codes is None:
+                    return np.zeros(self.rows, dtype=bool)
+                if len(codes) == 1:
+                    mask &= self.columns[name] == codes[0]
+                else:
+                    mask &= np.isin(self.columns[name], codes)
+            elif name == "min_amount":
+                mask &= self.columns["amount"] >= float(value)
+            elif name == "max_amount":
+                mask &= self.columns["amount"] <= float(value)
+            elif name == "start_date":
+                mask &= self.columns["transaction_date"] >= _to_datetime64(value)
+            elif name == "end_date":
+                # DATE(transaction_date) <= end_date includes the whole end day
+                mask &= self.columns["transaction_date"] < _to_datetime64(value) + np.timedelta64(1, "D")
+            else:
+                raise UnsupportedQuery(f"filter {name!r}")
+        return mask
+
+    def take(self, indexes) -> ResultSet:
+        """Rows at ``indexes`` as a ResultSet shaped like a MySQL result"""
+        columns = []
+        for name in COLUMNS:
+            values = self.columns[name][indexes]
+            if name in CODED_COLUMNS:
+                values = self.values[name][values]
+            columns.append(values.tolist())
+        return ResultSet(COLUMNS, list(zip(*columns)))
+
+    def search(self, filters: Dict[str, Any], limit: int) -> Tuple[ResultSet, int]:
+        """Newest ``limit`` matching rows and the total match count"""
+        matches = np.flatnonzero(self.mask(filters))
+        total = len(matches)
+        if limit <= 0:
+            return ResultSet(COLUMNS, []), total
+        if total > limit:
+            # Partial sort: only the newest ``limit`` rows are ordered
+            newest = np.argpartition(-self.columns["transaction_date"][matches].astype(np.int64), limit - 1)[:limit]
+            matches = matches[newest]
+        order = np.argsort(self.columns["transaction_date"][matches], kind="stable")[::-1]
+        return self.take(matches[order][:limit]), total
+
+    def _bucket(self, dimension: str, matches):
+        """Integer group keys for one aggregate dimension, in SQL ORDER BY order"""
+        if dimension in ("category", "transaction_type", "merchant"):
+            name = "merchant_name" if dimension == "merchant" else dimension
+            # Spellings differing only in case form one group, as in SQL's GROUP BY
+            return self.groups[name][self.columns[name][matches]].astype(np.int64)
+        dates = self.columns["transaction_date"][matches]
+        if dimension == "day":
+            return dates.astype("datetime64[D]").astype(np.int64)
+        if dimension == "month":
+            return dates.astype("datetime64[M]").astype(np.int64)
+        if dimension == "week":
+            # Day 0 (1970-01-01) is a Thursday: shift so weeks start on Monday
+            return (dates.astype("datetime64[D]").astype(np.int64) + 3) // 7
+        raise UnsupportedQuery(f"group by {dimension!r}")
+
+    def _label(self, dimension: str, key: int):
+        """Group key as the value the SQL query returns for that dimension"""
+        if dimension in ("category", "transaction_type", "merchant"):
+            return self.values["merchant_name" if dimension == "merchant" else dimension][key]
+        if dimension == "day":
+            return np.datetime64(int(key), "D").item()
+        if dimension == "month":
+            return str(np.datetime64(int(key), "M"))
+        monday = np.datetime64(int(key) * 7 - 3, "D").item()
+        year, week, _ = monday.isocalendar()
+        return year * 100 + week  # YEARWEEK(date, 3)
+
+    def aggregate(self, filters: Dict[str, Any], group_by: Tuple[str, ...], measures: Tuple[str, ...],
+                  limit: int) -> List[Dict[str, Any]]:
+        """Grouped measures (count, sum, avg, min, max, pNN) ordered by the group keys"""
+        matches = np.flatnonzero(self.mask(filters))
+        amounts = self.columns["amount"][matches]
+        if group_by:
+            keys = np.stack([self._bucket(d, matches) for d in group_by], axis=1)
+            groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+            inverse = inverse.reshape(-1)
+        else:
+            # Like SQL without GROUP BY: one row, even when nothing matches
+            groups = np.zeros((1, 0), dtype=np.int64)
+            inverse = np.zeros(len(matches), dtype=np.int64)
+        counts = np.bincount(inverse, minlength=len(groups))
+        sums = np.bincount(inverse, weights=amounts, minlength=len(groups))
+
+        if any(m not in ("count", "sum", "avg") for m in measures):
+            # Order amounts within each group once for min, max and percentiles
+            ordered = amounts[np.lexsort((amounts, inverse))]
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+        rows = []
+        for g in range(min(len(groups), limit)):
+            count = int(counts[g])
+            row = {d: self._label(d, key) for d, key in zip(group_by, groups[g])}
+            for measure in measures:
+                if measure == "count":
+                    value = count
+                elif not count:
+                    value = None
+                elif measure == "sum":
+                    value = float(sums[g])
+                elif measure == "avg":
+                    value = float(sums[g] / count)
+                elif measure == "min":
+                    value = float(ordered[starts[g]])
+                elif measure == "max":
+                    value = float(ordered[starts[g] + count - 1])
+                else:
+                    # Nearest-rank percentile, matching the SQL window query
+                    rank = (int(measure[1:]) * count + 99) // 100
+                    value = float(ordered[starts[g] + rank - 1])
+                row[measure] = value
+            rows.append(row)
+        return rows
+
+
+class ColumnarEngine:
+    """Holds the current snapshot and refreshes it on a background thread"""
+
+    def __init__(self, connection_factory: Callable[[], Any], refresh_seconds: float = REFRESH_SECONDS,
+                 enabled: bool = COLUMNAR_ENABLED):
+        self.connection_factory = connection_factory
+        self.refresh_seconds = refresh_seconds
+        self.enabled = enabled and _import_numpy()
+        self.snapshot: Optional[ColumnarSnapshot] = None
+        self.last_error: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        if enabled and not self.enabled:
+            logger.warning("COLUMNAR_ENGINE is set but numpy is not installed; using MySQL only")
+        metrics.REGISTRY.register_collector(self._collect)
+
+    def refresh(self) -> bool:
+        """Load a new snapshot and swap it in"""
+        started = time.perf_counter()
+        connection = None
+        try:
+            connection = self.connection_factory()
+            if connection is None:
+                raise RuntimeError("no database connection available")
+            snapshot = ColumnarSnapshot.load(connection)
+        except Exception as e:
+            REFRESH_FAILURES.inc()
+            self.last_error = str(e)
+            logger.warning("Columnar snapshot refresh failed: %s", e)
+            return False
+        finally:
+            if connection is not None:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+        elapsed = time.perf_counter() - started
+        REFRESH_DURATION.observe(elapsed)
+        self.snapshot = snapshot
+        self.last_error = None
+        logger.info("Columnar snapshot loaded: %d rows in %.2fs", snapshot.rows, elapsed)
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.refresh_seconds)
+
+    def start(self):
+        """Start periodic refreshes (no-op when disabled)"""
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="columnar-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def fresh_snapshot(self, max_staleness_seconds: float = MAX_STALENESS_SECONDS) -> Optional[ColumnarSnapshot]:
+        """The current snapshot if it satisfies the freshness requirement"""
+        snapshot = self.snapshot
+        if not self.enabled or snapshot is None or snapshot.age_seconds > max_staleness_seconds:
+            return None
+        return snapshot
+
+    def _collect(self):
+        snapshot = self.snapshot
+        if snapshot is not None:
+            SNAPSHOT_ROWS.set(snapshot.rows)
+            SNAPSHOT_AGE.set(round(snapshot.age_seconds, 3))
+
+    def describe(self) -> Dict[str, Any]:
+        snapshot = self.snapshot
+        return {
+            "enabled": self.enabled,
+            "numpy_available": np is not None or importlib.util.find_spec("numpy") is not None,
+            "refresh_seconds": self.refresh_seconds,
+            "max_staleness_seconds": MAX_STALENESS_SECONDS,
+            "rows": snapshot.rows if snapshot else 0,
+            "age_seconds": round(snapshot.age_seconds, 3) if snapshot else None,
+            "loaded_at": datetime.fromtimestamp(snapshot.loaded_at).isoformat() if snapshot else None,
+            "last_error": self.last_error,
+        }
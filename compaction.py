@@ -0,0 +1,183 @@
+"""Compacts MCP tool results before the orchestrator pastes them into a prompt.
+
+Transaction tools answer with one multi-line block per transaction. Those
+blocks are parsed back into records and rendered as CSV under the result's
+header lines. Rows are added newest first until the tool's token budget is
+reached; the rest are summarised in one rollup line ("...and 80 more
+totalling $X"). Other results pass through unchanged when they fit, and are
+cut at a line boundary when they do not.
+
+Token counts are estimated at four characters per token, which is close
+enough for budgeting and for reporting the tokens saved.
+
+Environment:
+    TOOL_RESULT_COMPACTION  set to 0 to send tool results verbatim
+    TOOL_TOKEN_BUDGETS      per-tool budgets, e.g. "search_transactions=400,get_transactions=600"
+"""
+import csv
+import io
+import os
+from typing import Dict, List, NamedTuple, Tuple
+
+import metrics
+
+COMPACTION_ENABLED = os.getenv("TOOL_RESULT_COMPACTION", "1") != "0"
+DEFAULT_TOKEN_BUDGET = 1000
+
+TOKEN_BUDGETS = {
+    "get_profile": 300,
+    "get_transactions": 800,
+    "get_transaction_summary": 600,
+    "search_transactions": 800,
+    "aggregate_transactions": 1000,
+}
+for _item in os.getenv("TOOL_TOKEN_BUDGETS", "").split(","):
+    if "=" in _item:
+        _tool, _, _budget = _item.partition("=")
+        TOKEN_BUDGETS[_tool.strip()] = int(_budget)
+
+# Transaction block labels and their CSV column names, in output order
+TRANSACTION_FIELDS = (
+    ("Transaction ID", "id"),
+    ("User ID", "user"),
+    ("Date", "date"),
+    ("Amount", "amount"),
+    ("Type", "type"),
+    ("Category", "category"),
+    ("Merchant", "merchant"),
+    ("Description", "description"),
+    ("Status", "status"),
+)
+_COLUMN_FOR_LABEL = dict(TRANSACTION_FIELDS)
+
+# Room kept for the rollup line when truncating
+ROLLUP_TOKENS = 25
+
+TOOL_RESULT_TOKENS = metrics.REGISTRY.counter(
+    "tool_result_tokens_total", "Estimated tool result tokens before and after compaction", ["tool", "stage"]
+)
+TOOL_RESULT_TOKENS_SAVED = metrics.REGISTRY.counter(
+    "tool_result_tokens_saved_total", "Estimated prompt tokens saved by compaction", ["tool"]
+)
+TOOL_RESULT_ROWS_OMITTED = metrics.REGISTRY.counter(
+    "tool_result_rows_omitted_total", "Rows replaced by a rollup line", ["tool"]
+)
+
+
+class CompactResult(NamedTuple):
+    text: str
+    original_tokens: int
+    compact_tokens: int
+    omitted_rows: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.compact_tokens
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def _is_separator(line: str) -> bool:
+    stripped = line.strip()
+    return len(stripped) >= 3 and set(stripped) <= {"=", "-"}
+
+
+def parse_transaction_blocks(text: str) -> Tuple[List[str], List[Dict[str, str]]]:
+    """Split a transaction tool result into header lines and per-transaction records"""
+    header: List[str] = []
+    records: List[Dict[str, str]] = []
+    for line in text.splitlines():
+        if not line.strip() or _is_separator(line):
+            continue
+        label, sep, value = line.partition(":")
+        label = label.strip()
+        if label == "Transaction ID":
+            records.append({})
+        if records and sep and label in _COLUMN_FOR_LABEL:
+            value = value.strip()
+            if label == "Amount":
+                # "$12.50" or "$12.50 (debit)"
+                amount, _, kind = value.partition(" ")
+                value = amount.lstrip("$")
+                if kind:
+                    records[-1]["type"] = kind.strip("()")
+            records[-1][_COLUMN_FOR_LABEL[label]] = value
+        elif not records:
+            header.append(line.strip())
+    return header, records
+
+
+def _amount(record: Dict[str, str]) -> float:
+    try:
+        return float(record.get("amount", "0").replace(",", ""))
+    except ValueError:
+        return 0.0
+
+
+def _rollup(omitted: List[Dict[str, str]]) -> str:
+    total = sum(_amount(r) for r in omitted)
+    credits = sum(_amount(r) for r in omitted if r.get("type") == "credit")
+    debits = sum(_amount(r) for r in omitted if r.get("type") == "debit")
+    line = f"...and {len(omitted)} more totalling ${total:,.2f}"
+    if credits and debits:
+        line += f" (credits ${credits:,.2f}, debits ${debits:,.2f})"
+    return line
+
+
+def _compact_transactions(header: List[str], records: List[Dict[str, str]], budget: int) -> Tuple[str, int]:
+    columns = [name for _, name in TRANSACTION_FIELDS if any(name in r for r in records)]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    buffer.write("\n".join(header) + "\n")
+    writer.writerow(columns)
+
+    limit = (budget - ROLLUP_TOKENS) * 4
+    shown = 0
+    for record in records:
+        row_start = buffer.tell()
+        writer.writerow([record.get(name, "") for name in columns])
+        if buffer.tell() > limit and shown:
+            buffer.seek(row_start)
+            buffer.truncate()
+            break
+        shown += 1
+
+    omitted = records[shown:]
+    if omitted:
+        buffer.write(_rollup(omitted) + "\n")
+    return buffer.getvalue().rstrip("\n"), len(omitted)
+
+
+def _truncate_lines(text: str, budget: int) -> Tuple[str, int]:
+    limit = (budget - ROLLUP_TOKENS) * 4
+    lines = text.splitlines()
+    size = 0
+    for kept, line in enumerate(lines):
+        size += len(line) + 1
+        if size > limit:
+            return "\n".join(lines[:kept] + [f"...and {len(lines) - kept} more lines"]), len(lines) - kept
+    return text, 0
+
+
+def compact_tool_result(tool_name: str, text: str) -> CompactResult:
+    """Render ``text`` for the LLM within the tool's token budget"""
+    original_tokens = estimate_tokens(text)
+    compact, omitted = text, 0
+
+    if COMPACTION_ENABLED:
+        budget = TOKEN_BUDGETS.get(tool_name, DEFAULT_TOKEN_BUDGET)
+        header, records = parse_transaction_blocks(text)
+        if records:
+            compact, omitted = _compact_transactions(header, records, budget)
+        elif original_tokens > budget:
+            compact, omitted = _truncate_lines(text, budget)
+
+    result = CompactResult(compact, original_tokens, estimate_tokens(compact), omitted)
+    TOOL_RESULT_TOKENS.inc(result.original_tokens, tool=tool_name, stage="original")
+    TOOL_RESULT_TOKENS.inc(result.compact_tokens, tool=tool_name, stage="compact")
+    TOOL_RESULT_TOKENS_SAVED.inc(max(result.tokens_saved, 0), tool=tool_name)
+    if omitted:
+        TOOL_RESULT_ROWS_OMITTED.inc(omitted, tool=tool_name)
+    return result
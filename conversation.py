@@ -0,0 +1,159 @@
+"""Conversation memory with a bounded prompt footprint.
+
+A conversation keeps its last ``CONVERSATION_RECENT_MESSAGES`` messages
+verbatim (each clipped to ``CONVERSATION_MESSAGE_TOKENS``) and folds older
+ones into a running summary of at most ``CONVERSATION_SUMMARY_TOKENS``.
+Folding runs as a background task that the chat turn never waits for, so
+it adds no latency to replies; messages still waiting to be folded are
+shown in a shorter clip meanwhile. The history part of a prompt is thereby
+bounded however long the conversation gets.
+
+The summary is written by the LLM through the ``summarize`` callback. If
+that fails, or with ``CONVERSATION_SUMMARIZER=extractive``, the opening
+words of each message are appended instead and the oldest lines dropped.
+
+Environment:
+    CONVERSATION_RECENT_MESSAGES  messages kept verbatim (default 6)
+    CONVERSATION_MESSAGE_TOKENS   clip per kept message (default 200)
+    CONVERSATION_SUMMARY_TOKENS   running summary budget (default 250)
+    CONVERSATION_FOLD_BATCH       messages collected per summary update (default 4)
+    CONVERSATION_SUMMARIZER       "llm" (default) or "extractive"
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import metrics
+from compaction import estimate_tokens
+
+logger = logging.getLogger("conversation")
+
+CONVERSATION_RECENT_MESSAGES = int(os.getenv("CONVERSATION_RECENT_MESSAGES", "6"))
+CONVERSATION_MESSAGE_TOKENS = int(os.getenv("CONVERSATION_MESSAGE_TOKENS", "200"))
+CONVERSATION_SUMMARY_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "250"))
+CONVERSATION_SUMMARIZER = os.getenv("CONVERSATION_SUMMARIZER", "llm")
+CONVERSATION_FOLD_BATCH = int(os.getenv("CONVERSATION_FOLD_BATCH", "4"))
+# Clip for messages waiting to be folded and for extractive summary lines
+PENDING_MESSAGE_TOKENS = 40
+
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+PROMPT_TOKENS = metrics.REGISTRY.histogram(
+    "chat_prompt_tokens", "Estimated routing prompt tokens per chat turn", ["part"], buckets=TOKEN_BUCKETS
+)
+SUMMARIES = metrics.REGISTRY.counter(
+    "conversation_summaries_total", "Older messages folded into a running summary", ["method"]
+)
+SUMMARY_SECONDS = metrics.REGISTRY.histogram(
+    "conversation_summary_seconds", "Time to fold messages into the summary", ["method"]
+)
+
+# (current summary, messages to fold) -> updated summary
+Summarizer = Callable[[str, List[Any]], Awaitable[str]]
+
+
+def clip(text: str, tokens: int) -> str:
+    """``text`` cut at a word boundary to about ``tokens`` tokens"""
+    if estimate_tokens(text) <= tokens:
+        return text
+    return text[:tokens * 4].rsplit(" ", 1)[0] + " …"
+
+
+def extractive_summary(summary: str, messages: List[Any], budget: int) -> str:
+    """The summary plus the opening words of each message, oldest lines dropped to fit"""
+    lines = [line for line in summary.splitlines() if line]
+    lines += [f"{m.role}: {clip(' '.join(m.content.split()), PENDING_MESSAGE_TOKENS)}" for m in messages]
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > budget:
+        lines.pop(0)
+    return clip("\n".join(lines), budget)
+
+
+class Conversation:
+    """Running summary, messages waiting to be folded, and the recent window"""
+
+    def __init__(self, conversation_id: str):
+        self.conversation_id = conversation_id
+        self.summary = ""
+        self.pending: List[Any] = []
+        self.recent: List[Any] = []
+        self.total_messages = 0
+        self._folding: Optional[asyncio.Task] = None
+
+    @property
+    def messages(self) -> List[Any]:
+        """Messages not yet folded into the summary, oldest first"""
+        return self.pending + self.recent
+
+    def prompt_history(self, message_tokens: int = CONVERSATION_MESSAGE_TOKENS) -> str:
+        """History section of the routing prompt"""
+        text = f"\nSummary of earlier conversation: {self.summary}" if self.summary else ""
+        for message in self.pending:
+            text += f"\n{message.role}: {clip(message.content, PENDING_MESSAGE_TOKENS)}"
+        for message in self.recent:
+            text += f"\n{message.role}: {clip(message.content, message_tokens)}"
+        return text
+
+
+class ConversationStore:
+    """Conversations by id; folds messages leaving the recent window in the background"""
+
+    def __init__(self, summarize: Optional[Summarizer] = None,
+                 recent_messages: int = CONVERSATION_RECENT_MESSAGES,
+                 summary_tokens: int = CONVERSATION_SUMMARY_TOKENS, fold_batch: int = CONVERSATION_FOLD_BATCH):
+        self.summarize = summarize if CONVERSATION_SUMMARIZER == "llm" else None
+        self.recent_messages = recent_messages
+        self.summary_tokens = summary_tokens
+        self.fold_batch = fold_batch
+        self._conversations: Dict[str, Conversation] = {}
+
+    def get(self, conversation_id: str) -> Conversation:
+        conversation = self._conversations.get(conversation_id)
+        if conversation is None:
+            conversation = self._conversations[conversation_id] = Conversation(conversation_id)
+        return conversation
+
+    def peek(self, conversation_id: str) -> Optional[Conversation]:
+        return self._conversations.get(conversation_id)
+
+    def delete(self, conversation_id: str):
+        conversation = self._conversations.pop(conversation_id, None)
+        if conversation is not None and conversation._folding is not None:
+            conversation._folding.cancel()
+
+    def append(self, conversation: Conversation, *messages: Any):
+        conversation.recent.extend(messages)
+        conversation.total_messages += len(messages)
+        overflow = len(conversation.recent) - self.recent_messages
+        if overflow > 0:
+            conversation.pending.extend(conversation.recent[:overflow])
+            del conversation.recent[:overflow]
+        # One summary update per few turns rather than per message
+        if len(conversation.pending) >= self.fold_batch:
+            if conversation._folding is None or conversation._folding.done():
+                conversation._folding = asyncio.get_running_loop().create_task(self._fold(conversation))
+
+    async def _fold(self, conversation: Conversation):
+        # Messages appended while a batch is being summarised are picked up by the next pass
+        while conversation.pending:
+            batch = list(conversation.pending)
+            started = time.perf_counter()
+            method = "llm" if self.summarize else "extractive"
+            summary = None
+            if self.summarize:
+                try:
+                    summary = clip((await self.summarize(conversation.summary, batch)).strip(), self.summary_tokens)
+                except Exception as e:
+                    logger.warning("Summarizing conversation %s failed: %s", conversation.conversation_id, e)
+                    method = "fallback"
+            if not summary:
+                method = "fallback" if self.summarize else method
+                summary = extractive_summary(conversation.summary, batch, self.summary_tokens)
+            conversation.summary = summary
+            del conversation.pending[:len(batch)]
+            SUMMARIES.inc(method=method)
+            SUMMARY_SECONDS.observe(time.perf_counter() - started, method=method)
+
+    def __len__(self) -> int:
+        return len(self._conversations)
@@ -0,0 +1,381 @@
+"""Database connections with read-replica routing for the MCP servers.
+
+A ``DatabaseRouter`` owns one primary and any number of replicas. Every
+tool query is read-only, so reads go to a healthy replica picked at random,
+weighted by its configured weight and current replication lag. A replica
+lagging more than ``max_lag_seconds`` is skipped. Reads fall back to the
+primary when no replica qualifies, or when the request asks for
+read-your-writes consistency.
+
+Replicas come from ``DB_REPLICAS``, e.g. ``"10.0.0.2:3306,10.0.0.3:3306@2"``
+(``@weight`` is optional). They share the primary's user, password and
+database. To try this locally, start two MySQL-compatible servers on
+ports 3307 and 3308, seed both with ``seed_data.py --port ...``, and set
+``DB_REPLICAS=127.0.0.1:3307,127.0.0.1:3308``.
+
+Each node has a circuit breaker (see ``resilience.py``): after
+``DB_BREAKER_FAILURES`` consecutive connect or connection-level query
+failures, reads skip the node without attempting a connect, and one probe
+is let through every ``DB_BREAKER_RESET_SECONDS``.
+
+Tool calls run on worker threads (``tool_core.tool_workers``), as do
+background jobs (see ``jobs.py``). Each such thread binds
+``WorkerConnections`` and reads over its own dedicated connection to the
+node the router picks, instead of the shared per-node ones, which serve
+direct callers and lag checks.
+"""
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import metrics
+from resilience import CircuitBreaker
+from statement_cache import drop_statement_cache
+
+logger = logging.getLogger("db")
+
+MAX_REPLICA_LAG_SECONDS = float(os.getenv("DB_MAX_REPLICA_LAG_SECONDS", "5"))
+LAG_CHECK_INTERVAL_SECONDS = float(os.getenv("DB_LAG_CHECK_INTERVAL_SECONDS", "5"))
+DB_CONNECT_TIMEOUT_SECONDS = int(os.getenv("DB_CONNECT_TIMEOUT_SECONDS", "3"))
+DB_BREAKER_FAILURES = int(os.getenv("DB_BREAKER_FAILURES", "3"))
+# How long a node whose breaker opened is left out of rotation before a probe
+DB_BREAKER_RESET_SECONDS = float(os.getenv("DB_BREAKER_RESET_SECONDS", "10"))
+
+DB_ROUTED = metrics.REGISTRY.counter(
+    "db_reads_routed_total", "Read queries routed to each database node", ["node", "reason"]
+)
+DB_REPLICA_LAG = metrics.REGISTRY.gauge(
+    "db_replica_lag_seconds", "Last measured replication lag", ["node"]
+)
+DB_NODE_HEALTHY = metrics.REGISTRY.gauge(
+    "db_node_healthy", "1 if the node accepted its last connection attempt", ["node"]
+)
+
+_read_your_writes: contextvars.ContextVar[bool] = contextvars.ContextVar("read_your_writes", default=False)
+_worker_connections: contextvars.ContextVar[Optional["WorkerConnections"]] = contextvars.ContextVar(
+    "worker_connections", default=None
+)
+
+
+def set_read_your_writes(enabled: bool) -> contextvars.Token:
+    """Route the current request's reads to the primary"""
+    return _read_your_writes.set(enabled)
+
+
+def reset_read_your_writes(token: contextvars.Token):
+    _read_your_writes.reset(token)
+
+
+def read_your_writes_requested() -> bool:
+    return _read_your_writes.get()
+
+
+def bind_worker_connections(connections: "WorkerConnections") -> contextvars.Token:
+    """Serve the current thread's reads from ``connections``"""
+    return _worker_connections.set(connections)
+
+
+def parse_replicas(value: str, primary_config: Dict) -> List[Dict]:
+    """Parse ``host:port[@weight],...`` into connection configs"""
+    replicas = []
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        address, _, weight = item.partition("@")
+        host, _, port = address.partition(":")
+        replicas.append(dict(
+            primary_config,
+            host=host,
+            port=int(port or primary_config['port']),
+            weight=float(weight or 1),
+        ))
+    return replicas
+
+
+def mysql_connect(config: Dict):
+    """Open an autocommit mysql.connector connection for ``config``"""
+    import mysql.connector
+
+    return mysql.connector.connect(
+        host=config['host'],
+        user=config['user'],
+        password=config['password'],
+        database=config['database'],
+        port=config['port'],
+        autocommit=True,
+        connection_timeout=DB_CONNECT_TIMEOUT_SECONDS,
+    )
+
+
+def release_connection(connection):
+    """Close ``connection`` and the prepared statements cached on it, ignoring errors"""
+    if connection is None:
+        return
+    drop_statement_cache(connection)
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+class DatabaseNode:
+    """One MySQL server: its connection, health and replication lag"""
+
+    def __init__(self, name: str, config: Dict, role: str,
+                 connect_fn: Callable[[Dict], object] = mysql_connect):
+        self.name = name
+        self.config = config
+        self.role = role
+        self.weight = float(config.get('weight', 1))
+        self.connect_fn = connect_fn
+        self.connection = None
+        self.healthy = True
+        self.breaker = CircuitBreaker(f"db:{name}", DB_BREAKER_FAILURES, DB_BREAKER_RESET_SECONDS)
+        self.lag_seconds: Optional[float] = 0.0
+        self.last_lag_check = 0.0
+
+    def connect(self) -> bool:
+        """(Re)open the connection; returns False and marks the node unhealthy on failure"""
+        release_connection(self.connection)
+        try:
+            self.connection = self.connect_fn(self.config)
+            self.healthy = True
+            self.breaker.record_success()
+            logger.info("Connected to MySQL %s %s:%s", self.role, self.config['host'], self.config['port'])
+        except Exception as e:
+            self.connection = None
+            self.healthy = False
+            self.breaker.record_failure()
+            logger.error("Database connection to %s failed: %s", self.name, e)
+        DB_NODE_HEALTHY.set(1 if self.healthy else 0, node=self.name)
+        return self.healthy
+
+    def get_connection(self):
+        """The open connection, reconnecting if it dropped; None if unreachable or the breaker is open"""
+        if self.connection is None or not self.connection.is_connected():
+            if not self.breaker.allow() or not self.connect():
+                return None
+        return self.connection
+
+    def open_dedicated(self):
+        """A new connection owned by the caller; None if the breaker is open or the connect fails"""
+        if not self.breaker.allow():
+            return None
+        try:
+            connection = self.connect_fn(self.config)
+        except Exception as e:
+            self.breaker.record_failure()
+            logger.warning("Dedicated connection to %s failed: %s", self.name, e)
+            return None
+        self.breaker.record_success()
+        return connection
+
+    def report_failure(self):
+        """A connection-level error on this node's connection: drop it and count it against the breaker"""
+        release_connection(self.connection)
+        self.connection = None
+        self.healthy = False
+        self.breaker.record_failure()
+        DB_NODE_HEALTHY.set(0, node=self.name)
+
+    def available(self) -> bool:
+        return self.breaker.state != "open"
+
+    def refresh_lag(self):
+        """Measure replication lag; empty status means a standalone stand-in (no lag)"""
+        self.last_lag_check = time.monotonic()
+        connection = self.get_connection()
+        if connection is None:
+            return
+        try:
+            cursor = connection.cursor(dictionary=True)
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except Exception:
+                cursor.execute("SHOW SLAVE STATUS")
+            status = cursor.fetchone()
+            cursor.close()
+        except Exception as e:
+            logger.warning("Could not read replication status from %s: %s", self.name, e)
+            return
+
+        if not status:
+            self.lag_seconds = 0.0
+        else:
+            lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+            # NULL lag means replication is not running: treat the replica as stale
+            self.lag_seconds = float(lag) if lag is not None else None
+        DB_REPLICA_LAG.set(self.lag_seconds if self.lag_seconds is not None else -1, node=self.name)
+
+    def describe(self) -> Dict:
+        return {
+            "name": self.name,
+            "role": self.role,
+            "host": self.config['host'],
+            "port": self.config['port'],
+            "weight": self.weight,
+            "healthy": self.healthy,
+            "connected": self.connection is not None,
+            "lag_seconds": self.lag_seconds,
+            "breaker": self.breaker.describe(),
+        }
+
+
+class DatabaseRouter:
+    """Routes read-only tool queries across a primary and its replicas"""
+
+    def __init__(self, primary_config: Dict, replica_configs: Optional[List[Dict]] = None,
+                 max_lag_seconds: float = MAX_REPLICA_LAG_SECONDS,
+                 connect_fn: Callable[[Dict], object] = mysql_connect):
+        self.primary = DatabaseNode("primary", primary_config, "primary", connect_fn)
+        self.replicas = [
+            DatabaseNode(f"replica-{i}", config, "replica", connect_fn)
+            for i, config in enumerate(replica_configs or [], start=1)
+        ]
+        self.max_lag_seconds = max_lag_seconds
+        self._lock = threading.Lock()
+
+    @property
+    def nodes(self) -> List[DatabaseNode]:
+        return [self.primary] + self.replicas
+
+    def _refresh_stale_lag(self):
+        now = time.monotonic()
+        for replica in self.replicas:
+            if replica.available() and now - replica.last_lag_check >= LAG_CHECK_INTERVAL_SECONDS:
+                replica.refresh_lag()
+
+    def _replica_score(self, replica: DatabaseNode) -> float:
+        """Routing weight: configured weight, discounted by lag"""
+        if not replica.available() or replica.lag_seconds is None or replica.lag_seconds > self.max_lag_seconds:
+            return 0.0
+        return replica.weight / (1.0 + replica.lag_seconds)
+
+    def _read_order(self, primary: bool = False) -> List[Tuple[DatabaseNode, str]]:
+        """Nodes to try for a read, best first, each with its routing reason.
+
+        Replicas come in weighted random order, leaving out those whose
+        breaker is open or whose lag (refreshed when stale) is too high; the
+        primary comes last.
+        """
+        if primary:
+            return [(self.primary, "read_your_writes")]
+        if not self.replicas:
+            return [(self.primary, "no_replicas")]
+        with self._lock:
+            self._refresh_stale_lag()
+        candidates = [(replica, self._replica_score(replica)) for replica in self.replicas]
+        candidates = [(replica, score) for replica, score in candidates if score > 0]
+        order = []
+        while candidates:
+            pick = random.choices(range(len(candidates)), weights=[score for _, score in candidates])[0]
+            order.append((candidates.pop(pick)[0], "replica"))
+        order.append((self.primary, "replica_fallback"))
+        return order
+
+    def checkout_read(self):
+        """A connection for a read-only query, preferring replicas.
+
+        The node is picked per call, so a replica that starts lagging or
+        failing stops getting reads even on a worker thread's connections.
+        """
+        worker = _worker_connections.get()
+        if worker is not None and worker.router is not self:
+            worker.rebind(self)
+        for node, reason in self._read_order(primary=_read_your_writes.get()):
+            connection = worker.connection(node) if worker is not None else node.get_connection()
+            if connection is not None:
+                DB_ROUTED.inc(node=node.name, reason=reason)
+                return connection
+        return None
+
+    def open_dedicated_connection(self, primary: bool = False):
+        """A new connection owned by the caller, preferring replicas (weighted like ``checkout_read``)"""
+        for node, _ in self._read_order(primary=primary):
+            connection = node.open_dedicated()
+            if connection is not None:
+                return connection
+        return None
+
+    def read_available(self) -> bool:
+        """False while every node's breaker is open, i.e. reads would fail without trying"""
+        return any(node.available() for node in self.nodes)
+
+    def retry_after(self) -> float:
+        """Seconds until the next node probe"""
+        return min(node.breaker.retry_after() for node in self.nodes)
+
+    def report_failure(self, connection):
+        """Attribute a connection-level query error to the node owning ``connection``"""
+        worker = _worker_connections.get()
+        node = worker.discard(connection) if worker is not None else None
+        if node is not None:
+            # The node's shared connection may still be fine; only the breaker hears of it
+            node.breaker.record_failure()
+            return
+        for node in self.nodes:
+            if node.connection is connection:
+                node.report_failure()
+                return
+
+    def describe(self) -> Dict:
+        return {
+            "max_lag_seconds": self.max_lag_seconds,
+            "nodes": [node.describe() for node in self.nodes],
+        }
+
+
+class WorkerConnections:
+    """Dedicated connections owned by one worker thread, one per node, opened on first use.
+
+    Which node serves a read is still decided per query by the router. A
+    router other than the bound one (e.g. a replaced ``tool_core.db_router``)
+    rebinds the worker on its first read.
+    Connections are reused without a liveness ping: a dropped one fails its
+    query, which reports it (``DatabaseRouter.report_failure``) so the next
+    read reconnects.
+    """
+
+    def __init__(self, router: DatabaseRouter):
+        self.router = router
+        self._connections: Dict[str, object] = {}
+        self._nodes: Dict[str, DatabaseNode] = {}
+
+    def connection(self, node: DatabaseNode):
+        """This thread's connection to ``node``, opened if needed; None if that fails"""
+        current = self._connections.get(node.name)
+        if current is None:
+            current = node.open_dedicated()
+            if current is None:
+                return None
+            self._connections[node.name] = current
+            self._nodes[node.name] = node
+        return current
+
+    def warm(self):
+        """Open the connection the next read would most likely use"""
+        for node, _ in self.router._read_order():
+            if self.connection(node) is not None:
+                return
+
+    def discard(self, connection) -> Optional[DatabaseNode]:
+        """Drop ``connection`` after a connection-level error; returns the node it was to"""
+        for name, current in list(self._connections.items()):
+            if current is connection:
+                del self._connections[name]
+                release_connection(connection)
+                return self._nodes.pop(name)
+        return None
+
+    def rebind(self, router: DatabaseRouter):
+        """Serve ``router`` from now on, closing the connections to the previous one's nodes"""
+        self.close()
+        self.router = router
+
+    def close(self):
+        for connection in self._connections.values():
+            release_connection(connection)
+        self._connections.clear()
+        self._nodes.clear()
@@ -0,0 +1,367 @@
+"""Local intent routing for trivial tool requests.
+
+``classify`` matches a message against keyword rules and returns the tool
+call the routing LLM would make, with extracted arguments and a confidence,
+or None. It covers per-user lookups ("my profile", "last 5 transactions",
+"spending summary") and filtered searches whose filters it can extract
+(category, amount range, credit/debit, ISO dates, "at <Merchant>"). Every
+word the rules do not account for lowers the confidence, so a message that
+says more than the rules understand falls back to the LLM. "from Alice"
+reads just like "from Amazon", so searches with a free-text filter stay
+below the default ``min_confidence``: they are prefetched, not answered. Aggregates and
+follow-ups that depend on earlier turns are always left to the LLM.
+
+``IntentRouter`` adds an optional naive Bayes classifier, trained on
+labelled examples, for phrasings the rules miss. The orchestrator answers
+intents at or above ``min_confidence`` without the routing LLM call, and
+prefetches less certain ones (see ``prefetch``).
+
+``python -m benchmarks.intent_eval`` reports accuracy and latency on the
+labelled set in ``benchmarks/intent_eval.jsonl``.
+"""
+import json
+import math
+import re
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import metrics
+
+# Confidence lost per word the rules do not account for
+UNKNOWN_WORD_PENALTY = 0.1
+# Highest confidence of a rule match carrying a free-text ("at/from <Name>") filter;
+# the name may be a person rather than a merchant
+FREE_TEXT_MAX_CONFIDENCE = 0.85
+
+_USER_ID_RE = re.compile(r"\b(?:(?:for|of|from)\s+)?(?:user\s+)?(u\d{3,})\b", re.IGNORECASE)
+_ALL_USERS_RE = re.compile(
+    r"\b(?:across\s+)?(?:all\s+users|every\s*one|every\s*body|any\s*one|all\s+accounts)\b", re.IGNORECASE
+)
+_FIRST_PERSON_RE = re.compile(r"\b(i|me|my|mine|myself)\b")
+_LIMIT_RE = re.compile(
+    r"\b(?:last|latest|recent|top|first)\s+(\d{1,3})\b|\b(\d{1,3})\s+(?:most\s+)?(?:recent|latest|last)\b"
+    r"|\b(\d{1,3})\s+(?=transactions?\b)"
+)
+_DATE = r"(\d{4}-\d{2}-\d{2})"
+_DATE_RANGE_RE = re.compile(rf"\bbetween\s+{_DATE}\s+and\s+{_DATE}\b|\bfrom\s+{_DATE}\s+(?:to|until)\s+{_DATE}\b")
+_START_DATE_RE = re.compile(rf"\b(?:since|after|from|starting)\s+{_DATE}\b")
+_END_DATE_RE = re.compile(rf"\b(?:before|until|through|up\s+to)\s+{_DATE}\b")
+_YEAR_RE = re.compile(r"\bin\s+((?:19|20)\d{2})\b")
+_AMOUNT = r"\$?\s?(\d+(?:\.\d+)?)(?:\s*(?:dollars|usd))?"
+_AMOUNT_RANGE_RE = re.compile(rf"\bbetween\s+{_AMOUNT}\s+and\s+{_AMOUNT}")
+_MIN_AMOUNT_RE = re.compile(rf"\b(?:over|above|more\s+than|greater\s+than|at\s+least|exceeding)\s+{_AMOUNT}")
+_MAX_AMOUNT_RE = re.compile(rf"\b(?:under|below|less\s+than|at\s+most|up\s+to)\s+{_AMOUNT}")
+_TYPE_RE = re.compile(r"\b(credit|debit)s?\b|\b(incoming|income|deposits?)\b|\b(outgoing|withdrawals?)\b")
+# Capitalised words after "at"/"from"/"with" in the original message name a merchant
+_MERCHANT_RE = re.compile(r"\b(?:at|from|with)\s+([A-Z][\w&'.-]*(?:\s+[A-Z][\w&'.-]*)*)")
+_MONTHS = frozenset(
+    "january february march april may june july august september october november december".split()
+)
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Messages the LLM must handle: aggregates, follow-ups referring to earlier
+# turns, questions about the data and requests to change it
+_AGGREGATE_RE = re.compile(
+    r"\b(average|avg|mean|median|percentile|p\d{2}|sum|totals?|per|group(?:ed)?|breakdown|how\s+much|how\s+many|count)\b"
+    r"|\bby\s+(?:month|week|day|category|merchant|type)\b"
+)
+_CONTEXT_RE = re.compile(r"\b(it|that|those|them|these|again|same|instead|also|else|what\s+about|how\s+about)\b")
+_QUESTION_RE = re.compile(
+    r"\bwhat\s+(?:is|are|does)\s+an?\b|\b(explain|why|how\s+do|how\s+can|mean|means)\b"
+    r"|\b(delete|remove|update|change|edit|add|create|cancel|dispute)\b"
+)
+
+_PROFILE_RE = re.compile(r"\b(profile|account\s+(?:details|info(?:rmation)?)|my\s+details|who\s+am\s+i)\b")
+_SUMMARY_RE = re.compile(r"\b(summary|summari[sz]e|overview|financial\s+snapshot)\b")
+_TRANSACTIONS_RE = re.compile(r"\b(transactions?|purchases|payments|spending|activity|history|statement)\b")
+
+CATEGORY_WORDS = {
+    "food": ("food", "dining", "restaurants", "restaurant", "groceries", "grocery"),
+    "shopping": ("shopping",),
+    "transport": ("transport", "transportation", "rides", "commute"),
+    "utilities": ("utilities", "utility", "bills"),
+    "entertainment": ("entertainment", "streaming"),
+    "health": ("health", "healthcare", "medical", "pharmacy"),
+    "travel": ("travel", "flights", "hotels"),
+    "salary": ("salary", "payroll", "paycheck", "paychecks"),
+    "refund": ("refund", "refunds"),
+    "transfer": ("transfer", "transfers"),
+}
+_CATEGORY_RE = re.compile(
+    r"\b(" + "|".join(word for words in CATEGORY_WORDS.values() for word in words) + r")\b"
+)
+_CATEGORY_OF = {word: category for category, words in CATEGORY_WORDS.items() for word in words}
+
+# Words that carry no meaning beyond what the rules extract
+KNOWN_WORDS = frozenset("""
+a an the of for to in on at from with and or please pls can could would will you your i im me my mine
+show list display see view get give fetch pull up find search look lookup tell about want need like let
+what whats is are was were do does did have has had some any all just only current currently m s
+recent recently latest last most newest top first new now today
+profile account details info information who am
+transaction transactions purchases payments spending activity history statement statements
+summary summarize summarise overview financial snapshot finances
+category categories type amount amounts dollars usd than more less greater least over above under below
+between since after before until through starting exceeding
+user users
+""".split())
+
+INTENT_ROUTED = metrics.REGISTRY.counter(
+    "intent_router_total",
+    "Chat messages by routing outcome (local: answered without the routing LLM call)",
+    ["rule", "outcome"],
+)
+INTENT_ROUTE_SECONDS = metrics.REGISTRY.histogram(
+    "intent_router_seconds", "Local intent routing latency",
+    buckets=(0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01),
+)
+
+
+class Intent(NamedTuple):
+    tool: str
+    arguments: Dict[str, Any]
+    confidence: float
+    rule: str
+
+
+def with_defaults(arguments: Dict[str, Any], schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """``arguments`` plus the schema's defaults for properties left out"""
+    filled = dict(arguments)
+    for name, prop in ((schema or {}).get("properties") or {}).items():
+        if "default" in prop and filled.get(name) is None:
+            filled[name] = prop["default"]
+    return filled
+
+
+def _number(value: str):
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+
+def extract_filters(message: str) -> Tuple[Dict[str, Any], str]:
+    """Search filters found in ``message`` and the lowercased text left once they are removed"""
+    filters: Dict[str, Any] = {}
+    merchant = _MERCHANT_RE.search(message)
+    if merchant and not _USER_ID_RE.fullmatch(merchant.group(1)) and (
+            merchant.group(1).split()[0].lower() not in _MONTHS):
+        filters["text"] = merchant.group(1)
+        message = message[:merchant.start()] + " " + message[merchant.end():]
+    text = message.lower()
+
+    def take(pattern: "re.Pattern", handle) -> None:
+        nonlocal text
+        match = pattern.search(text)
+        if match:
+            handle(match)
+            text = text[:match.start()] + " " + text[match.end():]
+
+    def date_range(m):
+        start, end = (m.group(1), m.group(2)) if m.group(1) else (m.group(3), m.group(4))
+        filters["start_date"], filters["end_date"] = start, end
+
+    def year(m):
+        filters["start_date"], filters["end_date"] = f"{m.group(1)}-01-01", f"{m.group(1)}-12-31"
+
+    def amount_range(m):
+        filters["min_amount"], filters["max_amount"] = _number(m.group(1)), _number(m.group(2))
+
+    def transaction_type(m):
+        filters["transaction_type"] = m.group(1) or ("credit" if m.group(2) else "debit")
+
+    take(_DATE_RANGE_RE, date_range)
+    take(_START_DATE_RE, lambda m: filters.__setitem__("start_date", m.group(1)))
+    take(_END_DATE_RE, lambda m: filters.__setitem__("end_date", m.group(1)))
+    take(_YEAR_RE, year)
+    take(_AMOUNT_RANGE_RE, amount_range)
+    take(_MIN_AMOUNT_RE, lambda m: filters.__setitem__("min_amount", _number(m.group(1))))
+    take(_MAX_AMOUNT_RE, lambda m: filters.__setitem__("max_amount", _number(m.group(1))))
+    take(_TYPE_RE, transaction_type)
+    take(_CATEGORY_RE, lambda m: filters.__setitem__("category", _CATEGORY_OF[m.group(1)]))
+    return filters, text
+
+
+def _unknown_words(text: str) -> int:
+    return sum(1 for word in _WORD_RE.findall(text) if word not in KNOWN_WORDS)
+
+
+def needs_llm(lowered: str) -> bool:
+    return any(pattern.search(lowered) for pattern in (_AGGREGATE_RE, _CONTEXT_RE, _QUESTION_RE))
+
+
+def classify(message: str, user_id: str) -> Optional[Intent]:
+    """The likely tool call for ``message`` sent by ``user_id``, or None"""
+    lowered = (message or "").lower()
+    if needs_llm(lowered):
+        return None
+
+    mentioned = _USER_ID_RE.search(message or "")
+    rest = message or ""
+    if mentioned:
+        rest = rest[:mentioned.start()] + " " + rest[mentioned.end():]
+    all_users = _ALL_USERS_RE.search(lowered) is not None
+    if all_users:
+        rest = _ALL_USERS_RE.sub(" ", rest)
+    filters, rest = extract_filters(rest)
+    limit = _LIMIT_RE.search(rest)
+    if limit:
+        rest = rest[:limit.start()] + " " + rest[limit.end():]
+    arguments: Dict[str, Any] = {}
+    if not all_users:
+        arguments["user_id"] = mentioned.group(1).upper() if mentioned else user_id
+
+    if _PROFILE_RE.search(lowered):
+        if filters or limit or all_users:
+            return None
+        tool, rule, confidence = "get_profile", "profile", 0.95
+    elif _SUMMARY_RE.search(lowered):
+        if filters or limit or all_users:
+            return None
+        tool, rule, confidence = "get_transaction_summary", "summary", 0.92
+    elif filters or (all_users and _TRANSACTIONS_RE.search(lowered)):
+        tool, rule, confidence = "search_transactions", "search", 0.92
+        arguments.update(filters)
+    elif _TRANSACTIONS_RE.search(lowered):
+        tool, rule, confidence = "get_transactions", "transactions", 0.92
+    else:
+        return None
+    if limit and tool in ("get_transactions", "search_transactions"):
+        arguments["limit"] = int(next(g for g in limit.groups() if g))
+
+    confidence -= UNKNOWN_WORD_PENALTY * _unknown_words(rest)
+    if mentioned and not all_users:
+        confidence -= 0.02  # another user's data: slightly less sure than "my ..."
+    if "text" in arguments:
+        confidence = min(confidence, FREE_TEXT_MAX_CONFIDENCE)
+    return Intent(tool, arguments, round(confidence, 3), rule) if confidence > 0 else None
+
+
+_NUMBER_RE = re.compile(r"\$?\d+(?:\.\d+)?")
+
+
+def _features(text: str) -> List[str]:
+    text = _USER_ID_RE.sub(" <user> ", text.lower())
+    text = re.sub(_DATE, " <date> ", text)
+    words = _WORD_RE.findall(_NUMBER_RE.sub(" num ", text))
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+class NaiveBayesClassifier:
+    """Multinomial naive Bayes over word unigrams and bigrams; labels are tool names or ``none``"""
+
+    def __init__(self, alpha: float = 0.5):
+        self.alpha = alpha
+        self.labels: List[str] = []
+        self._log_prior: Dict[str, float] = {}
+        self._log_likelihood: Dict[str, Dict[str, float]] = {}
+        self._log_unseen: Dict[str, float] = {}
+
+    def fit(self, examples: Iterable[Tuple[str, str]]) -> "NaiveBayesClassifier":
+        docs: Counter = Counter()
+        counts: Dict[str, Counter] = defaultdict(Counter)
+        for text, label in examples:
+            docs[label] += 1
+            counts[label].update(_features(text))
+        vocabulary = set().union(*counts.values()) if counts else set()
+        total_docs = sum(docs.values())
+        self.labels = sorted(docs)
+        for label in self.labels:
+            total = sum(counts[label].values()) + self.alpha * (len(vocabulary) + 1)
+            self._log_prior[label] = math.log(docs[label] / total_docs)
+            self._log_likelihood[label] = {
+                feature: math.log((count + self.alpha) / total) for feature, count in counts[label].items()
+            }
+            self._log_unseen[label] = math.log(self.alpha / total)
+        return self
+
+    def predict(self, text: str) -> Tuple[Optional[str], float]:
+        """``(label, posterior probability)``, or ``(None, 0.0)`` when untrained"""
+        if not self.labels:
+            return None, 0.0
+        features = _features(text)
+        scores = {}
+        for label in self.labels:
+            likelihood, unseen = self._log_likelihood[label], self._log_unseen[label]
+            scores[label] = self._log_prior[label] + sum(likelihood.get(f, unseen) for f in features)
+        best = max(scores, key=scores.get)
+        top = scores[best]
+        total = sum(math.exp(score - top) for score in scores.values())
+        return best, 1.0 / total
+
+    @classmethod
+    def from_jsonl(cls, path: str) -> "NaiveBayesClassifier":
+        """Train on labelled examples: one ``{"message": ..., "tool": name or null}`` per line"""
+        with open(path) as f:
+            examples = [json.loads(line) for line in f if line.strip()]
+        return cls().fit((example["message"], example.get("tool") or "none") for example in examples)
+
+
+class IntentRouter:
+    """Rules first, then the optional classifier, limited to tools in ``tool_schemas``"""
+
+    # The classifier only names the tool. Its guesses are capped below the
+    # default min_confidence, so unless that is lowered they are prefetched only
+    CLASSIFIER_MAX_CONFIDENCE = 0.85
+
+    def __init__(self, tool_schemas: Dict[str, Optional[Dict[str, Any]]], min_confidence: float = 0.9,
+                 classifier: Optional[NaiveBayesClassifier] = None):
+        self.tool_schemas = tool_schemas
+        self.min_confidence = min_confidence
+        self.classifier = classifier
+
+    def _valid(self, intent: Intent) -> bool:
+        if intent.tool not in self.tool_schemas:
+            return False
+        schema = self.tool_schemas[intent.tool] or {}
+        properties = schema.get("properties") or {}
+        return (all(name in properties for name in intent.arguments)
+                and all(name in intent.arguments for name in schema.get("required", ())))
+
+    def _from_classifier(self, message: str, user_id: str) -> Optional[Intent]:
+        tool, probability = self.classifier.predict(message)
+        if tool in (None, "none"):
+            return None
+        arguments: Dict[str, Any] = {}
+        mentioned = _USER_ID_RE.search(message)
+        if tool in ("get_profile", "get_transactions", "get_transaction_summary"):
+            # Without "my" or an ID the message may name someone else ("Acme's profile")
+            if not mentioned and not _FIRST_PERSON_RE.search(message.lower()):
+                return None
+            arguments["user_id"] = mentioned.group(1).upper() if mentioned else user_id
+        elif tool == "search_transactions":
+            arguments, _ = extract_filters(message)
+            if not arguments:
+                return None  # a search without filters it can extract is the LLM's job
+            if mentioned:
+                arguments["user_id"] = mentioned.group(1).upper()
+            elif _FIRST_PERSON_RE.search(message.lower()):
+                arguments["user_id"] = user_id
+            elif not _ALL_USERS_RE.search(message):
+                return None
+        else:
+            return None
+        return Intent(tool, arguments, round(min(probability, self.CLASSIFIER_MAX_CONFIDENCE), 3), "classifier")
+
+    def classify(self, message: str, user_id: str) -> Optional[Intent]:
+        intent = classify(message, user_id)
+        if intent is not None and intent.confidence >= self.min_confidence and self._valid(intent):
+            return intent
+        if self.classifier is not None and not needs_llm(message.lower()):
+            guess = self._from_classifier(message, user_id)
+            if guess is not None and self._valid(guess) and (intent is None or guess.confidence > intent.confidence):
+                intent = guess
+        return intent if intent is not None and self._valid(intent) else None
+
+    def route(self, message: str, user_id: str) -> Optional[Intent]:
+        """``classify`` plus routing metrics; answer locally when ``is_local`` holds"""
+        started = time.perf_counter()
+        intent = self.classify(message, user_id)
+        INTENT_ROUTE_SECONDS.observe(time.perf_counter() - started)
+        if intent is None:
+            INTENT_ROUTED.inc(rule="none", outcome="llm")
+        else:
+            INTENT_ROUTED.inc(rule=intent.rule, outcome="local" if self.is_local(intent) else "llm")
+        return intent
+
+    def is_local(self, intent: Optional[Intent]) -> bool:
+        return intent is not None and intent.confidence >= self.min_confidence
@@ -0,0 +1,252 @@
+"""Background jobs for long-running tool calls.
+
+``POST /jobs`` queues a tool call and returns a job id straight away; the
+result is fetched with ``GET /jobs/{id}`` (optionally long-polling with
+``?wait=``) or pushed by ``GET /jobs/{id}/events`` as server-sent events.
+Finished jobs are kept for ``JOB_RESULT_TTL_SECONDS``.
+
+Jobs run on a fixed pool of worker threads, so a slow scan never blocks the
+server's event loop. Every job has a priority class. Workers always take the
+highest class with queued work, and each class may only occupy its share of
+the workers: ``interactive`` may use all of them, ``standard`` and
+``analytics`` together leave one free, and ``analytics`` on its own takes at
+most ``JOB_ANALYTICS_WORKERS``. A worker is therefore always left for
+interactive calls such as ``get_profile``, however many standard and
+analytics jobs are queued.
+
+Environment:
+    JOB_WORKERS             worker threads (default 4, minimum 2)
+    JOB_ANALYTICS_WORKERS   workers analytics jobs may occupy (default half)
+    JOB_QUEUE_LIMIT         queued jobs accepted before submissions are refused
+    JOB_RESULT_TTL_SECONDS  how long finished results are kept (default 600)
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+import metrics
+
+logger = logging.getLogger("jobs")
+
+JOB_WORKERS = max(2, int(os.getenv("JOB_WORKERS", "4")))
+JOB_ANALYTICS_WORKERS = int(os.getenv("JOB_ANALYTICS_WORKERS", str(max(1, JOB_WORKERS // 2))))
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", "1000"))
+JOB_RESULT_TTL_SECONDS = float(os.getenv("JOB_RESULT_TTL_SECONDS", "600"))
+
+# Highest priority first
+PRIORITY_CLASSES = ("interactive", "standard", "analytics")
+
+JOBS_SUBMITTED = metrics.REGISTRY.counter("jobs_submitted_total", "Jobs accepted", ["tool", "priority"])
+JOBS_REJECTED = metrics.REGISTRY.counter("jobs_rejected_total", "Jobs refused because the queue was full", ["priority"])
+JOBS_FINISHED = metrics.REGISTRY.counter("jobs_finished_total", "Jobs finished by outcome", ["tool", "status"])
+JOB_QUEUE_WAIT = metrics.REGISTRY.histogram(
+    "job_queue_wait_seconds", "Time from submission to a worker picking the job up", ["priority"]
+)
+JOB_RUN_SECONDS = metrics.REGISTRY.histogram("job_run_seconds", "Job execution time", ["priority"])
+JOBS_QUEUED = metrics.REGISTRY.gauge("jobs_queued", "Jobs waiting for a worker", ["priority"])
+JOBS_RUNNING = metrics.REGISTRY.gauge("jobs_running", "Jobs executing", ["priority"])
+
+
+class QueueFull(Exception):
+    """Raised by ``submit`` when ``JOB_QUEUE_LIMIT`` jobs are already waiting"""
+
+
+class Job:
+    """One queued tool call and, once finished, its result"""
+
+    def __init__(self, tool_name: str, arguments: Dict[str, Any], priority: str,
+                 context: Optional[Dict[str, Any]] = None):
+        self.job_id = uuid.uuid4().hex
+        self.tool_name = tool_name
+        self.arguments = arguments
+        self.priority = priority
+        self.context = context or {}  # request state the worker re-applies (trace id, consistency)
+        self.status = "queued"
+        self.result: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.finished = threading.Event()
+        self._callbacks = []
+        self._callbacks_lock = threading.Lock()
+
+    def add_done_callback(self, callback: Callable[[], None]):
+        """Call ``callback`` (on the finishing thread) once the job is done"""
+        with self._callbacks_lock:
+            if not self.done:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def _set_done(self):
+        with self._callbacks_lock:
+            self.finished.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    @property
+    def done(self) -> bool:
+        return self.finished.is_set()
+
+    def describe(self, include_result: bool = True) -> Dict[str, Any]:
+        info = {
+            "job_id": self.job_id,
+            "tool_name": self.tool_name,
+            "priority": self.priority,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if include_result and self.done:
+            info["success"] = self.status == "succeeded"
+            info["result"] = self.result
+        return info
+
+
+class JobScheduler:
+    """Bounded worker pool with per-class worker shares and result retention"""
+
+    def __init__(self, execute: Callable[[Job], str], workers: int = JOB_WORKERS,
+                 analytics_workers: int = JOB_ANALYTICS_WORKERS, max_queued: int = JOB_QUEUE_LIMIT,
+                 result_ttl: float = JOB_RESULT_TTL_SECONDS,
+                 worker_init: Optional[Callable[[], Optional[Callable[[], None]]]] = None):
+        self.execute = execute
+        self.workers = workers
+        self.limits = {
+            "interactive": workers,
+            "standard": workers - 1,
+            "analytics": max(1, min(analytics_workers, workers - 1)),
+        }
+        # Shared by every class but interactive, so they cannot fill the pool between them
+        self.background_limit = workers - 1
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.worker_init = worker_init  # runs on each worker thread; may return a cleanup callable
+        self._jobs: Dict[str, Job] = {}
+        self._queues = {priority: deque() for priority in PRIORITY_CLASSES}
+        self._running = {priority: 0 for priority in PRIORITY_CLASSES}
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopping = False
+        metrics.REGISTRY.register_collector(self._collect)
+
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+    def submit(self, tool_name: str, arguments: Dict[str, Any], priority: str,
+               context: Optional[Dict[str, Any]] = None) -> Job:
+        if priority not in self._queues:
+            raise ValueError(f"unknown priority {priority!r}; use one of {', '.join(PRIORITY_CLASSES)}")
+        job = Job(tool_name, arguments, priority, context)
+        with self._cond:
+            self._expire()
+            if sum(len(q) for q in self._queues.values()) >= self.max_queued:
+                JOBS_REJECTED.inc(priority=priority)
+                raise QueueFull(f"{self.max_queued} jobs already queued")
+            self._jobs[job.job_id] = job
+            self._queues[priority].append(job)
+            self._cond.notify()
+        JOBS_SUBMITTED.inc(tool=tool_name, priority=priority)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._cond:
+            self._expire()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started; running jobs finish normally"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != "queued":
+                return False
+            self._queues[job.priority].remove(job)
+        self._finish(job, "cancelled", None)
+        return True
+
+    def _expire(self):
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.done and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _next_job(self) -> Optional[Job]:
+        background = sum(count for priority, count in self._running.items() if priority != "interactive")
+        for priority in PRIORITY_CLASSES:
+            if not self._queues[priority] or self._running[priority] >= self.limits[priority]:
+                continue
+            if priority != "interactive" and background >= self.background_limit:
+                continue
+            return self._queues[priority].popleft()
+        return None
+
+    def _finish(self, job: Job, status: str, result: Optional[str]):
+        job.status = status
+        job.result = result
+        job.finished_at = time.time()
+        job._set_done()
+        JOBS_FINISHED.inc(tool=job.tool_name, status=status)
+
+    def _worker(self):
+        cleanup = self.worker_init() if self.worker_init else None
+        try:
+            while True:
+                with self._cond:
+                    job = self._next_job()
+                    while job is None and not self._stopping:
+                        self._cond.wait()
+                        job = self._next_job()
+                    if job is None:
+                        return
+                    self._running[job.priority] += 1
+                    job.status = "running"
+                    job.started_at = time.time()
+                JOB_QUEUE_WAIT.observe(job.started_at - job.submitted_at, priority=job.priority)
+                try:
+                    result, status = self.execute(job), "succeeded"
+                except Exception as e:
+                    logger.warning("Job %s (%s) failed: %s", job.job_id, job.tool_name, e)
+                    result, status = f"Error: {e}", "failed"
+                JOB_RUN_SECONDS.observe(time.time() - job.started_at, priority=job.priority)
+                with self._cond:
+                    self._running[job.priority] -= 1
+                    self._cond.notify_all()
+                self._finish(job, status, result)
+        finally:
+            if cleanup:
+                cleanup()
+
+    def _collect(self):
+        for priority in PRIORITY_CLASSES:
+            JOBS_QUEUED.set(len(self._queues[priority]), priority=priority)
+            JOBS_RUNNING.set(self._running[priority], priority=priority)
+
+    def describe(self) -> Dict[str, Any]:
+        with self._cond:
+            self._expire()
+            return {
+                "workers": self.workers,
+                "limits": dict(self.limits),
+                "background_limit": self.background_limit,
+                "queued": {p: len(q) for p, q in self._queues.items()},
+                "running": dict(self._running),
+                "retained": len(self._jobs),
+                "max_queued": self.max_queued,
+                "result_ttl_seconds": self.result_ttl,
+            }
@@ -0,0 +1,214 @@
+"""LLM backends behind one interface.
+
+Models are named ``backend:model``:
+
+- ``groq:llama-3.3-70b-versatile``: Groq's API through its async client
+  (``GROQ_API_KEY``, checked on first use rather than at startup).
+- ``openai:qwen2.5:7b-instruct``: any OpenAI-compatible
+  ``/chat/completions`` server, e.g. Ollama, vLLM, llama.cpp or LM Studio
+  running locally (``LLM_BASE_URL``, default Ollama's, and an optional
+  ``LLM_API_KEY``).
+- ``mock:<anything>``: deterministic replies with simulated latency and no
+  network, for offline benchmarks. Routing prompts get a tool call chosen by
+  keyword; answers are a fixed number of tokens.
+
+``LLMClient.complete`` picks the backend per call and records latency,
+token and error metrics per backend and model.
+"""
+import asyncio
+import os
+import re
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import aiohttp
+
+import metrics
+
+LLM_SECONDS = metrics.REGISTRY.histogram(
+    "llm_request_seconds", "LLM completion latency", ["backend", "model", "phase"]
+)
+LLM_TOKENS = metrics.REGISTRY.counter(
+    "llm_tokens_total", "Tokens reported by the LLM backend", ["backend", "model", "kind"]
+)
+LLM_ERRORS = metrics.REGISTRY.counter("llm_errors_total", "Failed LLM completions", ["backend", "model"])
+
+
+class LLMError(Exception):
+    """The backend is misconfigured or returned an error"""
+
+
+class Completion(NamedTuple):
+    text: str
+    prompt_tokens: int
+    completion_tokens: int
+
+
+class Backend:
+    """One LLM provider; ``complete`` is called with the model part of the name"""
+
+    name = ""
+
+    async def complete(self, messages: List[Dict[str, str]], model: str, temperature: float,
+                       max_tokens: int) -> Completion:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class GroqBackend(Backend):
+    name = "groq"
+
+    def __init__(self, api_key: Optional[str]):
+        self.api_key = api_key
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            if not self.api_key:
+                raise LLMError("GROQ_API_KEY environment variable is required for groq: models")
+            from groq import AsyncGroq  # only needed when a groq: model is used
+            self._client = AsyncGroq(api_key=self.api_key)
+        return self._client
+
+    async def complete(self, messages, model, temperature, max_tokens) -> Completion:
+        response = await self._get_client().chat.completions.create(
+            messages=messages, model=model, temperature=temperature, max_tokens=max_tokens
+        )
+        usage = response.usage
+        return Completion(
+            response.choices[0].message.content,
+            usage.prompt_tokens if usage else 0,
+            usage.completion_tokens if usage else 0,
+        )
+
+
+class OpenAICompatibleBackend(Backend):
+    name = "openai"
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None, timeout: float = 120.0):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # One pooled session, so local servers see keep-alive connections
+        if self._session is None or self._session.closed:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else None
+            self._session = aiohttp.ClientSession(
+                headers=headers, timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    async def complete(self, messages, model, temperature, max_tokens) -> Completion:
+        payload = {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens}
+        async with self._get_session().post(f"{self.base_url}/chat/completions", json=payload) as response:
+            if response.status != 200:
+                raise LLMError(f"{self.base_url} returned {response.status}: {(await response.text())[:200]}")
+            body = await response.json()
+        usage = body.get("usage") or {}
+        return Completion(
+            body["choices"][0]["message"]["content"],
+            usage.get("prompt_tokens", 0),
+            usage.get("completion_tokens", 0),
+        )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+class MockBackend(Backend):
+    """Deterministic stand-in: ``latency_ms + completion_tokens / tokens_per_second`` per call"""
+
+    name = "mock"
+
+    def __init__(self, latency_ms: float = 200.0, tokens_per_second: float = 250.0, answer_tokens: int = 60):
+        self.latency_ms = latency_ms
+        self.tokens_per_second = tokens_per_second
+        self.answer_tokens = answer_tokens
+        self.calls = 0
+        self.on_call = None  # Optional callback(elapsed_seconds, is_tool_routing)
+
+    def reply(self, prompt: str) -> Tuple[str, bool]:
+        """``(text, is_tool_routing)`` for a prompt"""
+        if "AVAILABLE TOOLS" not in prompt:
+            return " ".join(["answer"] * self.answer_tokens), False
+        user_id_match = re.search(r"current user's ID is: (\S+)", prompt)
+        user_id = user_id_match.group(1) if user_id_match else "U0000001"
+        message = prompt.rsplit("User:", 1)[-1].lower()
+
+        if "profile" in message:
+            name, arguments = "get_profile", {"user_id": user_id}
+        elif "summary" in message:
+            name, arguments = "get_transaction_summary", {"user_id": user_id}
+        elif "search" in message or "category" in message:
+            name, arguments = "search_transactions", {"user_id": user_id, "category": "food", "limit": 20}
+        elif "transaction" in message:
+            name, arguments = "get_transactions", {"user_id": user_id, "limit": 10}
+        else:
+            return "Hello! How can I help you with your profile or transactions today?", True
+        return '{"tool_call": true, "name": "%s", "arguments": %s}' % (
+            name, str(arguments).replace("'", '"')
+        ), True
+
+    async def complete(self, messages, model, temperature, max_tokens) -> Completion:
+        started = time.perf_counter()
+        self.calls += 1
+        prompt = messages[-1]["content"]
+        text, is_tool_routing = self.reply(prompt)
+        completion_tokens = len(text.split())
+        await asyncio.sleep(self.latency_ms / 1000 + completion_tokens / self.tokens_per_second)
+        if self.on_call:
+            self.on_call(time.perf_counter() - started, is_tool_routing)
+        return Completion(text, len(prompt.split()), completion_tokens)
+
+
+class LLMClient:
+    """Resolves ``backend:model`` names to backends and records per-backend metrics"""
+
+    def __init__(self, backends: Dict[str, Backend]):
+        self.backends = dict(backends)
+
+    def register(self, backend: Backend, name: Optional[str] = None):
+        self.backends[name or backend.name] = backend
+
+    def resolve(self, spec: str) -> Tuple[Backend, str]:
+        name, _, model = spec.partition(":")
+        backend = self.backends.get(name)
+        if backend is None or not model:
+            raise LLMError(f"unknown model {spec!r}; use backend:model with backend one of {', '.join(self.backends)}")
+        return backend, model
+
+    async def complete(self, spec: str, messages: List[Dict[str, str]], phase: str,
+                       temperature: float = 0.7, max_tokens: int = 500) -> Completion:
+        backend, model = self.resolve(spec)
+        started = time.perf_counter()
+        try:
+            completion = await backend.complete(messages, model, temperature, max_tokens)
+        except Exception:
+            LLM_ERRORS.inc(backend=backend.name, model=model)
+            raise
+        LLM_SECONDS.observe(time.perf_counter() - started, backend=backend.name, model=model, phase=phase)
+        LLM_TOKENS.inc(completion.prompt_tokens, backend=backend.name, model=model, kind="prompt")
+        LLM_TOKENS.inc(completion.completion_tokens, backend=backend.name, model=model, kind="completion")
+        return completion
+
+    async def close(self):
+        for backend in self.backends.values():
+            await backend.close()
+
+
+def default_client() -> LLMClient:
+    """All three backends configured from the environment (read at call time, after .env is loaded)"""
+    return LLMClient({
+        "groq": GroqBackend(os.getenv("GROQ_API_KEY")),
+        "openai": OpenAICompatibleBackend(
+            os.getenv("LLM_BASE_URL", "http://localhost:11434/v1"),
+            os.getenv("LLM_API_KEY"),
+            float(os.getenv("LLM_TIMEOUT_SECONDS", "120")),
+        ),
+        "mock": MockBackend(float(os.getenv("MOCK_LLM_LATENCY_MS", "200"))),
+    })
@@ -0,0 +1,205 @@
+"""Structured, non-blocking logging shared by the orchestrator and MCP servers.
+
+Records are enqueued on the calling thread and formatted as JSON lines by
+a background ``QueueListener``, so the request path never waits on stdout.
+Disabled levels cost a single ``isEnabledFor`` check: use ``log_event`` or
+guard expensive arguments with ``logger.isEnabledFor``.
+
+Environment:
+    LOG_LEVEL     default level (INFO)
+    LOG_LEVELS    per-module levels, e.g. "orchestrator=DEBUG,mcp_server_sse=WARNING"
+    LOG_SAMPLING  per-event sample rates, e.g. "llm_response=0.05,tool_result=0.1"
+    LOG_REDACT    set to 0 to disable PII redaction (local debugging only)
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+from typing import Dict, Optional
+
+import metrics
+
+REDACTED = "[redacted]"
+
+# Structured fields that may carry PII or full prompts and are never written as-is
+REDACT_FIELDS = {
+    "user_name", "name", "email", "email_id", "phone", "phone_number",
+    "business_name", "prompt", "message", "llm_response", "response",
+    "tool_result", "profile",
+}
+
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_PHONE_RE = re.compile(r"\+?\d[\d\s().-]{7,}\d")
+
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _parse_mapping(value: str) -> Dict[str, str]:
+    mapping = {}
+    for item in value.split(","):
+        if "=" in item:
+            key, _, setting = item.partition("=")
+            mapping[key.strip()] = setting.strip()
+    return mapping
+
+
+def redact_text(text: str) -> str:
+    """Mask e-mail addresses and phone numbers inside free text"""
+    return _PHONE_RE.sub(REDACTED, _EMAIL_RE.sub(REDACTED, text))
+
+
+class ContextFilter(logging.Filter):
+    """Attach the current trace id while still on the request's thread and context"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = metrics.peek_trace_id()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of records for high-volume events"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(getattr(record, "event", None))
+        return rate is None or random.random() < rate
+
+
+class RedactionFilter(logging.Filter):
+    """Replace sensitive structured fields and ``extra`` attributes, and mask PII in messages"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        fields = getattr(record, "fields", None)
+        if fields:
+            record.fields = {
+                key: (REDACTED if key in REDACT_FIELDS and value is not None else value)
+                for key, value in fields.items()
+            }
+        # Attributes passed with ``extra=`` are written out alongside the fields
+        for key in REDACT_FIELDS.intersection(vars(record)).difference(_STANDARD_ATTRS):
+            if getattr(record, key) is not None:
+                setattr(record, key, REDACTED)
+        record.msg = redact_text(record.getMessage())
+        record.args = ()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+                  + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        event = getattr(record, "event", None)
+        if event:
+            entry["event"] = event
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            entry["trace_id"] = trace_id
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and key not in ("event", "trace_id", "fields"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info and not record.exc_text:
+            # Tracebacks reference frames that may be gone by the time the listener runs
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(service: str, stream=None) -> logging.Logger:
+    """Install the queue-based JSON logging pipeline once per process"""
+    global _listener
+    logger = logging.getLogger(service)
+    if _listener is not None:
+        return logger
+
+    root = logging.getLogger()
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    for name, level in _parse_mapping(os.getenv("LOG_LEVELS", "")).items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JSONFormatter())
+    if os.getenv("LOG_REDACT", "1") != "0":
+        output.addFilter(RedactionFilter())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _DeferredQueueHandler(log_queue)
+    rates = {event: float(rate) for event, rate in _parse_mapping(os.getenv("LOG_SAMPLING", "")).items()}
+    if rates:
+        handler.addFilter(SamplingFilter(rates))
+    handler.addFilter(ContextFilter())
+
+    root.handlers = [handler]
+    _start_listener(log_queue, output)
+    return logger
+
+
+def _start_listener(log_queue: queue.SimpleQueue, *outputs: logging.Handler):
+    global _listener
+    _listener = logging.handlers.QueueListener(log_queue, *outputs, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Write out queued records and stop the listener (for exits that skip ``atexit``)"""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
+def _restart_after_fork():
+    # Only the forking thread survives a fork: give the child its own queue and listener
+    if _listener is None:
+        return
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, _DeferredQueueHandler):
+            handler.queue = log_queue
+    _start_listener(log_queue, *_listener.handlers)
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def log_event(logger: logging.Logger, level: int, event: str, **fields):
+    """Log a structured event; returns immediately when ``level`` is disabled.
+
+    Dict and list values are copied, as the listener thread formats the
+    record later and the caller may change them meanwhile.
+    """
+    if logger.isEnabledFor(level):
+        fields = {key: value.copy() if isinstance(value, (dict, list)) else value for key, value in fields.items()}
+        logger.log(level, event, extra={"event": event, "fields": fields})
@@ -3,7 +3,7 @@ import json
 from typing import Optional, Dict, Any
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
-import subprocess
+import os
 import sys
 
 class MCPClient:
@@ -16,26 +16,17 @@ class MCPClient:
         """
         self.server_script = server_script
         self.session: Optional[ClientSession] = None
-        self.server_process: Optional[subprocess.Popen] = None
         
     async def connect(self):
         """Connect to the MCP server"""
         print("🔌 Connecting to MCP Server...")
         
-        # Start the server process
-        self.server_process = subprocess.Popen(
-            [sys.executable, self.server_script],
-            stdout=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        
-        # Create stdio transport
+        # stdio_client starts the server process. With env=None it inherits a
+        # filtered environment, which would drop the warm pool's socket
         server_params = StdioServerParameters(
             command=sys.executable,
             args=[self.server_script],
-            env=None
+            env=dict(os.environ) if os.getenv("MCP_SERVER_POOL_SOCKET") else None
         )
         
         # Connect using stdio
@@ -78,10 +69,9 @@ class MCPClient:
             return error_msg
     
     async def disconnect(self):
-        """Disconnect from MCP server"""
-        if self.server_process:
-            self.server_process.terminate()
-            self.server_process.wait()
+        """Disconnect from MCP server (stdio_client stops the server process it started)"""
+        if self.session:
+            self.session = None
             print("🔌 Disconnected from MCP Server")
     
     async def get_profile(self, user_id: str) -> str:
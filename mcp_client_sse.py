@@ -18,6 +18,7 @@ class MCPClientSSE:
         self.session: Optional[aiohttp.ClientSession] = None
         self.message_id = 1
         self.pending_requests = {}  # Store pending request callbacks
+        self.tool_schema_hash: Optional[str] = None
         
     async def connect(self):
         """Connect to SSE endpoint"""
@@ -50,28 +51,12 @@ class MCPClientSSE:
         """List available tools from MCP server"""
         print("📋 Requesting tool list...")
         
-        # For SSE-based MCP, we need to use the /messages endpoint
-        # Since we're not implementing full SSE client protocol,
-        # let's create a simplified version
-        
-        # In a full implementation, this would use SSE protocol
-        # For now, we'll return hardcoded tools since we know what's available
-        return [
-            {
-                "name": "get_profile",
-                "description": "Get user profile details from the database by user ID",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "user_id": {
-                            "type": "string",
-                            "description": "The unique user ID"
-                        }
-                    },
-                    "required": ["user_id"]
-                }
-            }
-        ]
+        # The server's tool registry; the schema hash changes whenever a definition does
+        async with self.session.get(f"{self.server_url}/tools") as response:
+            response.raise_for_status()
+            catalog = await response.json()
+        self.tool_schema_hash = catalog["schema_hash"]
+        return catalog["tools"]
     
     async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> str:
         """Call a tool on the MCP server"""
@@ -1,161 +1,112 @@
-import asyncio
-import mysql.connector
-from mysql.connector import Error
-from mcp.server import Server, NotificationOptions
-from mcp.server.models import InitializationOptions
-import mcp.server.stdio
-import mcp.types as types
-from pydantic import BaseModel
-from typing import Any, Optional
-import json
+from __future__ import annotations
+
 import os
+import sys
+
+# With a warm pool running (python mcp_server.py --pool N), a spawned server
+# hands its stdio to a pre-forked one before importing anything heavy
+MCP_SERVER_POOL_SOCKET = os.getenv("MCP_SERVER_POOL_SOCKET", "")
+if __name__ == "__main__" and MCP_SERVER_POOL_SOCKET and "--pool" not in sys.argv:
+    import server_pool
+    server_pool.attach(MCP_SERVER_POOL_SOCKET)
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any
+
+from logging_config import setup_logging, stop_logging
+
+# stdout carries the MCP stdio protocol, so logs go to stderr
+logger = setup_logging("mcp_server", stream=sys.stderr)
+
+# When to connect to MySQL: "background" (a thread at startup, while the
+# protocol handshake goes on), "lazy" (on the first tool call) or "eager"
+# (before serving)
+MCP_DB_CONNECT = os.getenv("MCP_DB_CONNECT", "background")
+
 
-# Database configuration
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',  # Change as per your MySQL setup
-    'password': '12345678',  # Add your password
-    'database': 'chatbot_db',
-    'port': 3306
-}
+def import_server_stack():
+    """Import the MCP server stack and the tool core up front (the pool does this once)"""
+    import mcp.server.stdio
+    import mcp.types
+    import tool_core
 
-class GetProfileArguments(BaseModel):
-    user_id: str
 
 class MCPServer:
-    def __init__(self):
+    """The shared tools (``tool_core``) over MCP stdio, one client per process"""
+
+    def __init__(self, db_connect: str = MCP_DB_CONNECT):
+        from mcp.server import Server
+        import tool_core
+
+        self.core = tool_core
+        self.db_connect = db_connect
+        self._connecting: concurrent.futures.Future | None = None
+
         self.server = Server("mysql-profile-server")
-        
-        # Register tools
         self.server.list_tools()(self.handle_list_tools)
         self.server.call_tool()(self.handle_call_tool)
-        
-        # Initialize database connection
-        self.db_connection = None
-        
+
+    def connect_now(self) -> bool:
+        """Connect to the primary and any replicas on the calling thread"""
+        connected = self.core.connect_to_database()
+        if connected:
+            logger.info("Connected to MySQL database")
+        return connected
+
+    def connect_in_background(self):
+        """Start connecting on a thread; the first tool call waits for it"""
+        future: concurrent.futures.Future = concurrent.futures.Future()
+
+        def connect():
+            try:
+                future.set_result(self.connect_now())
+            except BaseException as e:
+                future.set_exception(e)
+        self._connecting = future
+        threading.Thread(target=connect, name="db-connect", daemon=True).start()
+
     async def connect_to_database(self):
         """Establish MySQL database connection"""
-        try:
-            self.db_connection = mysql.connector.connect(
-                host=DB_CONFIG['host'],
-                user=DB_CONFIG['user'],
-                password=DB_CONFIG['password'],
-                database=DB_CONFIG['database'],
-                port=DB_CONFIG['port']
-            )
-            print("✅ Connected to MySQL database")
-            return True
-        except Error as e:
-            print(f"❌ Database connection failed: {e}")
-            return False
-    
-    async def handle_list_tools(self) -> list[types.Tool]:
+        future, self._connecting = self._connecting, None
+        if future is not None:
+            return await asyncio.wrap_future(future)
+        return await asyncio.to_thread(self.connect_now)
+
+    async def handle_list_tools(self) -> list:
         """List available tools"""
-        return [
-            types.Tool(
-                name="get_profile",
-                description="Get user profile details from the database by user ID",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "user_id": {
-                            "type": "string",
-                            "description": "The unique user ID"
-                        }
-                    },
-                    "required": ["user_id"]
-                }
-            )
-        ]
-    
-    async def handle_call_tool(
-        self, name: str, arguments: dict[str, Any] | None
-    ) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+        import mcp.types as types
+        return [types.Tool(**definition) for definition in self.core.tool_registry.definitions()]
+
+    async def handle_call_tool(self, name: str, arguments: dict[str, Any] | None) -> list:
         """Handle tool calls"""
-        if name == "get_profile":
-            return await self.handle_get_profile(arguments)
-        else:
-            raise ValueError(f"Unknown tool: {name}")
-    
-    async def handle_get_profile(self, arguments: Optional[dict]) -> list[types.TextContent]:
-        """Execute get_profile tool"""
-        try:
-            if not arguments or 'user_id' not in arguments:
-                return [
-                    types.TextContent(
-                        type="text",
-                        text="Error: user_id is required"
-                    )
-                ]
-            
-            user_id = arguments['user_id']
-            
-            # Connect to database if not connected
-            if not self.db_connection or not self.db_connection.is_connected():
-                await self.connect_to_database()
-            
-            cursor = self.db_connection.cursor(dictionary=True)
-            
-            # Query the database
-            query = "SELECT * FROM profiles WHERE user_id = %s"
-            cursor.execute(query, (user_id,))
-            result = cursor.fetchone()
-            
-            cursor.close()
-            
-            if result:
-                # Format the response
-                profile_text = f"""
-                User Profile Details:
-                - User ID: {result['user_id']}
-                - Name: {result['user_name']}
-                - Created Date: {result['created_date']}
-                - Phone: {result['phone_number']}
-                - Business: {result['business_name']}
-                - Email: {result['email_id']}
-                """
-                
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=profile_text
-                    )
-                ]
-            else:
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"No profile found for user ID: {user_id}"
-                    )
-                ]
-                
-        except Error as e:
-            error_msg = f"Database error: {str(e)}"
-            print(f"❌ {error_msg}")
-            return [
-                types.TextContent(
-                    type="text",
-                    text=f"Error accessing database: {str(e)}"
-                )
-            ]
-        except Exception as e:
-            error_msg = f"Unexpected error: {str(e)}"
-            print(f"❌ {error_msg}")
-            return [
-                types.TextContent(
-                    type="text",
-                    text=f"Error: {str(e)}"
-                )
-            ]
-    
+        import mcp.types as types
+        if self._connecting is not None:
+            # Queries must not race the background connect for the same connections
+            await self.connect_to_database()
+        result = await self.core.call_tool_text(name, arguments)
+        return [types.TextContent(type="text", text=result)]
+
     async def run(self):
         """Run the MCP server"""
-        print("🚀 Starting MCP Server with MySQL Profile Tool...")
-        
-        # Connect to database
-        if not await self.connect_to_database():
-            print("⚠️  Starting server without database connection")
-        
+        from mcp.server import NotificationOptions
+        from mcp.server.models import InitializationOptions
+        import mcp.server.stdio
+
+        logger.info("Starting MCP Server with MySQL tools")
+
+        # Connect to database (otherwise each node connects on its first query)
+        if self.db_connect == "eager":
+            if not await self.connect_to_database():
+                logger.warning("Starting server without database connection")
+        elif self.db_connect == "background":
+            # Started once the imports are done: a thread running alongside them slows both down
+            self.connect_in_background()
+
+        # Load the columnar snapshot in the background when enabled
+        self.core.columnar_engine.start()
+
         # Run with stdio transport
         async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
             await self.server.run(
@@ -175,5 +126,39 @@ async def main():
     server = MCPServer()
     await server.run()
 
+
+def run_pool(size: int, socket_path: str):
+    """Keep ``size`` warm, connected servers ready for clients that set MCP_SERVER_POOL_SOCKET"""
+    import server_pool
+
+    def warm() -> MCPServer:
+        server = MCPServer(db_connect="lazy")
+        server.connect_now()
+        return server
+
+    def serve_client(server: MCPServer):
+        try:
+            asyncio.run(server.run())
+        finally:
+            stop_logging()
+
+    import_server_stack()
+    print(f"🔥 MCP server pool: {size} warm servers on {socket_path}", file=sys.stderr)
+    print(f"   Clients attach with MCP_SERVER_POOL_SOCKET={socket_path}", file=sys.stderr)
+    server_pool.serve(socket_path, size, warm, serve_client)
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    if len(sys.argv) > 1:
+        import argparse
+        parser = argparse.ArgumentParser(description="MySQL tools MCP server (stdio)")
+        parser.add_argument("--pool", type=int, metavar="N",
+                            help="run a pool of N pre-forked warm servers instead of serving stdio")
+        parser.add_argument("--socket", default=MCP_SERVER_POOL_SOCKET or None,
+                            help="Unix socket the pool listens on (default: in $XDG_RUNTIME_DIR)")
+        args = parser.parse_args()
+        if args.pool:
+            import server_pool
+            run_pool(args.pool, args.socket or server_pool.default_socket_path())
+            sys.exit(0)
+    asyncio.run(main())
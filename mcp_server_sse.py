@@ -2,204 +2,100 @@ from mcp.server.sse import SseServerTransport
 from mcp.server import Server
 import uvicorn
 from fastapi import FastAPI, Request
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import StreamingResponse, Response
 import asyncio
-import mysql.connector
 from mysql.connector import Error
 import mcp.types as types
-from typing import Any, Optional
+from typing import Optional
+from db import (WorkerConnections, bind_worker_connections,
+                read_your_writes_requested, reset_read_your_writes, set_read_your_writes)
 import json
-from datetime import datetime
-
-# Database configuration
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': '12345678',
-    'database': 'chatbot_db',
-    'port': 3306
-}
+import os
+import threading
+import metrics
+import access
+import admission
+import jobs
+import tool_core
+from logging_config import setup_logging
+from serialization import CompressionMiddleware, FastJSONResponse
+from statement_cache import all_cache_stats
+from tools import TOOL_SCHEMA_HASH_HEADER, InvalidArguments
+
+# Requests carrying this header read from the primary (read-your-writes)
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
+
+# /directory/users exports every profile's name, business and e-mail for the
+# orchestrator's user directory. With DIRECTORY_TOKEN set, only requests
+# carrying it in this header are served; without it, only local clients
+DIRECTORY_TOKEN = os.getenv("DIRECTORY_TOKEN", "")
+DIRECTORY_TOKEN_HEADER = "X-Directory-Token"
+DIRECTORY_MAX_PAGE_SIZE = 50000
+
+# Admission control for /call_tool and /jobs: token buckets per user_id and per
+# tool ("rate/burst" per second; 0 disables). The cap on concurrent tool calls
+# is shared with the stdio server, in tool_core
+TOOL_RATE_PER_USER = admission.parse_rate(os.getenv("TOOL_RATE_PER_USER", "10/20"))
+TOOL_RATE_LIMITS = admission.parse_rate_limits(os.getenv("TOOL_RATE_LIMITS", ""))
 
-app = FastAPI()
+logger = setup_logging("mcp_server_sse")
+
+app = FastAPI(default_response_class=FastJSONResponse)
 server = Server("mysql-profile-server-sse")
-db_connection = None
 
-def connect_to_database():
-    """Establish MySQL database connection"""
-    global db_connection
+# /admin/* (query stats, node addresses, snapshot reloads) answers only local
+# clients, or those sending ADMIN_TOKEN
+access.guard_admin_routes(app)
+
+# Per-phase latency metrics, /metrics and /traces/{trace_id}
+metrics.instrument_app(app, tool_core.tracer)
+# Large tool results (searches, aggregates) go out brotli/gzip-compressed
+app.add_middleware(CompressionMiddleware)
+
+# Rate limits in front of every tool call
+user_rate_limiter = admission.RateLimiter("mcp-server", "user", *TOOL_RATE_PER_USER)
+tool_rate_limiters = {
+    tool: admission.RateLimiter("mcp-server", f"tool:{tool}", rate, burst)
+    for tool, (rate, burst) in TOOL_RATE_LIMITS.items()
+}
+
+@app.middleware("http")
+async def read_consistency(request: Request, call_next):
+    """Honour the per-request read-your-writes override; tag responses with the tool schema hash"""
+    enabled = request.headers.get(READ_YOUR_WRITES_HEADER, "").lower() in ("1", "true", "yes")
+    token = set_read_your_writes(enabled)
     try:
-        db_connection = mysql.connector.connect(
-            host=DB_CONFIG['host'],
-            user=DB_CONFIG['user'],
-            password=DB_CONFIG['password'],
-            database=DB_CONFIG['database'],
-            port=DB_CONFIG['port'],
-            autocommit=True
-        )
-        print("✅ Connected to MySQL database")
-        return True
-    except Error as e:
-        print(f"❌ Database connection failed: {e}")
-        return False
+        response = await call_next(request)
+        # Clients cache GET /tools and refetch when this changes
+        response.headers[TOOL_SCHEMA_HASH_HEADER] = tool_core.tool_registry.schema_hash
+        return response
+    finally:
+        reset_read_your_writes(token)
+
+def admit_tool_call(tool_name: str, arguments: dict):
+    """Charge the tool call to its user's and its tool's token buckets (raises admission.Rejected)"""
+    if arguments.get('user_id'):
+        user_rate_limiter.acquire(str(arguments['user_id']))
+    limiter = tool_rate_limiters.get(tool_name)
+    if limiter is not None:
+        limiter.acquire(tool_name)
 
 @server.list_tools()
 async def handle_list_tools() -> list[types.Tool]:
     """List available tools"""
-    return [
-        types.Tool(
-            name="get_profile",
-            description="Get user profile details from database by user ID",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "user_id": {"type": "string", "description": "User ID"}
-                },
-                "required": ["user_id"]
-            }
-        ),
-        types.Tool(
-            name="get_transactions",
-            description="Get all transactions for a specific user",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "user_id": {
-                        "type": "string",
-                        "description": "The user ID to get transactions for"
-                    },
-                    "limit": {
-                        "type": "integer",
-                        "description": "Maximum number of transactions to return (default: 10)",
-                        "default": 10
-                    }
-                },
-                "required": ["user_id"]
-            }
-        ),
-        types.Tool(
-            name="get_transaction_summary",
-            description="Get summary statistics of transactions for a user",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "user_id": {
-                        "type": "string",
-                        "description": "The user ID to get transaction summary for"
-                    }
-                },
-                "required": ["user_id"]
-            }
-        ),
-        types.Tool(
-            name="search_transactions",
-            description="Search transactions with various filters",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "user_id": {
-                        "type": "string",
-                        "description": "Filter by user ID (optional)"
-                    },
-                    "category": {
-                        "type": "string",
-                        "description": "Filter by category (e.g., food, shopping)"
-                    },
-                    "min_amount": {
-                        "type": "number",
-                        "description": "Minimum transaction amount"
-                    },
-                    "max_amount": {
-                        "type": "number",
-                        "description": "Maximum transaction amount"
-                    },
-                    "start_date": {
-                        "type": "string",
-                        "description": "Start date (YYYY-MM-DD)"
-                    },
-                    "end_date": {
-                        "type": "string",
-                        "description": "End date (YYYY-MM-DD)"
-                    },
-                    "transaction_type": {
-                        "type": "string",
-                        "description": "Transaction type (credit/debit)"
-                    },
-                    "limit": {
-                        "type": "integer",
-                        "description": "Maximum results (default: 20)",
-                        "default": 20
-                    }
-                }
-            }
-        )
-    ]
+    return [types.Tool(**definition) for definition in tool_core.tool_registry.definitions()]
 
 @server.call_tool()
 async def handle_call_tool(name: str, arguments: Optional[dict]) -> list[types.TextContent]:
     """Handle tool calls for SSE protocol"""
-    if name == "get_profile":
-        return await handle_get_profile_mcp(arguments)
-    elif name == "get_transactions":
-        return await handle_get_transactions_mcp(arguments)
-    elif name == "get_transaction_summary":
-        return await handle_transaction_summary_mcp(arguments)
-    elif name == "search_transactions":
-        return await handle_search_transactions_mcp(arguments)
-    else:
-        raise ValueError(f"Unknown tool: {name}")
-
-# MCP Protocol Handlers
-async def handle_get_profile_mcp(arguments: Optional[dict]) -> list[types.TextContent]:
-    """Handle get_profile tool for MCP protocol"""
-    if not arguments or 'user_id' not in arguments:
-        return [types.TextContent(type="text", text="Error: user_id is required")]
-    
-    user_id = arguments['user_id']
-    result = await execute_get_profile(user_id)
-    return [types.TextContent(type="text", text=result)]
-
-async def handle_get_transactions_mcp(arguments: Optional[dict]) -> list[types.TextContent]:
-    """Handle get_transactions tool for MCP protocol"""
-    if not arguments or 'user_id' not in arguments:
-        return [types.TextContent(type="text", text="Error: user_id is required")]
-    
-    user_id = arguments['user_id']
-    limit = arguments.get('limit', 10)
-    result = await execute_get_transactions(user_id, limit)
-    return [types.TextContent(type="text", text=result)]
-
-async def handle_transaction_summary_mcp(arguments: Optional[dict]) -> list[types.TextContent]:
-    """Handle get_transaction_summary tool for MCP protocol"""
-    if not arguments or 'user_id' not in arguments:
-        return [types.TextContent(type="text", text="Error: user_id is required")]
-    
-    user_id = arguments['user_id']
-    result = await execute_transaction_summary(user_id)
+    result = await tool_core.call_tool_text(name, arguments, admit=admit_tool_call)
     return [types.TextContent(type="text", text=result)]
 
-async def handle_search_transactions_mcp(arguments: Optional[dict]) -> list[types.TextContent]:
-    """Handle search_transactions tool for MCP protocol"""
-    result = await execute_search_transactions(arguments or {})
-    return [types.TextContent(type="text", text=result)]
-
-# HTTP Endpoint Handlers
-async def handle_get_profile(arguments: dict) -> JSONResponse:
-    """Handle get_profile tool for HTTP endpoint"""
-    if not arguments or 'user_id' not in arguments:
-        return JSONResponse(
-            status_code=400,
-            content={"error": "user_id is required"}
-        )
-    
-    user_id = arguments['user_id']
-    result = await execute_get_profile(user_id)
-    
-    # Try to extract data for JSON response
+def profile_data(result: str) -> dict:
+    """The "Key: value" lines of a get_profile result as a dict"""
     try:
-        # Parse the formatted text to extract data
-        lines = result.split('\n')
         data = {}
-        for line in lines:
+        for line in result.split('\n'):
             if ':' in line and line.strip():
                 key, value = line.split(':', 1)
                 key = key.strip().lower().replace(' ', '_')
@@ -207,344 +103,63 @@ async def handle_get_profile(arguments: dict) -> JSONResponse:
                 data[key] = value
     except:
         data = {"raw_response": result}
-    
-    return JSONResponse(
-        status_code=200,
-        content={
-            "success": True,
-            "result": result,
-            "data": data
-        }
-    )
+    return data
 
-async def handle_get_transactions(arguments: dict) -> JSONResponse:
-    """Handle get_transactions tool for HTTP endpoint"""
-    if not arguments or 'user_id' not in arguments:
-        return JSONResponse(
-            status_code=400,
-            content={"error": "user_id is required"}
-        )
-    
-    user_id = arguments['user_id']
-    limit = arguments.get('limit', 10)
-    result = await execute_get_transactions(user_id, limit)
-    
-    return JSONResponse(
-        status_code=200,
-        content={
-            "success": True,
-            "result": result
-        }
-    )
+# Structured data added next to the text result in /call_tool responses, per tool
+HTTP_RESULT_DATA = {"get_profile": profile_data}
 
-async def handle_transaction_summary(arguments: dict) -> JSONResponse:
-    """Handle get_transaction_summary tool for HTTP endpoint"""
-    if not arguments or 'user_id' not in arguments:
-        return JSONResponse(
-            status_code=400,
-            content={"error": "user_id is required"}
-        )
-    
-    user_id = arguments['user_id']
-    result = await execute_transaction_summary(user_id)
-    
-    return JSONResponse(
-        status_code=200,
-        content={
-            "success": True,
-            "result": result
-        }
-    )
+# Longest a single GET /jobs/{id}?wait= request blocks
+JOB_MAX_WAIT_SECONDS = 30.0
+# Keep-alive comment interval on /jobs/{id}/events
+JOB_EVENTS_KEEPALIVE_SECONDS = 15.0
 
-async def handle_search_transactions(arguments: dict) -> JSONResponse:
-    """Handle search_transactions tool for HTTP endpoint"""
-    result = await execute_search_transactions(arguments)
-    
-    return JSONResponse(
-        status_code=200,
-        content={
-            "success": True,
-            "result": result
-        }
-    )
+_job_worker = threading.local()
 
-# Core Execution Functions
-async def execute_get_profile(user_id: str) -> str:
-    """Execute get_profile query"""
-    try:
-        # Connect to database if needed
-        global db_connection
-        if not db_connection or not db_connection.is_connected():
-            connect_to_database()
-        
-        cursor = db_connection.cursor(dictionary=True)
-        query = "SELECT * FROM profiles WHERE user_id = %s"
-        cursor.execute(query, (user_id,))
-        result = cursor.fetchone()
-        cursor.close()
-        
-        if result:
-            profile_text = f"""User Profile Details:
-- User ID: {result['user_id']}
-- Name: {result['user_name']}
-- Created Date: {result['created_date']}
-- Phone: {result['phone_number']}
-- Business: {result['business_name']}
-- Email: {result['email_id']}"""
-            print(profile_text)
-            return profile_text
-        else:
-            return f"No profile found for user ID: {user_id}"
-            
-    except Error as e:
-        return f"Database error: {str(e)}"
-    except Exception as e:
-        return f"Error: {str(e)}"
+def job_priority(tool_name: str, arguments: dict) -> str:
+    """Cross-user scans are analytics; single-user lookups are interactive"""
+    if tool_name in ("get_profile", "get_transactions"):
+        return "interactive"
+    if tool_name in ("search_transactions", "aggregate_transactions") and not arguments.get('user_id'):
+        return "analytics"
+    return "standard"
 
-async def execute_get_transactions(user_id: str, limit: int = 10) -> str:
-    """Execute get_transactions query"""
-    try:
-        # Connect to database if needed
-        global db_connection
-        if not db_connection or not db_connection.is_connected():
-            connect_to_database()
-        
-        cursor = db_connection.cursor(dictionary=True)
-        
-        # Get total count
-        count_query = "SELECT COUNT(*) as total FROM transactions WHERE user_id = %s"
-        cursor.execute(count_query, (user_id,))
-        count_result = cursor.fetchone()
-        total_transactions = count_result['total']
-        
-        # Get transactions
-        query = """
-        SELECT * FROM transactions 
-        WHERE user_id = %s 
-        ORDER BY transaction_date DESC 
-        LIMIT %s
-        """
-        cursor.execute(query, (user_id, limit))
-        transactions = cursor.fetchall()
-        cursor.close()
-        
-        if transactions:
-            formatted_transactions = []
-            for tx in transactions:
-                formatted_tx = f"""
-Transaction ID: {tx['transaction_id']}
-Date: {tx['transaction_date']}
-Amount: ${tx['amount']:.2f}
-Type: {tx['transaction_type']}
-Description: {tx['description']}
-Status: {tx['status']}
-Category: {tx['category']}
-Merchant: {tx['merchant_name']}
-                """.strip()
-                formatted_transactions.append(formatted_tx)
-            
-            response_text = f"""Found {total_transactions} transactions for user {user_id}. Showing {len(transactions)} most recent:
-
-{'='*50}
-""" + "\n\n".join(formatted_transactions)
-            return response_text
-        else:
-            return f"No transactions found for user ID: {user_id}"
-            
-    except Error as e:
-        return f"Database error: {str(e)}"
-    except Exception as e:
-        return f"Error: {str(e)}"
+def init_job_worker():
+    """Give a job worker thread its own event loop and database connections"""
+    connections = WorkerConnections(tool_core.db_router)
+    bind_worker_connections(connections)
+    _job_worker.loop = asyncio.new_event_loop()
 
-async def execute_transaction_summary(user_id: str) -> str:
-    """Execute transaction summary query"""
+    def cleanup():
+        connections.close()
+        _job_worker.loop.close()
+    return cleanup
+
+def run_job(job: jobs.Job) -> str:
+    """Run a job's tool call on the current worker thread"""
+    consistency = set_read_your_writes(job.context.get("read_your_writes", False))
+    trace = metrics.start_trace(job.context.get("trace_id"))
     try:
-        # Connect to database if needed
-        global db_connection
-        if not db_connection or not db_connection.is_connected():
-            connect_to_database()
-        
-        cursor = db_connection.cursor(dictionary=True)
-        
-        # Get summary statistics
-        summary_query = """
-        SELECT 
-            COUNT(*) as total_transactions,
-            SUM(CASE WHEN transaction_type = 'credit' THEN amount ELSE 0 END) as total_credits,
-            SUM(CASE WHEN transaction_type = 'debit' THEN amount ELSE 0 END) as total_debits,
-            MIN(transaction_date) as first_transaction,
-            MAX(transaction_date) as last_transaction,
-            AVG(amount) as average_amount,
-            COUNT(DISTINCT category) as unique_categories
-        FROM transactions 
-        WHERE user_id = %s
-        """
-        cursor.execute(summary_query, (user_id,))
-        summary = cursor.fetchone()
-        
-        if summary and summary['total_transactions'] > 0:
-            # Get transactions by category
-            category_query = """
-            SELECT category, COUNT(*) as count, SUM(amount) as total_amount
-            FROM transactions 
-            WHERE user_id = %s 
-            GROUP BY category 
-            ORDER BY total_amount DESC
-            """
-            cursor.execute(category_query, (user_id,))
-            categories = cursor.fetchall()
-            
-            # Get recent transactions
-            recent_query = """
-            SELECT transaction_date, amount, description, status
-            FROM transactions 
-            WHERE user_id = %s 
-            ORDER BY transaction_date DESC 
-            LIMIT 5
-            """
-            cursor.execute(recent_query, (user_id,))
-            recent = cursor.fetchall()
-            
-            cursor.close()
-            
-            # Format summary
-            response_text = f"""Transaction Summary for User {user_id}:
-            
-📊 Overview:
-- Total Transactions: {summary['total_transactions']}
-- Total Credits: ${summary['total_credits'] or 0:.2f}
-- Total Debits: ${summary['total_debits'] or 0:.2f}
-- Net Balance: ${(summary['total_credits'] or 0) - (summary['total_debits'] or 0):.2f}
-- Average Transaction: ${summary['average_amount'] or 0:.2f}
-- First Transaction: {summary['first_transaction']}
-- Last Transaction: {summary['last_transaction']}
-- Unique Categories: {summary['unique_categories']}
-
-📈 Spending by Category:"""
-            
-            for cat in categories:
-                response_text += f"\n  - {cat['category']}: {cat['count']} transactions, Total: ${cat['total_amount']:.2f}"
-            
-            response_text += "\n\n🕐 Recent Transactions:"
-            for tx in recent:
-                response_text += f"\n  - {tx['transaction_date']}: ${tx['amount']:.2f} - {tx['description']} ({tx['status']})"
-            
-            return response_text
-        else:
-            cursor.close()
-            return f"No transactions found for user ID: {user_id}"
-            
-    except Error as e:
-        return f"Database error: {str(e)}"
-    except Exception as e:
-        return f"Error: {str(e)}"
+        with tool_core.tracer.span("job_execute"):
+            return _job_worker.loop.run_until_complete(tool_core.run_tool(job.tool_name, job.arguments))
+    finally:
+        metrics.end_trace(trace)
+        reset_read_your_writes(consistency)
 
-async def execute_search_transactions(arguments: dict) -> str:
-    """Execute search transactions query"""
+# Background tool calls (/jobs), run on worker threads with dedicated connections
+job_scheduler = jobs.JobScheduler(run_job, worker_init=init_job_worker)
+
+async def wait_for_job(job: jobs.Job, timeout: float) -> bool:
+    """Wait up to ``timeout`` seconds for ``job``; the worker wakes us through the loop"""
+    if job.done or timeout <= 0:
+        return job.done
+    loop = asyncio.get_running_loop()
+    finished = asyncio.Event()
+    job.add_done_callback(lambda: loop.call_soon_threadsafe(finished.set))
     try:
-        user_id = arguments.get('user_id')
-        category = arguments.get('category')
-        min_amount = arguments.get('min_amount')
-        max_amount = arguments.get('max_amount')
-        start_date = arguments.get('start_date')
-        end_date = arguments.get('end_date')
-        transaction_type = arguments.get('transaction_type')
-        limit = arguments.get('limit', 20)
-        
-        # Connect to database if needed
-        global db_connection
-        if not db_connection or not db_connection.is_connected():
-            connect_to_database()
-        
-        cursor = db_connection.cursor(dictionary=True)
-        
-        # Build dynamic query
-        query = "SELECT * FROM transactions WHERE 1=1"
-        params = []
-        
-        if user_id:
-            query += " AND user_id = %s"
-            params.append(user_id)
-        
-        if category:
-            query += " AND category = %s"
-            params.append(category)
-        
-        if min_amount:
-            query += " AND amount >= %s"
-            params.append(float(min_amount))
-        
-        if max_amount:
-            query += " AND amount <= %s"
-            params.append(float(max_amount))
-        
-        if start_date:
-            query += " AND DATE(transaction_date) >= %s"
-            params.append(start_date)
-        
-        if end_date:
-            query += " AND DATE(transaction_date) <= %s"
-            params.append(end_date)
-        
-        if transaction_type:
-            query += " AND transaction_type = %s"
-            params.append(transaction_type)
-        
-        query += " ORDER BY transaction_date DESC LIMIT %s"
-        params.append(limit)
-        
-        cursor.execute(query, params)
-        transactions = cursor.fetchall()
-        
-        # Get count
-        count_query = query.replace("SELECT *", "SELECT COUNT(*) as count").replace("ORDER BY transaction_date DESC LIMIT %s", "")
-        cursor.execute(count_query, params[:-1])  # Remove limit param for count
-        count_result = cursor.fetchone()
-        total_count = count_result['count']
-        
-        cursor.close()
-        
-        if transactions:
-            # Format search results
-            filters = []
-            if user_id: filters.append(f"User: {user_id}")
-            if category: filters.append(f"Category: {category}")
-            if min_amount: filters.append(f"Min Amount: ${min_amount}")
-            if max_amount: filters.append(f"Max Amount: ${max_amount}")
-            if start_date: filters.append(f"From: {start_date}")
-            if end_date: filters.append(f"To: {end_date}")
-            if transaction_type: filters.append(f"Type: {transaction_type}")
-            
-            filter_text = " | ".join(filters) if filters else "No filters"
-            
-            response_text = f"""🔍 Transaction Search Results:
-Filters: {filter_text}
-Total Matching: {total_count}
-Showing: {len(transactions)} transactions
-
-{'='*50}
-"""
-            
-            for tx in transactions:
-                response_text += f"""
-Transaction ID: {tx['transaction_id']}
-User ID: {tx['user_id']}
-Date: {tx['transaction_date']}
-Amount: ${tx['amount']:.2f} ({tx['transaction_type']})
-Category: {tx['category']}
-Description: {tx['description']}
-Status: {tx['status']}
-Merchant: {tx['merchant_name']}
-{'-'*30}
-"""
-            return response_text
-        else:
-            return "No transactions found matching the criteria"
-            
-    except Error as e:
-        return f"Database error: {str(e)}"
-    except Exception as e:
-        return f"Error: {str(e)}"
+        await asyncio.wait_for(finished.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    return job.done
 
 @app.post("/sse")
 async def handle_sse(request: Request):
@@ -582,28 +197,42 @@ async def http_call_tool(request: dict):
         arguments = request.get("arguments", {})
         
         if not tool_name:
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=400,
                 content={"error": "tool_name is required"}
             )
         
-        # Handle different tools
-        if tool_name == "get_profile":
-            return await handle_get_profile(arguments)
-        elif tool_name == "get_transactions":
-            return await handle_get_transactions(arguments)
-        elif tool_name == "get_transaction_summary":
-            return await handle_transaction_summary(arguments)
-        elif tool_name == "search_transactions":
-            return await handle_search_transactions(arguments)
-        else:
-            return JSONResponse(
+        tool = tool_core.tool_registry.get(tool_name)
+        if tool is None:
+            return FastJSONResponse(
                 status_code=400,
                 content={"error": f"Unknown tool: {tool_name}"}
             )
-            
+        arguments = tool.validate(arguments)
+        
+        admit_tool_call(tool_name, arguments)
+        result = await tool_core.call_tool_shared(tool_name, arguments)
+        content = {"success": True, "result": result}
+        extract = HTTP_RESULT_DATA.get(tool_name)
+        if extract is not None:
+            content["data"] = extract(result)
+        return FastJSONResponse(status_code=200, content=content)
+    
+    except InvalidArguments as e:
+        return FastJSONResponse(
+            status_code=400,
+            content={"error": str(e)}
+        )
+    except admission.Rejected as e:
+        return admission.rejection_response(e)
+    except tool_core.ToolUnavailable as e:
+        return FastJSONResponse(
+            status_code=503,
+            content={"success": False, "result": str(e)},
+            headers={"Retry-After": admission.retry_after_header(e.retry_after)}
+        )
     except Error as e:
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={
                 "success": False,
@@ -611,7 +240,7 @@ async def http_call_tool(request: dict):
             }
         )
     except Exception as e:
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={
                 "success": False,
@@ -619,6 +248,88 @@ async def http_call_tool(request: dict):
             }
         )
 
+@app.post("/jobs")
+async def submit_job(request: dict):
+    """Queue a tool call and return its job id immediately"""
+    tool_name = request.get("tool_name")
+    arguments = request.get("arguments") or {}
+    tool = tool_core.tool_registry.get(tool_name)
+    if tool is None:
+        return FastJSONResponse(status_code=400, content={"error": f"Unknown tool: {tool_name}"})
+    try:
+        arguments = tool.validate(arguments)
+    except InvalidArguments as e:
+        return FastJSONResponse(status_code=400, content={"error": str(e)})
+    
+    # Callers may lower a job's priority class, never raise it
+    priority = job_priority(tool_name, arguments)
+    requested = request.get("priority")
+    if requested:
+        if requested not in jobs.PRIORITY_CLASSES:
+            return FastJSONResponse(status_code=400, content={"error": f"Unknown priority: {requested}"})
+        if jobs.PRIORITY_CLASSES.index(requested) > jobs.PRIORITY_CLASSES.index(priority):
+            priority = requested
+    
+    context = {"read_your_writes": read_your_writes_requested(), "trace_id": metrics.peek_trace_id()}
+    try:
+        admit_tool_call(tool_name, arguments)
+        job = job_scheduler.submit(tool_name, arguments, priority, context)
+    except admission.Rejected as e:
+        return admission.rejection_response(e)
+    except jobs.QueueFull as e:
+        return FastJSONResponse(status_code=429, content={"error": str(e)}, headers={"Retry-After": "1"})
+    
+    content = job.describe()
+    content["poll"] = f"/jobs/{job.job_id}"
+    content["events"] = f"/jobs/{job.job_id}/events"
+    return FastJSONResponse(status_code=202, content=content)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0.0):
+    """Job status and, once finished, its result; ``wait`` long-polls up to 30s"""
+    job = job_scheduler.get(job_id)
+    if job is None:
+        return FastJSONResponse(status_code=404, content={"error": "Unknown or expired job"})
+    await wait_for_job(job, min(wait, JOB_MAX_WAIT_SECONDS))
+    return FastJSONResponse(content=job.describe())
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-sent events: the job's status, then its result when it finishes"""
+    job = job_scheduler.get(job_id)
+    if job is None:
+        return FastJSONResponse(status_code=404, content={"error": "Unknown or expired job"})
+    
+    async def event_generator():
+        yield f"event: status\ndata: {json.dumps(job.describe(include_result=False))}\n\n"
+        while not await wait_for_job(job, JOB_EVENTS_KEEPALIVE_SECONDS):
+            yield ": keep-alive\n\n"
+        yield f"event: result\ndata: {json.dumps(job.describe())}\n\n"
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "Connection": "keep-alive"}
+    )
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a job that has not started yet"""
+    if job_scheduler.cancel(job_id):
+        return {"job_id": job_id, "status": "cancelled"}
+    job = job_scheduler.get(job_id)
+    if job is None:
+        return FastJSONResponse(status_code=404, content={"error": "Unknown or expired job"})
+    return FastJSONResponse(status_code=409, content={"error": f"Job is {job.status}"})
+
+@app.get("/tools")
+async def list_tools_http(request: Request):
+    """Tool definitions and their schema hash; 304 when the caller's If-None-Match is current"""
+    etag = f'"{tool_core.tool_registry.schema_hash}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return FastJSONResponse(content=tool_core.tool_registry.describe(), headers={"ETag": etag})
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "mcp-server"}
@@ -627,11 +338,11 @@ async def health_check():
 async def test_database():
     """Test database connection and list tables"""
     try:
-        global db_connection
-        if not db_connection or not db_connection.is_connected():
-            connect_to_database()
+        connection = tool_core.db_router.primary.get_connection()
+        if connection is None:
+            return {"status": "error", "message": "Database connection failed"}
         
-        cursor = db_connection.cursor(dictionary=True)
+        cursor = connection.cursor(dictionary=True)
         
         # List tables
         cursor.execute("SHOW TABLES")
@@ -656,17 +367,114 @@ async def test_database():
     except Error as e:
         return {"status": "error", "message": str(e)}
 
+def directory_client_allowed(request: Request) -> bool:
+    """The orchestrator's directory reads carry DIRECTORY_TOKEN; without one set, only local clients may read"""
+    return access.client_allowed(request, DIRECTORY_TOKEN, DIRECTORY_TOKEN_HEADER)
+
+@app.get("/directory/users")
+async def user_directory_rows(request: Request, since: Optional[str] = None, after: str = "", limit: int = 5000):
+    """Profile fields for the orchestrator's user directory, paged by user_id.
+
+    ``since`` returns only profiles updated at or after that time (incremental refresh).
+    """
+    if not directory_client_allowed(request):
+        return FastJSONResponse(status_code=403, content={"error": "Directory access denied"})
+    query = "SELECT user_id, user_name, business_name, email_id, updated_at FROM profiles WHERE user_id > %s"
+    params = [after]
+    if since:
+        query += " AND updated_at >= %s"
+        params.append(since)
+    query += " ORDER BY user_id LIMIT %s"
+    params.append(max(1, min(limit, DIRECTORY_MAX_PAGE_SIZE)))
+    try:
+        async with tool_core.tool_concurrency.slot():
+            result = await tool_core.run_in_tool_worker(tool_core.run_query, "user_directory", query, params)
+    except admission.Rejected as e:
+        return admission.rejection_response(e)
+    except Error as e:
+        logger.error("User directory read failed: %s", e)
+        return FastJSONResponse(status_code=500, content={"error": "Database error"})
+    return {
+        "columns": list(result.columns),
+        "rows": [[None if v is None else str(v) for v in row] for row in result.tuples],
+    }
+
+@app.get("/admin/query_stats")
+async def query_stats(tool: Optional[str] = None, limit: int = 50):
+    """SQL fingerprints ordered by total time, optionally for one tool"""
+    return {
+        "slow_query_ms": tool_core.profiler.slow_query_ms,
+        "prepared_statements": tool_core.USE_PREPARED_STATEMENTS,
+        "statement_cache": all_cache_stats(),
+        "queries": tool_core.profiler.stats(tool=tool, limit=limit)
+    }
+
+@app.get("/admin/slow_queries")
+async def slow_queries(limit: int = 50):
+    """Recent slow queries with their EXPLAIN plans"""
+    return {
+        "slow_query_ms": tool_core.profiler.slow_query_ms,
+        "queries": tool_core.profiler.slow_log(limit=limit)
+    }
+
+@app.get("/admin/db")
+async def database_nodes():
+    """Primary and replica health, lag and routing settings"""
+    return tool_core.db_router.describe()
+
+@app.get("/admin/columnar")
+async def columnar_status():
+    """Columnar snapshot size, age and refresh settings"""
+    return tool_core.columnar_engine.describe()
+
+@app.post("/admin/columnar/refresh")
+async def columnar_refresh():
+    """Reload the columnar snapshot now"""
+    refreshed = await asyncio.to_thread(tool_core.columnar_engine.refresh)
+    return {"refreshed": refreshed, **tool_core.columnar_engine.describe()}
+
+@app.get("/admin/admission")
+async def admission_status():
+    """Concurrency gate, call coalescing and configured rate limits"""
+    return {
+        "call_tool": tool_core.tool_concurrency.describe(),
+        "coalescing": tool_core.tool_flight.describe(),
+        "rate_per_user": {"rate": user_rate_limiter.rate, "burst": user_rate_limiter.burst},
+        "rate_per_tool": {tool: {"rate": rate, "burst": burst} for tool, (rate, burst) in TOOL_RATE_LIMITS.items()},
+    }
+
+@app.get("/admin/jobs")
+async def job_status():
+    """Job worker pool, queue depths and retained results"""
+    return job_scheduler.describe()
+
+@app.delete("/admin/query_stats")
+async def reset_query_stats():
+    """Reset SQL statistics and the slow-query log"""
+    tool_core.profiler.reset()
+    return {"message": "Query statistics cleared"}
+
 if __name__ == "__main__":
     import uvicorn
     
     print("🚀 Starting MCP Server with SSE transport on http://localhost:8000")
     print("📡 SSE endpoint: POST http://localhost:8000/sse")
     print("🔧 HTTP tool endpoint: POST http://localhost:8000/call_tool")
+    print(f"🛠️  Tools: GET http://localhost:8000/tools ({tool_core.tool_registry.schema_hash})")
+    print("⏳ Background jobs: POST http://localhost:8000/jobs")
     print("🌐 Health check: GET http://localhost:8000/health")
     print("🗄️  Database test: GET http://localhost:8000/test_db")
+    print("📈 Metrics: GET http://localhost:8000/metrics")
+    print("🐢 Slow queries: GET http://localhost:8000/admin/slow_queries")
     
     # Initialize database connection
-    if not connect_to_database():
+    if not tool_core.connect_to_database():
         print("⚠️  Warning: Starting server without database connection")
     
+    # Load the columnar snapshot in the background when enabled
+    tool_core.columnar_engine.start()
+    
+    # Worker threads for /jobs
+    job_scheduler.start()
+    
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,298 @@
+"""Lightweight Prometheus-format metrics and per-phase tracing spans.
+
+Shared by the orchestrator and the MCP servers. Each service creates a
+``Tracer`` and wraps its request phases in ``tracer.span(...)``; spans feed
+the ``phase_duration_seconds`` histogram and a small ring buffer of recent
+spans keyed by trace id. The trace id travels between services in a W3C
+``traceparent`` header so one chat turn can be followed end to end.
+"""
+import contextvars
+import math
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+TRACE_HEADER = "traceparent"
+TRACE_ID_RESPONSE_HEADER = "X-Trace-Id"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+_TRACEPARENT_RE = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+_trace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_id", default=None)
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: Dict[Tuple, List[int]] = {}
+        self._sums: Dict[Tuple, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * len(self.buckets)
+                self._sums[key] = 0.0
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._sums[key] += value
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def total(self, **labels) -> float:
+        return self._sums.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, counts in sorted(self._counts.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(self._sums[key])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Holds metrics by name and renders them in Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def register_collector(self, collector: Callable[[], None]):
+        """Call ``collector`` before each render to refresh gauges computed on demand"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+PHASE_SECONDS = REGISTRY.histogram(
+    "phase_duration_seconds", "Time spent in each request phase", ["service", "phase"]
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["service", "method", "path", "status"]
+)
+
+
+# Trace context
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def peek_trace_id() -> Optional[str]:
+    """Trace id of the current request, or None outside a trace"""
+    return _trace_id.get()
+
+
+def current_trace_id() -> str:
+    """Trace id of the current request, starting a new trace if there is none"""
+    trace_id = _trace_id.get()
+    if trace_id is None:
+        trace_id = new_trace_id()
+        _trace_id.set(trace_id)
+    return trace_id
+
+
+def start_trace(trace_id: Optional[str] = None) -> contextvars.Token:
+    """Bind a trace id to the current context; pass the token to ``end_trace``"""
+    return _trace_id.set(trace_id or new_trace_id())
+
+
+def end_trace(token: contextvars.Token):
+    _trace_id.reset(token)
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[str]:
+    """Extract the trace id from a W3C traceparent header"""
+    if not header:
+        return None
+    match = _TRACEPARENT_RE.match(header.strip().lower())
+    return match.group(1) if match else None
+
+
+def make_traceparent(trace_id: Optional[str] = None) -> str:
+    """Build a traceparent header continuing ``trace_id`` with a fresh span id"""
+    return f"00-{trace_id or current_trace_id()}-{uuid.uuid4().hex[:16]}-01"
+
+
+class Tracer:
+    """Records phase spans for one service"""
+
+    def __init__(self, service: str, max_spans: int = 2000):
+        self.service = service
+        self.recent_spans = deque(maxlen=max_spans)
+
+    @contextmanager
+    def span(self, phase: str):
+        """Time a block as ``phase`` of the current trace"""
+        started_at = time.time()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - started, started_at)
+
+    def record(self, phase: str, seconds: float, started_at: Optional[float] = None):
+        """Record an already-measured phase duration"""
+        PHASE_SECONDS.observe(seconds, service=self.service, phase=phase)
+        self.recent_spans.append({
+            "trace_id": current_trace_id(),
+            "service": self.service,
+            "phase": phase,
+            "started_at": started_at if started_at is not None else time.time() - seconds,
+            "duration_ms": round(seconds * 1000, 3),
+        })
+
+    def spans_for(self, trace_id: str) -> List[Dict]:
+        """Recent spans belonging to one trace, oldest first"""
+        return [span for span in list(self.recent_spans) if span["trace_id"] == trace_id]
+
+
+def instrument_app(app, tracer: Tracer):
+    """Add trace propagation, request timing and /metrics + /traces endpoints to a FastAPI app"""
+    from fastapi import Request
+    from fastapi.responses import PlainTextResponse
+
+    @app.middleware("http")
+    async def trace_requests(request: Request, call_next):
+        token = start_trace(parse_traceparent(request.headers.get(TRACE_HEADER)))
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            response.headers[TRACE_ID_RESPONSE_HEADER] = current_trace_id()
+            return response
+        finally:
+            route = request.scope.get("route")
+            endpoint = request.scope.get("endpoint")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                service=tracer.service,
+                method=request.method,
+                path=getattr(route, "path", None) or getattr(endpoint, "__name__", "unmatched"),
+                status=status,
+            )
+            end_trace(token)
+
+    @app.get("/metrics")
+    async def metrics_endpoint():
+        """Prometheus metrics"""
+        return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+    @app.get("/traces/{trace_id}")
+    async def trace_endpoint(trace_id: str):
+        """Recent spans recorded by this service for one trace"""
+        return {"trace_id": trace_id, "service": tracer.service, "spans": tracer.spans_for(trace_id)}
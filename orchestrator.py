@@ -1,20 +1,37 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import json
 import re
-from groq import Groq
 import os
 from dotenv import load_dotenv
 import aiohttp
 import asyncio
+import logging
+import time
+import metrics
+import access
+import admission
+import llm
+from compaction import compact_tool_result, estimate_tokens
+from conversation import PROMPT_TOKENS, ConversationStore
+from intent import Intent, IntentRouter, NaiveBayesClassifier
+from logging_config import log_event, setup_logging
+from prefetch import Prefetch
+from serialization import CompressionMiddleware, FastJSONResponse
+from resilience import (STALE_RESULTS_SERVED, TOOL_ERROR_PREFIXES, CircuitBreaker, StaleCache, request_key,
+                        stale_notice)
+from tools import TOOL_SCHEMA_HASH_HEADER, ToolCatalog
+from user_directory import UserDirectory
 
 # Load environment variables
 load_dotenv()
 
+logger = setup_logging("orchestrator")
+
 # Initialize FastAPI app
-app = FastAPI(title="Chatbot Orchestrator")
+app = FastAPI(title="Chatbot Orchestrator", default_response_class=FastJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -25,18 +42,86 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Groq client
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
-    raise ValueError("GROQ_API_KEY environment variable is required")
+# /admin/* answers only local clients, or those sending ADMIN_TOKEN
+access.guard_admin_routes(app)
+
+# Per-phase latency metrics, /metrics and /traces/{trace_id}
+tracer = metrics.Tracer("orchestrator")
+metrics.instrument_app(app, tracer)
+# Long conversations and tool results go out brotli/gzip-compressed
+app.add_middleware(CompressionMiddleware)
+
+# LLM backends, chosen per call as "backend:model" (groq, openai-compatible
+# local server, or mock): a small model emits the tool-call JSON, a larger
+# one writes the answer. LLM_ALLOWED_MODELS lists further models a chat
+# request may pick for its answer.
+LLM_ROUTING_MODEL = os.getenv("LLM_ROUTING_MODEL", "groq:llama-3.1-8b-instant")
+LLM_ANSWER_MODEL = os.getenv("LLM_ANSWER_MODEL", "groq:llama-3.3-70b-versatile")
+LLM_ALLOWED_MODELS = {m.strip() for m in os.getenv("LLM_ALLOWED_MODELS", "").split(",") if m.strip()}
+LLM_ALLOWED_MODELS |= {LLM_ROUTING_MODEL, LLM_ANSWER_MODEL}
+# Folds old conversation turns into a running summary, in the background
+LLM_SUMMARY_MODEL = os.getenv("LLM_SUMMARY_MODEL", LLM_ROUTING_MODEL)
 
-client = Groq(api_key=GROQ_API_KEY)
+llm_client = llm.default_client()
+if not os.getenv("GROQ_API_KEY") and any(m.startswith("groq:") for m in (LLM_ROUTING_MODEL, LLM_ANSWER_MODEL)):
+    logger.warning("GROQ_API_KEY is not set: chats will fail until it is, or until "
+                   "LLM_ROUTING_MODEL / LLM_ANSWER_MODEL point at another backend")
 
 # MCP Server URL
 MCP_SERVER_URL = "http://localhost:8000"
 
-# Conversation history storage (in-memory for now)
-conversation_history = {}
+# Tool calls sent through the MCP server's background job API instead of
+# /call_tool: "analytics" (cross-user searches and aggregates), "all" or "off"
+MCP_JOB_MODE = os.getenv("MCP_JOB_MODE", "analytics")
+# Long-poll timeout per GET /jobs/{id} request (the server caps it at 30s)
+MCP_JOB_POLL_SECONDS = 25
+
+# Circuit breaker on the MCP server link: fail fast while it is down, probing
+# once every MCP_BREAKER_RESET_SECONDS, and answer from cached results meanwhile
+MCP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("MCP_CONNECT_TIMEOUT_SECONDS", "2"))
+MCP_READ_TIMEOUT_SECONDS = float(os.getenv("MCP_READ_TIMEOUT_SECONDS", "60"))
+MCP_BREAKER_FAILURES = int(os.getenv("MCP_BREAKER_FAILURES", "3"))
+MCP_BREAKER_RESET_SECONDS = float(os.getenv("MCP_BREAKER_RESET_SECONDS", "10"))
+TOOL_RESULT_CACHE_SIZE = int(os.getenv("TOOL_RESULT_CACHE_SIZE", "2000"))
+
+mcp_breaker = CircuitBreaker("mcp_server", MCP_BREAKER_FAILURES, MCP_BREAKER_RESET_SECONDS)
+# Last good result per tool call, the fallback while the MCP server is unreachable
+tool_results = StaleCache(TOOL_RESULT_CACHE_SIZE)
+
+# Speculative prefetch: start the tool call a local classifier is confident
+# about in parallel with the routing LLM call, used only if the LLM agrees
+TOOL_PREFETCH = os.getenv("TOOL_PREFETCH", "1") == "1"
+TOOL_PREFETCH_MIN_CONFIDENCE = float(os.getenv("TOOL_PREFETCH_MIN_CONFIDENCE", "0.75"))
+
+# Local intent routing: messages the rules (plus the optional classifier,
+# trained from a labelled JSONL file) are this sure about skip the routing
+# LLM call. See benchmarks/intent_eval.py for accuracy per threshold.
+INTENT_ROUTER = os.getenv("INTENT_ROUTER", "1") == "1"
+INTENT_ROUTER_MIN_CONFIDENCE = float(os.getenv("INTENT_ROUTER_MIN_CONFIDENCE", "0.9"))
+INTENT_CLASSIFIER_DATA = os.getenv("INTENT_CLASSIFIER_DATA")
+
+# Admission control for /chat: a token bucket per user_id ("rate/burst" per
+# second; 0 disables) and a cap on chats in flight, i.e. concurrent LLM calls
+CHAT_RATE_PER_USER = admission.parse_rate(os.getenv("CHAT_RATE_PER_USER", "2/10"))
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "32"))
+CHAT_MAX_QUEUE = int(os.getenv("CHAT_MAX_QUEUE", "64"))
+CHAT_MAX_QUEUE_WAIT_SECONDS = float(os.getenv("CHAT_MAX_QUEUE_WAIT_SECONDS", "10"))
+
+chat_rate_limiter = admission.RateLimiter("orchestrator", "user", *CHAT_RATE_PER_USER)
+chat_concurrency = admission.ConcurrencyLimiter(
+    "orchestrator", "chat", CHAT_MAX_CONCURRENCY, CHAT_MAX_QUEUE, CHAT_MAX_QUEUE_WAIT_SECONDS
+)
+
+
+# Local index of profiles for resolving user references without a tool round trip.
+# Profiles added or edited are pulled every USER_DIRECTORY_REFRESH_SECONDS;
+# deleted ones disappear with the next full load
+user_directory = UserDirectory()
+USER_DIRECTORY_REFRESH_SECONDS = float(os.getenv("USER_DIRECTORY_REFRESH_SECONDS", "60"))
+USER_DIRECTORY_FULL_REFRESH_SECONDS = float(os.getenv("USER_DIRECTORY_FULL_REFRESH_SECONDS", "900"))
+USER_DIRECTORY_PAGE_SIZE = 5000
+# Sent to the MCP server's /directory/users (set the same DIRECTORY_TOKEN on both)
+DIRECTORY_TOKEN = os.getenv("DIRECTORY_TOKEN", "")
 
 # Define request/response models
 class Message(BaseModel):
@@ -47,12 +132,17 @@ class ChatRequest(BaseModel):
     user_id: str  # User asking the question
     message: str
     conversation_id: Optional[str] = "default"
+    read_your_writes: bool = False  # Read tool data from the primary database
+    model: Optional[str] = None  # Answer model ("backend:model"), one of LLM_ALLOWED_MODELS
+    include_tool_result: bool = True  # False leaves the raw tool output out of the response
 
 class ChatResponse(BaseModel):
     response: str
     tool_used: bool = False
     tool_result: Optional[str] = None
     conversation_id: str
+    tool_result_tokens_saved: Optional[int] = None  # Estimated prompt tokens saved by compaction
+    prompt_tokens: Optional[int] = None  # Estimated routing prompt size (None when routed locally)
 
 class ToolCall(BaseModel):
     tool_call: bool
@@ -92,31 +182,175 @@ def detect_tool_call(llm_response: str) -> Optional[ToolCall]:
     except json.JSONDecodeError:
         return None
     except Exception as e:
-        print(f"Error detecting tool call: {e}")
+        logger.warning("Error detecting tool call: %s", e)
         return None
 
-async def call_mcp_tool(tool_name: str, arguments: Dict[str, Any]) -> str:
-    """Call a tool on the MCP server"""
+def use_job_api(tool_name: str, arguments: Dict[str, Any]) -> bool:
+    """Whether a tool call goes through the MCP server's job queue"""
+    if MCP_JOB_MODE == "all":
+        return True
+    return (MCP_JOB_MODE == "analytics" and tool_name in ("search_transactions", "aggregate_transactions")
+            and not arguments.get("user_id"))
+
+async def call_mcp_tool_job(session: aiohttp.ClientSession, payload: Dict[str, Any],
+                            headers: Dict[str, str]) -> Optional[str]:
+    """Submit a tool call as a background job and long-poll for its result.
+
+    Returns None when the job API is unavailable, so the caller can fall
+    back to /call_tool.
+    """
+    async with session.post(f"{MCP_SERVER_URL}/jobs", json=payload, headers=headers) as response:
+        tool_catalog.observe(response.headers.get(TOOL_SCHEMA_HASH_HEADER))
+        if response.status != 202:
+            return None
+        job = await response.json()
+    while True:
+        params = {"wait": MCP_JOB_POLL_SECONDS}
+        async with session.get(f"{MCP_SERVER_URL}/jobs/{job['job_id']}", params=params, headers=headers) as response:
+            if response.status != 200:
+                return f"Error calling tool: job {job['job_id']} {response.status} - {await response.text()}"
+            job = await response.json()
+        if "result" in job:
+            return job["result"] or f"Error calling tool: job {job['status']}"
+
+class ToolUnavailable(Exception):
+    """The tool could not be reached and no cached answer exists"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+def stale_tool_result(tool_name: str, arguments: Dict[str, Any], reason: str) -> str:
+    """A cached answer for the tool call, marked stale, or raise ToolUnavailable"""
+    cached = tool_results.get(request_key(tool_name, arguments))
+    if cached is not None:
+        STALE_RESULTS_SERVED.inc(source="orchestrator_cache")
+        result, age = cached
+        return stale_notice(age, reason) + "\n" + result
+    
+    # The user directory still knows every profile's name, business and e-mail
+    entry = user_directory.get(arguments.get("user_id")) if tool_name == "get_profile" else None
+    if entry is not None:
+        STALE_RESULTS_SERVED.inc(source="user_directory")
+        return stale_notice(time.time() - user_directory.loaded_at, reason) + f"""
+User Profile Details (partial):
+- User ID: {entry.user_id}
+- Name: {entry.user_name}
+- Business: {entry.business_name}
+- Email: {entry.email_id}"""
+    raise ToolUnavailable(reason, mcp_breaker.retry_after())
+
+async def call_mcp_tool(tool_name: str, arguments: Dict[str, Any], read_your_writes: bool = False) -> str:
+    """Call a tool on the MCP server, falling back to cached results (marked stale) while it is down"""
+    if not mcp_breaker.allow():
+        return stale_tool_result(tool_name, arguments, "tool service unavailable")
     try:
-        async with aiohttp.ClientSession() as session:
-            endpoint = f"{MCP_SERVER_URL}/call_tool"
-            payload = {
-                "tool_name": tool_name,
-                "arguments": arguments
-            }
-            
-            async with session.post(endpoint, json=payload) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    return result.get("result", "No result returned")
-                else:
-                    error_text = await response.text()
-                    return f"Error calling tool: {response.status} - {error_text}"
-                    
+        status, result = await post_mcp_tool_call(tool_name, arguments, read_your_writes)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        mcp_breaker.record_failure()
+        log_event(logger, logging.WARNING, "mcp_call_failed", tool=tool_name, error=repr(e),
+                  breaker=mcp_breaker.state)
+        return stale_tool_result(tool_name, arguments, "tool service unavailable")
     except Exception as e:
         return f"Failed to call tool: {str(e)}"
+    
+    # 503 means the MCP server is up but its database is not (and it had no cached answer)
+    if status >= 500 and status != 503:
+        mcp_breaker.record_failure()
+    else:
+        mcp_breaker.record_success()
+    if status == 200:
+        # Tool-level failures come back as 200 too; never serve them later as stale answers
+        if not result.startswith(TOOL_ERROR_PREFIXES):
+            tool_results.put(request_key(tool_name, arguments), result)
+        return result
+    if status == 503:
+        return stale_tool_result(tool_name, arguments, "database unavailable")
+    return f"Error calling tool: {status} - {result}"
+
+async def post_mcp_tool_call(tool_name: str, arguments: Dict[str, Any], read_your_writes: bool = False):
+    """``(status, result text)`` from the MCP server's job API or /call_tool"""
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=MCP_CONNECT_TIMEOUT_SECONDS,
+                                    sock_read=MCP_READ_TIMEOUT_SECONDS)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        endpoint = f"{MCP_SERVER_URL}/call_tool"
+        payload = {
+            "tool_name": tool_name,
+            "arguments": arguments
+        }
+        # Propagate the trace so the MCP server's spans join this chat turn
+        headers = {metrics.TRACE_HEADER: metrics.make_traceparent()}
+        if read_your_writes:
+            headers["X-Read-Your-Writes"] = "1"
+        
+        # Long scans run on the server's job workers rather than its request loop
+        if use_job_api(tool_name, arguments):
+            result = await call_mcp_tool_job(session, payload, headers)
+            if result is not None:
+                return 200, result
+        
+        async with session.post(endpoint, json=payload, headers=headers) as response:
+            tool_catalog.observe(response.headers.get(TOOL_SCHEMA_HASH_HEADER))
+            if response.status == 200:
+                result = await response.json()
+                return 200, result.get("result", "No result returned")
+            return response.status, await response.text()
+
+async def fetch_tool_list() -> Tuple[str, List[Dict[str, Any]]]:
+    """The MCP server's tool definitions and their schema hash"""
+    timeout = aiohttp.ClientTimeout(total=MCP_READ_TIMEOUT_SECONDS, sock_connect=MCP_CONNECT_TIMEOUT_SECONDS)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        async with session.get(f"{MCP_SERVER_URL}/tools") as response:
+            response.raise_for_status()
+            body = await response.json()
+    return body["schema_hash"], body["tools"]
 
-def build_prompt(user_id: str, user_message: str, history: List[Message], tools_available: List[Dict]) -> str:
+async def fetch_user_directory(since: Optional[str] = None) -> List[list]:
+    """Page through the MCP server's profile directory, optionally only profiles updated since ``since``"""
+    rows = []
+    after = ""
+    headers = {"X-Directory-Token": DIRECTORY_TOKEN} if DIRECTORY_TOKEN else None
+    async with aiohttp.ClientSession(headers=headers) as session:
+        while True:
+            params = {"after": after, "limit": USER_DIRECTORY_PAGE_SIZE}
+            if since:
+                params["since"] = since
+            async with session.get(f"{MCP_SERVER_URL}/directory/users", params=params) as response:
+                response.raise_for_status()
+                page = (await response.json())["rows"]
+            rows.extend(page)
+            if len(page) < USER_DIRECTORY_PAGE_SIZE:
+                return rows
+            after = page[-1][0]
+
+async def refresh_user_directory():
+    """Keep the user directory current: a full load, then incremental pulls"""
+    last_full = None
+    while True:
+        try:
+            if last_full is None or time.monotonic() - last_full >= USER_DIRECTORY_FULL_REFRESH_SECONDS:
+                rows = await fetch_user_directory()
+                count = await asyncio.to_thread(user_directory.replace_all, rows)
+                last_full = time.monotonic()
+                log_event(logger, logging.INFO, "user_directory_loaded", entries=count)
+            else:
+                rows = await fetch_user_directory(since=user_directory.watermark)
+                changed = await asyncio.to_thread(user_directory.upsert, rows)
+                if changed:
+                    log_event(logger, logging.INFO, "user_directory_updated", changed=changed)
+        except Exception as e:
+            logger.warning("User directory refresh failed: %s", e)
+        await asyncio.sleep(USER_DIRECTORY_REFRESH_SECONDS)
+
+@app.on_event("startup")
+async def start_user_directory():
+    asyncio.create_task(refresh_user_directory())
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    await llm_client.close()
+
+def build_prompt(user_id: str, user_message: str, history: str, tools_available: List[Dict]) -> str:
     """Build the prompt for the LLM"""
     
     tools_description = ""
@@ -155,150 +389,143 @@ Otherwise, respond normally with your answer.
 
 CONVERSATION HISTORY:"""
     
-    # Add conversation history
-    history_text = ""
-    for msg in history[-6:]:  # Last 3 exchanges
-        history_text += f"\n{msg.role}: {msg.content}"
-    
-    # Current user message
+    # Current user message, after the conversation history (summary plus recent turns)
     current_message = f"\n\nUser: {user_message}\nAssistant:"
     
-    return system_prompt + history_text + current_message
-
-# Available tools (updated with transaction tools)
-AVAILABLE_TOOLS = [
-    {
-        "name": "get_profile",
-        "description": "Get user profile details from the database by user ID. Use this when user asks about profile information, user details, or needs to lookup someone's information.",
-        "inputSchema": {
-            "type": "object",
-            "properties": {
-                "user_id": {
-                    "type": "string",
-                    "description": "The unique user ID (e.g., 'U001', 'U002', 'U003')"
-                }
-            },
-            "required": ["user_id"]
-        }
-    },
-    {
-        "name": "get_transactions",
-        "description": "Get all transactions for a specific user. Use when user asks about transaction history, spending, or financial activity.",
-        "inputSchema": {
-            "type": "object",
-            "properties": {
-                "user_id": {
-                    "type": "string",
-                    "description": "The user ID to get transactions for (e.g., 'U001', 'U002', 'U003')"
-                },
-                "limit": {
-                    "type": "integer",
-                    "description": "Maximum number of transactions to return (default: 10)",
-                    "default": 10
-                }
-            },
-            "required": ["user_id"]
-        }
-    },
-    {
-        "name": "get_transaction_summary",
-        "description": "Get summary statistics of transactions for a user. Use when user asks for financial summary, spending overview, or transaction analytics.",
-        "inputSchema": {
-            "type": "object",
-            "properties": {
-                "user_id": {
-                    "type": "string",
-                    "description": "The user ID to get transaction summary for (e.g., 'U001', 'U002', 'U003')"
-                }
-            },
-            "required": ["user_id"]
-        }
-    },
-    {
-        "name": "search_transactions",
-        "description": "Search transactions with various filters. Use when user asks for specific transactions by category, amount range, date range, or type.",
-        "inputSchema": {
-            "type": "object",
-            "properties": {
-                "user_id": {
-                    "type": "string",
-                    "description": "Filter by user ID (optional). If not specified, search across all users."
-                },
-                "category": {
-                    "type": "string",
-                    "description": "Filter by category (e.g., 'food', 'shopping', 'travel')"
-                },
-                "min_amount": {
-                    "type": "number",
-                    "description": "Minimum transaction amount (e.g., 50)"
-                },
-                "max_amount": {
-                    "type": "number",
-                    "description": "Maximum transaction amount (e.g., 500)"
-                },
-                "start_date": {
-                    "type": "string",
-                    "description": "Start date in YYYY-MM-DD format"
-                },
-                "end_date": {
-                    "type": "string",
-                    "description": "End date in YYYY-MM-DD format"
-                },
-                "transaction_type": {
-                    "type": "string",
-                    "description": "Transaction type ('credit' or 'debit')"
-                },
-                "limit": {
-                    "type": "integer",
-                    "description": "Maximum results to return (default: 20)",
-                    "default": 20
-                }
-            }
-        }
-    }
-]
+    return system_prompt + history + current_message
+
+def use_tool_schemas(catalog: ToolCatalog):
+    """Local routing and prefetch only ever target tools the server has now"""
+    intent_router.tool_schemas = catalog.schemas
+
+# Tool definitions are the MCP server's (GET /tools), cached until a response carries a new schema hash
+tool_catalog = ToolCatalog(fetch_tool_list, on_change=use_tool_schemas)
+
+intent_router = IntentRouter(
+    tool_catalog.schemas,
+    min_confidence=INTENT_ROUTER_MIN_CONFIDENCE if INTENT_ROUTER else float("inf"),
+    classifier=NaiveBayesClassifier.from_jsonl(INTENT_CLASSIFIER_DATA) if INTENT_CLASSIFIER_DATA else None,
+)
+
+def start_prefetch(request: ChatRequest, intent: Optional[Intent]) -> Optional[Prefetch]:
+    """Start the tool call the message most likely needs, if the guess is confident"""
+    if not TOOL_PREFETCH:
+        return None
+    if intent is None or intent.confidence < TOOL_PREFETCH_MIN_CONFIDENCE:
+        return None
+    log_event(logger, logging.DEBUG, "tool_prefetch", tool=intent.tool, arguments=intent.arguments,
+              rule=intent.rule, confidence=intent.confidence)
+    return Prefetch(intent, lambda tool_name, arguments: call_mcp_tool(
+        tool_name, arguments, read_your_writes=request.read_your_writes))
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
     """Main chat endpoint"""
+    if request.model is not None and request.model not in LLM_ALLOWED_MODELS:
+        raise HTTPException(status_code=400,
+                            detail=f"model must be one of: {', '.join(sorted(LLM_ALLOWED_MODELS))}")
+    try:
+        chat_rate_limiter.acquire(request.user_id)
+        async with chat_concurrency.slot():
+            response = await handle_chat(request)
+        # Rendered here, skipping FastAPI's response_model re-validation and encoding pass
+        exclude = None if request.include_tool_result else {"tool_result"}
+        return FastJSONResponse(content=response.model_dump(exclude=exclude))
+    except admission.Rejected as e:
+        log_event(logger, logging.WARNING, "chat_rejected", user_id=request.user_id, reason=str(e))
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": admission.retry_after_header(e.retry_after)}
+        )
+
+async def summarize_conversation(summary: str, messages: List[Message]) -> str:
+    """Fold older messages into a conversation's running summary"""
+    transcript = "\n".join(f"{m.role}: {m.content}" for m in messages)
+    prompt = f"""Update the running summary of a conversation between a user and a banking assistant.
+Keep user IDs, names, amounts, dates and anything the user is still asking about; drop pleasantries.
+Reply with the updated summary only, in at most {conversations.summary_tokens * 3 // 4} words.
+
+Current summary:
+{summary or "(none)"}
+
+New messages:
+{transcript}
+
+Updated summary:"""
+    completion = await llm_client.complete(
+        LLM_SUMMARY_MODEL,
+        [{"role": "user", "content": prompt}],
+        phase="summary",
+        temperature=0.2,
+        max_tokens=conversations.summary_tokens
+    )
+    return completion.text
+
+# Conversation memory: recent turns verbatim plus a running summary of older ones
+conversations = ConversationStore(summarize_conversation)
+
+async def handle_chat(request: ChatRequest) -> ChatResponse:
+    """Answer one chat turn: route to a tool if needed, then generate the reply"""
+    
+    conversation = conversations.get(request.conversation_id)
     
-    # Initialize conversation history if not exists
-    if request.conversation_id not in conversation_history:
-        conversation_history[request.conversation_id] = []
+    log_event(logger, logging.INFO, "chat_request",
+              user_id=request.user_id,
+              conversation_id=request.conversation_id,
+              message=request.message,
+              history_length=conversation.total_messages)
+    prompt_tokens = None
     
-    history = conversation_history[request.conversation_id]
+    # Fetched from the MCP server on first use and whenever its schema hash changes
+    tools = await tool_catalog.get()
     
-    print(f"\n{'='*60}")
-    print(f"Chat Request: User ID: {request.user_id}")
-    print(f"Message: {request.message}")
-    print(f"History length: {len(history)}")
-    print(f"{'='*60}")
+    # Trivial tool requests are routed locally, without the routing LLM call
+    with tracer.span("intent_route"):
+        intent = intent_router.route(request.message, request.user_id)
+    routed_locally = intent_router.is_local(intent)
     
-    # Build the prompt with user ID
-    prompt = build_prompt(request.user_id, request.message, history, AVAILABLE_TOOLS)
+    # Otherwise overlap the likely tool call with the routing LLM call
+    prefetch = None if routed_locally else start_prefetch(request, intent)
     
-    # Call Groq LLM
     try:
-        print(f"\n🤖 Calling Groq LLM...")
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.3,  # Lower temperature for more consistent tool calls
-            max_tokens=500
-        )
-        
-        llm_response = chat_completion.choices[0].message.content
-        print(f"📝 LLM Response: {llm_response}")
-        
-        # Check for tool call
-        tool_call = detect_tool_call(llm_response)
+        if routed_locally:
+            log_event(logger, logging.INFO, "intent_routed", tool=intent.tool, rule=intent.rule,
+                      confidence=intent.confidence)
+            tool_call = ToolCall(tool_call=True, name=intent.tool, arguments=dict(intent.arguments))
+        else:
+            # Build the prompt with user ID
+            with tracer.span("prompt_build"):
+                history_text = conversation.prompt_history()
+                prompt = build_prompt(request.user_id, request.message, history_text, tools)
+            prompt_tokens = estimate_tokens(prompt)
+            PROMPT_TOKENS.observe(prompt_tokens, part="total")
+            PROMPT_TOKENS.observe(estimate_tokens(history_text), part="history")
+            
+            # Call the routing model (async, so the prefetch and other chats keep running)
+            log_event(logger, logging.DEBUG, "llm_call", phase="tool_routing", model=LLM_ROUTING_MODEL)
+            with tracer.span("llm_call_1"):
+                chat_completion = await llm_client.complete(
+                    LLM_ROUTING_MODEL,
+                    [
+                        {"role": "system", "content": "You are a helpful assistant."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    phase="tool_routing",
+                    temperature=0.3,  # Lower temperature for more consistent tool calls
+                    max_tokens=500
+                )
+            
+            llm_response = chat_completion.text
+            log_event(logger, logging.DEBUG, "llm_response", llm_response=llm_response)
+            
+            # Check for tool call
+            with tracer.span("tool_call_parse"):
+                tool_call = detect_tool_call(llm_response)
         
         if tool_call and tool_call.tool_call:
-            print(f"🛠️  Tool call detected: {tool_call.name}")
-            print(f"📤 Arguments: {tool_call.arguments}")
+            log_event(logger, logging.INFO, "tool_call", tool=tool_call.name,
+                      arguments=tool_call.arguments)
             
             # Fix user_id if needed
             if 'user_id' in tool_call.arguments:
@@ -306,94 +533,158 @@ async def chat_endpoint(request: ChatRequest):
                 if (tool_call.arguments['user_id'] in ['current user', 'me', 'my', 'myself', ''] or 
                     tool_call.arguments['user_id'].lower() == 'current user'):
                     tool_call.arguments['user_id'] = request.user_id
-                    print(f"🔄 Fixed user_id to: {request.user_id}")
+                    log_event(logger, logging.DEBUG, "user_id_fixed", user_id=request.user_id)
+                elif user_directory.loaded and tool_call.arguments['user_id'] not in user_directory:
+                    # Resolve names, businesses, e-mails and mistyped IDs locally
+                    with tracer.span("user_resolve"):
+                        resolved = user_directory.resolve(tool_call.arguments['user_id'])
+                    if resolved:
+                        log_event(logger, logging.INFO, "user_id_resolved", user_id=resolved)
+                        tool_call.arguments['user_id'] = resolved
             
-            # Call the tool
-            tool_result = await call_mcp_tool(tool_call.name, tool_call.arguments)
-            print(f"📥 Tool result received ({len(tool_result)} chars)")
+            # Call the tool, unless the prefetch already made this exact call
+            try:
+                tool_result = None
+                if prefetch is not None:
+                    with tracer.span("tool_prefetch_wait"):
+                        tool_result = await prefetch.claim(tool_call.name, tool_call.arguments,
+                                                           tool_catalog.schemas.get(tool_call.name))
+                    log_event(logger, logging.INFO, "tool_prefetch_" + prefetch.outcome,
+                              tool=prefetch.intent.tool, rule=prefetch.intent.rule)
+                if tool_result is None:
+                    with tracer.span("mcp_http_call"):
+                        tool_result = await call_mcp_tool(tool_call.name, tool_call.arguments,
+                                                          read_your_writes=request.read_your_writes)
+            except ToolUnavailable as e:
+                # Nothing to ground an answer on: reply directly instead of a second LLM call
+                log_event(logger, logging.WARNING, "tool_unavailable", tool=tool_call.name, reason=str(e))
+                final_response = (f"Sorry, I can't reach the account data right now ({e}). "
+                                  f"Please try again in about {max(1, round(e.retry_after))} seconds.")
+                conversations.append(conversation, Message(role="user", content=request.message),
+                                     Message(role="assistant", content=final_response))
+                return ChatResponse(
+                    response=final_response,
+                    tool_used=True,
+                    conversation_id=request.conversation_id,
+                    prompt_tokens=prompt_tokens
+                )
+            log_event(logger, logging.DEBUG, "tool_result", tool=tool_call.name,
+                      result_chars=len(tool_result))
+            
+            # Fit the result into the tool's token budget (CSV rows plus a rollup)
+            with tracer.span("tool_result_compact"):
+                compacted = compact_tool_result(tool_call.name, tool_result)
+            log_event(logger, logging.INFO, "tool_result_compacted", tool=tool_call.name,
+                      original_tokens=compacted.original_tokens,
+                      compact_tokens=compacted.compact_tokens,
+                      tokens_saved=compacted.tokens_saved,
+                      omitted_rows=compacted.omitted_rows)
             
             # Add user message and tool call to history
-            history.append(Message(role="user", content=request.message))
-            history.append(Message(role="assistant", content=f"[Tool call: {tool_call.name}]"))
+            conversations.append(conversation, Message(role="user", content=request.message),
+                                 Message(role="assistant", content=f"[Tool call: {tool_call.name}]"))
             
             # Now get final response from LLM with tool result
             final_prompt = f"""Tool call result for {tool_call.name}:
-{tool_result}
+{compacted.text}
 
 Original user question: {request.message}
 
 Based on the tool result above, provide a helpful answer to the user:"""
             
-            print(f"\n🤖 Getting final response from LLM...")
-            final_completion = client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": final_prompt}
-                ],
-                model="llama-3.3-70b-versatile",
-                temperature=0.7,
-                max_tokens=500
-            )
-            
-            final_response = final_completion.choices[0].message.content
+            answer_model = request.model or LLM_ANSWER_MODEL
+            log_event(logger, logging.DEBUG, "llm_call", phase="answer", model=answer_model)
+            with tracer.span("llm_call_2"):
+                final_completion = await llm_client.complete(
+                    answer_model,
+                    [
+                        {"role": "system", "content": "You are a helpful assistant."},
+                        {"role": "user", "content": final_prompt}
+                    ],
+                    phase="answer",
+                    temperature=0.7,
+                    max_tokens=500
+                )
             
-            # Add final response to history
-            history.append(Message(role="assistant", content=final_response))
+            final_response = final_completion.text
             
-            # Keep history manageable (last 10 messages)
-            if len(history) > 10:
-                conversation_history[request.conversation_id] = history[-10:]
+            # Add final response to history (older turns are summarized in the background)
+            conversations.append(conversation, Message(role="assistant", content=final_response))
             
             return ChatResponse(
                 response=final_response,
                 tool_used=True,
                 tool_result=tool_result,
-                conversation_id=request.conversation_id
+                conversation_id=request.conversation_id,
+                tool_result_tokens_saved=compacted.tokens_saved,
+                prompt_tokens=prompt_tokens
             )
             
         else:
             # No tool call needed, use LLM response directly
-            print("💬 Direct response (no tool call)")
+            log_event(logger, logging.DEBUG, "direct_response")
             
             # Update history
-            history.append(Message(role="user", content=request.message))
-            history.append(Message(role="assistant", content=llm_response))
-            
-            # Keep history manageable
-            if len(history) > 10:
-                conversation_history[request.conversation_id] = history[-10:]
+            conversations.append(conversation, Message(role="user", content=request.message),
+                                 Message(role="assistant", content=llm_response))
             
             return ChatResponse(
                 response=llm_response,
                 tool_used=False,
-                conversation_id=request.conversation_id
+                conversation_id=request.conversation_id,
+                prompt_tokens=prompt_tokens
             )
             
     except Exception as e:
-        print(f"❌ Error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Chat request failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # No tool call, a failed LLM call or a cancelled request: drop the speculative call
+        if prefetch is not None:
+            prefetch.discard()
+
+@app.get("/admin/breakers")
+async def breaker_status():
+    """MCP server link breaker and the size of the fallback result cache"""
+    return {"mcp_server": mcp_breaker.describe(), "cached_tool_results": len(tool_results)}
+
+@app.get("/admin/admission")
+async def admission_status():
+    """Chat concurrency gate state and the per-user rate limit"""
+    return {
+        "chat": chat_concurrency.describe(),
+        "rate_per_user": {"rate": chat_rate_limiter.rate, "burst": chat_rate_limiter.burst},
+    }
+
+@app.get("/admin/user_directory")
+async def user_directory_status(q: Optional[str] = None, limit: int = 5):
+    """Directory size and freshness, or the best matches for ``q``"""
+    if q is None:
+        return user_directory.describe()
+    return {"query": q, "resolved": user_directory.resolve(q),
+            "matches": [m._asdict() for m in user_directory.lookup(q, limit=limit)]}
 
 @app.get("/conversations/{conversation_id}")
 async def get_conversation(conversation_id: str):
-    """Get conversation history"""
-    if conversation_id in conversation_history:
-        return {
+    """Get conversation history: the running summary of older turns and the messages after it"""
+    conversation = conversations.peek(conversation_id)
+    if conversation is not None:
+        return FastJSONResponse(content={
             "conversation_id": conversation_id,
-            "history": conversation_history[conversation_id]
-        }
+            "summary": conversation.summary,
+            "history": conversation.messages
+        })
     else:
         return {
             "conversation_id": conversation_id,
+            "summary": "",
             "history": []
         }
 
 @app.delete("/conversations/{conversation_id}")
 async def clear_conversation(conversation_id: str):
     """Clear conversation history"""
-    if conversation_id in conversation_history:
-        del conversation_history[conversation_id]
+    conversations.delete(conversation_id)
     return {"message": "Conversation cleared"}
 
 @app.get("/health")
@@ -402,13 +693,19 @@ async def health_check():
     return {
         "status": "healthy",
         "service": "chatbot-orchestrator",
-        "mcp_server": MCP_SERVER_URL
+        "mcp_server": MCP_SERVER_URL,
+        "llm": {"routing_model": LLM_ROUTING_MODEL, "answer_model": LLM_ANSWER_MODEL}
     }
 
 @app.get("/tools")
 async def list_tools():
     """List available tools"""
-    return AVAILABLE_TOOLS
+    return await tool_catalog.get()
+
+@app.get("/admin/tools")
+async def tool_catalog_status():
+    """Schema hash and freshness of the cached tool list"""
+    return tool_catalog.describe()
 
 @app.post("/test_tool")
 async def test_tool(request: dict):
@@ -428,6 +725,9 @@ async def test_tool(request: dict):
             "result": result
         }
         
+    except ToolUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e),
+                            headers={"Retry-After": admission.retry_after_header(e.retry_after)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -440,6 +740,8 @@ if __name__ == "__main__":
     print("📝 Get conversation: GET http://localhost:8001/conversations/{id}")
     print("🛠️  Available tools: GET http://localhost:8001/tools")
     print("🌐 Health check: GET http://localhost:8001/health")
+    print("📈 Metrics: GET http://localhost:8001/metrics")
+    print(f"🧠 LLM: routing {LLM_ROUTING_MODEL}, answers {LLM_ANSWER_MODEL}")
     
     # Create .env file if it doesn't exist
     if not os.path.exists(".env"):
@@ -447,5 +749,6 @@ if __name__ == "__main__":
             f.write('GROQ_API_KEY="your-groq-api-key-here"\n')
         print("\n⚠️  Please add your Groq API key to the .env file!")
         print("   Get your API key from: https://console.groq.com/keys")
+        print("   Or run a local model: LLM_ROUTING_MODEL=openai:<model> LLM_ANSWER_MODEL=openai:<model>")
     
     uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
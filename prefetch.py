@@ -0,0 +1,73 @@
+"""Speculative tool calls that overlap the routing LLM call.
+
+When ``intent.classify`` is confident about a message, the orchestrator
+starts that tool call right away instead of after the first completion.
+Once the LLM has answered, ``claim`` hands over the prefetched result if the
+LLM chose the same tool with the same arguments (after schema defaults);
+otherwise the speculative call is cancelled and the LLM's call runs as
+usual. All tools are reads, so a wasted prefetch costs load, not
+correctness.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import metrics
+from intent import Intent, with_defaults
+
+PREFETCH_CALLS = metrics.REGISTRY.counter(
+    "tool_prefetch_total",
+    "Speculative tool calls by outcome (hit, miss: the LLM chose another call, unused: no tool call)",
+    ["tool", "outcome"],
+)
+PREFETCH_SAVED_SECONDS = metrics.REGISTRY.histogram(
+    "tool_prefetch_saved_seconds", "Tool call time hidden behind the routing LLM call on a hit", ["tool"]
+)
+
+
+class Prefetch:
+    """One speculative tool call, claimed once or discarded"""
+
+    def __init__(self, intent: Intent, call: Callable[[str, Dict[str, Any]], Awaitable[str]]):
+        self.intent = intent
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.outcome: Optional[str] = None
+        self.task = asyncio.create_task(call(intent.tool, dict(intent.arguments)))
+        self.task.add_done_callback(self._on_done)
+
+    def _on_done(self, task: asyncio.Task):
+        self.finished = time.perf_counter()
+        if not task.cancelled():
+            task.exception()  # retrieved here so a discarded failure is not logged as unhandled
+
+    def matches(self, tool_name: str, arguments: Dict[str, Any], schema: Optional[Dict[str, Any]] = None) -> bool:
+        return tool_name == self.intent.tool and (
+            with_defaults(arguments, schema) == with_defaults(self.intent.arguments, schema)
+        )
+
+    async def claim(self, tool_name: str, arguments: Dict[str, Any],
+                    schema: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """The prefetched result when it is the call the LLM chose, else None.
+
+        Raises whatever the speculative call raised, as the real call would.
+        """
+        if self.outcome is not None:
+            return None
+        if not self.matches(tool_name, arguments, schema):
+            self.discard("miss")
+            return None
+        self.outcome = "hit"
+        PREFETCH_CALLS.inc(tool=self.intent.tool, outcome="hit")
+        # Without the prefetch the call would start now; it has already run this long
+        saved = (self.finished if self.finished is not None else time.perf_counter()) - self.started
+        PREFETCH_SAVED_SECONDS.observe(saved, tool=self.intent.tool)
+        return await self.task
+
+    def discard(self, outcome: str = "unused"):
+        """Cancel the call if it has not been claimed (safe to call more than once)"""
+        if self.outcome is not None:
+            return
+        self.outcome = outcome
+        PREFETCH_CALLS.inc(tool=self.intent.tool, outcome=outcome)
+        self.task.cancel()
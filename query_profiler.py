@@ -0,0 +1,162 @@
+"""Per-tool SQL profiling and slow-query log for the MCP server.
+
+Every query recorded with ``QueryProfiler.record`` is reduced to a
+fingerprint (literals and parameters stripped, whitespace collapsed) and
+aggregated by count, total and max time, and rows returned. Queries slower
+than the threshold are kept in a ring buffer together with their EXPLAIN
+plan, whose row estimates give the rows examined for that fingerprint.
+"""
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import metrics
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "100"))
+# Re-run EXPLAIN for the same fingerprint at most this often
+EXPLAIN_INTERVAL_SECONDS = 60.0
+
+SQL_SECONDS = metrics.REGISTRY.histogram(
+    "sql_query_duration_seconds", "SQL statement latency", ["tool"]
+)
+SLOW_QUERIES = metrics.REGISTRY.counter(
+    "sql_slow_queries_total", "Statements slower than the slow-query threshold", ["tool"]
+)
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%s|\?")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(query: str) -> str:
+    """Normalize a SQL statement so executions with different values group together"""
+    normalized = _STRING_LITERAL_RE.sub("?", query)
+    normalized = _NUMBER_RE.sub("?", normalized)
+    normalized = _PLACEHOLDER_RE.sub("?", normalized)
+    normalized = _IN_LIST_RE.sub("(?+)", normalized)
+    return _WHITESPACE_RE.sub(" ", normalized).strip().lower()
+
+
+def _rows_examined(plan: List[Any]) -> Optional[int]:
+    """Sum the optimizer's row estimates from EXPLAIN output"""
+    total = 0
+    found = False
+    for row in plan:
+        rows = row.get("rows") if isinstance(row, dict) else None
+        if rows is not None:
+            total += int(rows)
+            found = True
+    return total if found else None
+
+
+class QueryProfiler:
+    """Aggregates statement statistics by fingerprint and keeps a slow-query log"""
+
+    def __init__(self, slow_query_ms: float = SLOW_QUERY_MS, log_size: int = SLOW_QUERY_LOG_SIZE):
+        self.slow_query_ms = slow_query_ms
+        self.slow_queries = deque(maxlen=log_size)
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._last_explain: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, tool: str, query: str, params: Sequence, elapsed: float, rows_returned: int,
+               cursor_factory: Callable[[], Any]):
+        """Aggregate one execution and capture it in the slow log if needed.
+
+        ``cursor_factory`` returns a dictionary cursor used to EXPLAIN slow queries.
+        """
+        fp = fingerprint(query)
+        elapsed_ms = elapsed * 1000
+        SQL_SECONDS.observe(elapsed, tool=tool)
+
+        with self._lock:
+            stats = self._stats.get(fp)
+            if stats is None:
+                stats = self._stats[fp] = {
+                    "fingerprint": fp,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "rows_returned": 0,
+                    "rows_examined_estimate": None,
+                    "tools": {},
+                }
+            stats["count"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            stats["rows_returned"] += rows_returned
+            stats["tools"][tool] = stats["tools"].get(tool, 0) + 1
+
+        if elapsed_ms < self.slow_query_ms:
+            return
+
+        SLOW_QUERIES.inc(tool=tool)
+        plan = self._explain(cursor_factory, fp, query, params)
+        examined = _rows_examined(plan) if plan is not None else None
+        if examined is not None:
+            with self._lock:
+                stats["rows_examined_estimate"] = examined
+
+        self.slow_queries.append({
+            "at": time.time(),
+            "trace_id": metrics.current_trace_id(),
+            "tool": tool,
+            "fingerprint": fp,
+            "duration_ms": round(elapsed_ms, 3),
+            "rows_returned": rows_returned,
+            "rows_examined_estimate": examined,
+            "explain": plan,
+        })
+
+    def _explain(self, cursor_factory: Callable[[], Any], fp: str, query: str,
+                 params: Sequence) -> Optional[List[Any]]:
+        """EXPLAIN a slow SELECT, rate-limited per fingerprint"""
+        if not query.lstrip().upper().startswith("SELECT"):
+            return None
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_explain.get(fp, -EXPLAIN_INTERVAL_SECONDS) < EXPLAIN_INTERVAL_SECONDS:
+                return None
+            self._last_explain[fp] = now
+        try:
+            cursor = cursor_factory()
+            try:
+                cursor.execute("EXPLAIN " + query, params)
+                return [
+                    {key: (value if isinstance(value, (int, float, str, type(None))) else str(value))
+                     for key, value in row.items()} if isinstance(row, dict) else [str(v) for v in row]
+                    for row in cursor.fetchall()
+                ]
+            finally:
+                cursor.close()
+        except Exception as e:
+            return [{"error": str(e)}]
+
+    def stats(self, tool: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Fingerprint statistics ordered by total time"""
+        with self._lock:
+            rows = [dict(s, tools=dict(s["tools"])) for s in self._stats.values()
+                    if tool is None or tool in s["tools"]]
+        for row in rows:
+            row["avg_ms"] = round(row["total_ms"] / row["count"], 3)
+            row["avg_rows_returned"] = round(row["rows_returned"] / row["count"], 2)
+            row["total_ms"] = round(row["total_ms"], 3)
+            row["max_ms"] = round(row["max_ms"], 3)
+        rows.sort(key=lambda r: r["total_ms"], reverse=True)
+        return rows[:limit]
+
+    def slow_log(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent slow queries, newest first"""
+        return list(self.slow_queries)[::-1][:limit]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._last_explain.clear()
+            self.slow_queries.clear()
@@ -0,0 +1,149 @@
+"""Circuit breakers and last-known-good results for degraded operation.
+
+A ``CircuitBreaker`` guards one dependency (a MySQL node, the MCP server).
+It is closed while calls succeed and opens after ``failure_threshold``
+consecutive failures. While open, callers skip the dependency at once
+instead of waiting out connect timeouts. Every ``reset_timeout`` seconds it
+lets a single probe through (half-open); the probe's outcome closes it again
+or keeps it open.
+
+``StaleCache`` keeps the last good result per request so a caller can answer
+from it, marked stale, while the breaker is open.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import metrics
+
+CIRCUIT_STATE = metrics.REGISTRY.gauge(
+    "circuit_breaker_state", "0 closed, 1 half-open, 2 open", ["breaker"]
+)
+CIRCUIT_TRANSITIONS = metrics.REGISTRY.counter(
+    "circuit_breaker_transitions_total", "Breaker state changes", ["breaker", "state"]
+)
+CIRCUIT_SHORT_CIRCUITED = metrics.REGISTRY.counter(
+    "circuit_breaker_short_circuited_total", "Calls skipped because the breaker was open", ["breaker"]
+)
+STALE_RESULTS_SERVED = metrics.REGISTRY.counter(
+    "stale_results_served_total", "Fallback answers served from a cache while a dependency was down", ["source"]
+)
+
+_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures -> one probe per ``reset_timeout`` -> closed"""
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 10.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._state = "closed"
+        self._opened_at = 0.0  # also the time of the last half-open probe
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.set(0, breaker=name)
+
+    def _set_state(self, state: str):
+        if state != self._state:
+            self._state = state
+            CIRCUIT_TRANSITIONS.inc(breaker=self.name, state=state)
+            CIRCUIT_STATE.set(_STATE_VALUES[state], breaker=self.name)
+
+    @property
+    def state(self) -> str:
+        """``closed``, ``open``, or ``half_open`` when a probe is due"""
+        if self._state == "closed":
+            return "closed"
+        return "half_open" if time.monotonic() - self._opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        """Whether to call the dependency now; a due probe is handed out only once"""
+        with self._lock:
+            if self._state == "closed":
+                return True
+            now = time.monotonic()
+            if now - self._opened_at >= self.reset_timeout:
+                self._opened_at = now
+                self._set_state("half_open")
+                return True
+        CIRCUIT_SHORT_CIRCUITED.inc(breaker=self.name)
+        return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._set_state("closed")
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._state == "half_open" or self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state("open")
+
+    def retry_after(self) -> float:
+        """Seconds until the next probe (0 when closed)"""
+        if self._state == "closed":
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout_seconds": self.reset_timeout,
+            "retry_after_seconds": round(self.retry_after(), 3),
+        }
+
+
+# Tool results starting with these are failures, never cached as fallbacks
+TOOL_ERROR_PREFIXES = ("Error", "Database error")
+
+
+def request_key(tool_name: str, arguments: Dict[str, Any]) -> str:
+    return tool_name + ":" + json.dumps(arguments, sort_keys=True, default=str)
+
+
+class StaleCache:
+    """Last good result per key, least recently used dropped beyond ``max_entries``"""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, time.time())
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """``(value, age_seconds)`` or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        value, stored_at = entry
+        return value, time.time() - stored_at
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def stale_notice(age_seconds: float, reason: str) -> str:
+    """Header line marking a fallback answer as stale"""
+    if age_seconds < 120:
+        age = f"{age_seconds:.0f}s"
+    elif age_seconds < 7200:
+        age = f"{age_seconds / 60:.0f} min"
+    else:
+        age = f"{age_seconds / 3600:.1f} h"
+    return f"⚠️ STALE DATA ({reason}): cached {age} ago and may be out of date."
@@ -0,0 +1,101 @@
+"""Compact query results and template-based row formatting.
+
+Rows stay as the plain tuples the cursor returns. A ``ResultSet`` holds them
+with the column tuple and one shared column-index map; ``Row`` is a slotted
+view that still supports ``row['amount']`` for code that reads a handful of
+fields. Bulk text output uses ``format_rows``: a layout such as
+``"Amount: ${amount:.2f}"`` is compiled once per column order into a
+function evaluating an f-string over tuple positions (no dict per row, and
+no format-string parsing per call, unlike ``str.format``), and the rendered
+rows are joined once.
+"""
+import string
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+@lru_cache(maxsize=256)
+def column_index(columns: Tuple[str, ...]) -> Dict[str, int]:
+    """Column name -> position, shared by every query returning these columns"""
+    return {name: i for i, name in enumerate(columns)}
+
+
+@lru_cache(maxsize=256)
+def compile_layout(layout: str, columns: Tuple[str, ...]) -> Callable[[Sequence[Any]], str]:
+    """Compile a ``str.format``-style layout into ``render(row_tuple) -> str``"""
+    index = column_index(columns)
+    body = ""
+    for literal, field, spec, conversion in string.Formatter().parse(layout):
+        body += literal.replace("{", "{{").replace("}", "}}")
+        if field is not None:
+            body += "{row[%d]%s%s}" % (
+                index[field], "!" + conversion if conversion else "", ":" + spec if spec else ""
+            )
+    # Field expressions are only ``row[<int>]``, so the generated source is fixed by the layout
+    return eval("lambda row: f" + repr(body), {})
+
+
+class Row:
+    """Read-only, dict-like view of one result tuple"""
+
+    __slots__ = ("values", "index")
+
+    def __init__(self, values: Sequence[Any], index: Dict[str, int]):
+        self.values = values
+        self.index = index
+
+    def __getitem__(self, key: str) -> Any:
+        return self.values[self.index[key]]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.index
+
+    def get(self, key: str, default: Any = None) -> Any:
+        i = self.index.get(key)
+        return default if i is None else self.values[i]
+
+    def keys(self):
+        return self.index.keys()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(zip(self.index, self.values))
+
+    def __repr__(self) -> str:
+        return f"Row({self.as_dict()!r})"
+
+
+class ResultSet:
+    """Result tuples plus their columns; indexing yields ``Row`` views"""
+
+    __slots__ = ("columns", "index", "tuples")
+
+    def __init__(self, columns: Sequence[str], tuples: List[Sequence[Any]]):
+        self.columns = tuple(columns)
+        self.index = column_index(self.columns)
+        self.tuples = tuples
+
+    def __len__(self) -> int:
+        return len(self.tuples)
+
+    def __bool__(self) -> bool:
+        return bool(self.tuples)
+
+    def __getitem__(self, i: int) -> Row:
+        return Row(self.tuples[i], self.index)
+
+    def __iter__(self) -> Iterator[Row]:
+        index = self.index
+        return (Row(values, index) for values in self.tuples)
+
+    def first(self) -> Optional[Row]:
+        return Row(self.tuples[0], self.index) if self.tuples else None
+
+    def column(self, name: str) -> List[Any]:
+        i = self.index[name]
+        return [values[i] for values in self.tuples]
+
+
+def format_rows(layout: str, result: ResultSet, separator: str = "") -> str:
+    """Render every row of ``result`` with ``layout`` into one string"""
+    render = compile_layout(layout, result.columns)
+    return separator.join(map(render, result.tuples))
@@ -0,0 +1,40 @@
+-- Schema for the profiles and transactions tables used by the MCP servers.
+-- Load with: mysql -u root -p < schema.sql  (or let seed_data.py create it)
+-- Databases created before profiles.updated_at existed need:
+--   ALTER TABLE profiles ADD COLUMN updated_at DATETIME NOT NULL
+--     DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP;
+--   CREATE INDEX idx_profiles_updated ON profiles (updated_at);
+
+CREATE DATABASE IF NOT EXISTS chatbot_db;
+USE chatbot_db;
+
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id VARCHAR(20) NOT NULL PRIMARY KEY,
+    user_name VARCHAR(100) NOT NULL,
+    created_date DATETIME NOT NULL,
+    phone_number VARCHAR(20),
+    business_name VARCHAR(150),
+    email_id VARCHAR(150),
+    -- Watermark for the orchestrator's incremental user directory refresh
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS transactions (
+    transaction_id VARCHAR(20) NOT NULL PRIMARY KEY,
+    user_id VARCHAR(20) NOT NULL,
+    transaction_date DATETIME NOT NULL,
+    amount DECIMAL(12, 2) NOT NULL,
+    transaction_type ENUM('credit', 'debit') NOT NULL,
+    description VARCHAR(255),
+    status VARCHAR(20) NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    merchant_name VARCHAR(100)
+) ENGINE=InnoDB;
+
+-- Secondary indexes (seed_data.py --defer-indexes builds these after the bulk load)
+CREATE INDEX idx_transactions_user_date ON transactions (user_id, transaction_date);
+CREATE INDEX idx_transactions_category_date ON transactions (category, transaction_date);
+CREATE INDEX idx_transactions_date ON transactions (transaction_date);
+CREATE INDEX idx_profiles_updated ON profiles (updated_at);
+-- search_transactions "text" filter: MATCH(description, merchant_name) AGAINST (...)
+CREATE FULLTEXT INDEX idx_transactions_text ON transactions (description, merchant_name);
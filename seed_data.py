@@ -0,0 +1,307 @@
+"""Synthetic data generator for the profiles and transactions tables.
+
+Builds the schema from schema.sql and bulk-loads realistic data:
+heavy-tailed user activity, weighted categories with per-category amount
+distributions and merchants, and dates spread across a configurable range.
+
+Usage:
+    python seed_data.py --scale 1e6
+    python seed_data.py --scale 1e8 --method load-data --defer-indexes
+    python seed_data.py --scale 1e4 --csv-dir ./seed   # write CSVs only
+"""
+import argparse
+import bisect
+import csv
+import itertools
+import math
+import os
+import random
+import re
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, List, Sequence, Tuple
+
+# Database configuration
+DB_CONFIG = {
+    'host': 'localhost',
+    'user': 'root',
+    'password': '12345678',
+    'database': 'chatbot_db',
+    'port': 3306
+}
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.sql")
+
+# Scale presets: number of transactions generated
+SCALE_PRESETS = {
+    "1e4": 10_000,
+    "1e6": 1_000_000,
+    "1e8": 100_000_000,
+}
+
+# Category -> (weight, lognormal mu, lognormal sigma, transaction type, merchants)
+CATEGORIES = {
+    "food": (0.28, 2.8, 0.7, "debit", ["Starbucks", "McDonald's", "Chipotle", "Whole Foods", "Subway"]),
+    "shopping": (0.20, 3.6, 1.0, "debit", ["Amazon", "Walmart", "Target", "Best Buy", "IKEA"]),
+    "transport": (0.12, 2.9, 0.6, "debit", ["Uber", "Lyft", "Shell", "Chevron", "Metro Transit"]),
+    "utilities": (0.08, 4.3, 0.4, "debit", ["City Power", "Comcast", "AT&T", "Water Works"]),
+    "entertainment": (0.08, 3.0, 0.8, "debit", ["Netflix", "Spotify", "AMC Theatres", "Steam"]),
+    "health": (0.05, 3.8, 0.9, "debit", ["CVS", "Walgreens", "City Clinic"]),
+    "travel": (0.04, 5.6, 0.9, "debit", ["Delta", "United", "Marriott", "Airbnb", "Expedia"]),
+    "salary": (0.07, 8.0, 0.4, "credit", ["Payroll"]),
+    "refund": (0.04, 3.2, 0.9, "credit", ["Amazon", "Walmart", "Delta"]),
+    "transfer": (0.04, 5.0, 1.1, "credit", ["Bank Transfer", "Zelle", "PayPal"]),
+}
+
+STATUSES = (["completed"] * 92) + (["pending"] * 6) + (["failed"] * 2)
+
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda",
+               "David", "Elizabeth", "Priya", "Wei", "Carlos", "Fatima", "Yuki", "Olga"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+              "Patel", "Chen", "Nguyen", "Kim", "Lopez", "Ivanova", "Okafor", "Sato"]
+BUSINESS_WORDS = ["Acme", "Globex", "Initech", "Umbrella", "Stark", "Wayne", "Hooli", "Vandelay",
+                  "Soylent", "Cyberdyne", "Wonka", "Tyrell"]
+BUSINESS_SUFFIXES = ["LLC", "Inc", "Traders", "Studio", "Consulting", "Foods", "Logistics"]
+
+PROFILE_COLUMNS = ("user_id", "user_name", "created_date", "phone_number", "business_name", "email_id")
+TRANSACTION_COLUMNS = ("transaction_id", "user_id", "transaction_date", "amount", "transaction_type",
+                       "description", "status", "category", "merchant_name")
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def users_for_scale(transactions: int) -> int:
+    """Default user count: roughly 100 transactions per user on average"""
+    return max(10, transactions // 100)
+
+
+def generate_profiles(users: int, rng: random.Random, start: datetime) -> Iterator[Tuple]:
+    """Yield profile rows U0000001, U0000002, ..."""
+    for i in range(1, users + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        business = f"{rng.choice(BUSINESS_WORDS)} {rng.choice(BUSINESS_SUFFIXES)}"
+        yield (
+            f"U{i:07d}",
+            f"{first} {last}",
+            (start - timedelta(days=rng.randrange(3 * 365))).strftime(DATE_FORMAT),
+            f"+1-{rng.randrange(200, 999)}-{rng.randrange(1000000):07d}",
+            business,
+            f"{first.lower()}.{last.lower()}{i}@example.com",
+        )
+
+
+def user_activity_weights(users: int, skew: float) -> List[float]:
+    """Cumulative Zipf weights so a few users own most transactions"""
+    return list(itertools.accumulate(1.0 / math.pow(rank, skew) for rank in range(1, users + 1)))
+
+
+def generate_transactions(count: int, user_ids: Sequence[str], rng: random.Random,
+                          start: datetime, end: datetime, skew: float = 1.1,
+                          first_id: int = 1) -> Iterator[Tuple]:
+    """Yield transaction rows with heavy-tailed users and weighted categories"""
+    # Shuffle the rank -> user mapping so heavy users are not just the lowest IDs
+    ranked_users = list(user_ids)
+    rng.shuffle(ranked_users)
+    user_weights = user_activity_weights(len(ranked_users), skew)
+    total_user_weight = user_weights[-1]
+
+    category_names = list(CATEGORIES)
+    category_weights = list(itertools.accumulate(CATEGORIES[name][0] for name in category_names))
+    total_category_weight = category_weights[-1]
+
+    span_seconds = int((end - start).total_seconds())
+
+    for i in range(first_id, first_id + count):
+        user_id = ranked_users[bisect.bisect_left(user_weights, rng.random() * total_user_weight)]
+        category = category_names[bisect.bisect_left(category_weights, rng.random() * total_category_weight)]
+        _, mu, sigma, transaction_type, merchants = CATEGORIES[category]
+        merchant = rng.choice(merchants)
+        amount = round(min(rng.lognormvariate(mu, sigma), 99999.0), 2)
+        # Triangular distribution skews activity towards the recent end of the range
+        when = start + timedelta(seconds=int(rng.triangular(0, span_seconds, span_seconds)))
+
+        yield (
+            f"T{i:010d}",
+            user_id,
+            when.strftime(DATE_FORMAT),
+            amount,
+            transaction_type,
+            f"{merchant} {category}",
+            rng.choice(STATUSES),
+            category,
+            merchant,
+        )
+
+
+def batched(rows: Iterator[Tuple], size: int) -> Iterator[List[Tuple]]:
+    """Group an iterator into lists of at most ``size`` rows"""
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def split_schema(schema_sql: str) -> Tuple[List[str], List[str]]:
+    """Split schema.sql into table statements and secondary index statements"""
+    statements = [s.strip() for s in re.sub(r"--[^\n]*", "", schema_sql).split(";") if s.strip()]
+    is_index = re.compile(r"CREATE\s+(FULLTEXT\s+)?INDEX", re.IGNORECASE).match
+    tables = [s for s in statements if not is_index(s)]
+    indexes = [s for s in statements if is_index(s)]
+    return tables, indexes
+
+
+def insert_rows(cursor, table: str, columns: Sequence[str], batch: List[Tuple]):
+    """Insert a batch with a single multi-row INSERT statement"""
+    row_placeholder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES " + ", ".join([row_placeholder] * len(batch))
+    cursor.execute(query, [value for row in batch for value in row])
+
+
+def load_data_rows(cursor, table: str, columns: Sequence[str], batch: List[Tuple]):
+    """Insert a batch through a temporary CSV file and LOAD DATA LOCAL INFILE"""
+    with tempfile.NamedTemporaryFile("w", newline="", suffix=".csv", delete=False) as f:
+        csv.writer(f).writerows(batch)
+        path = f.name
+    try:
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} "
+            "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+            "LINES TERMINATED BY '\\r\\n' "
+            f"({', '.join(columns)})",
+            (path,),
+        )
+    finally:
+        os.unlink(path)
+
+
+def write_csv(path: str, columns: Sequence[str], rows: Iterator[Tuple]) -> int:
+    """Write rows to a CSV file with a header and return the row count"""
+    written = 0
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for batch in batched(rows, 10_000):
+            writer.writerows(batch)
+            written += len(batch)
+    return written
+
+
+def seed_database(args, user_ids: List[str], rng: random.Random, start: datetime, end: datetime):
+    """Create the schema and bulk-load profiles and transactions into MySQL"""
+    import mysql.connector
+
+    connection = mysql.connector.connect(
+        host=args.host,
+        user=args.user,
+        password=args.password,
+        port=args.port,
+        allow_local_infile=args.method == "load-data",
+    )
+    cursor = connection.cursor()
+
+    with open(SCHEMA_FILE) as f:
+        tables, indexes = split_schema(f.read())
+
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS {args.database}")
+    cursor.execute(f"USE {args.database}")
+    if args.drop:
+        cursor.execute("DROP TABLE IF EXISTS transactions")
+        cursor.execute("DROP TABLE IF EXISTS profiles")
+
+    for statement in tables:
+        if not statement.upper().startswith(("CREATE DATABASE", "USE ")):
+            cursor.execute(statement)
+    if not args.defer_indexes:
+        for statement in indexes:
+            cursor.execute(statement)
+
+    # Bulk-load session settings
+    cursor.execute("SET SESSION unique_checks = 0")
+    cursor.execute("SET SESSION foreign_key_checks = 0")
+    connection.autocommit = False
+
+    load = load_data_rows if args.method == "load-data" else insert_rows
+    started = time.perf_counter()
+
+    profiles = generate_profiles(len(user_ids), rng, start)
+    for batch in batched(profiles, args.batch_size):
+        load(cursor, "profiles", PROFILE_COLUMNS, batch)
+    connection.commit()
+    print(f"✅ Loaded {len(user_ids):,} profiles")
+
+    loaded = 0
+    transactions = generate_transactions(args.transactions, user_ids, rng, start, end, args.skew)
+    for batch in batched(transactions, args.batch_size):
+        load(cursor, "transactions", TRANSACTION_COLUMNS, batch)
+        loaded += len(batch)
+        if loaded % (args.batch_size * args.commit_every) == 0:
+            connection.commit()
+            rate = loaded / (time.perf_counter() - started)
+            print(f"   {loaded:,} / {args.transactions:,} transactions ({rate:,.0f} rows/s)")
+    connection.commit()
+    print(f"✅ Loaded {loaded:,} transactions in {time.perf_counter() - started:.1f}s")
+
+    if args.defer_indexes:
+        for statement in indexes:
+            print(f"🔧 {statement}")
+            cursor.execute(statement)
+
+    cursor.execute("ANALYZE TABLE profiles, transactions")
+    cursor.fetchall()
+    cursor.close()
+    connection.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate and load synthetic profiles and transactions")
+    parser.add_argument("--scale", choices=sorted(SCALE_PRESETS), default="1e4",
+                        help="Number of transactions to generate")
+    parser.add_argument("--transactions", type=int, default=None, help="Override the scale preset")
+    parser.add_argument("--users", type=int, default=None, help="Default: transactions / 100")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for user activity")
+    parser.add_argument("--start-date", default="2023-01-01")
+    parser.add_argument("--end-date", default="2025-01-01")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--method", choices=["insert", "load-data"], default="insert")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--commit-every", type=int, default=20, help="Batches per commit")
+    parser.add_argument("--defer-indexes", action="store_true", help="Build secondary indexes after loading")
+    parser.add_argument("--drop", action="store_true", help="Drop existing tables first")
+    parser.add_argument("--csv-dir", default=None, help="Write profiles.csv/transactions.csv instead of loading")
+    parser.add_argument("--host", default=DB_CONFIG['host'])
+    parser.add_argument("--port", type=int, default=DB_CONFIG['port'])
+    parser.add_argument("--user", default=DB_CONFIG['user'])
+    parser.add_argument("--password", default=DB_CONFIG['password'])
+    parser.add_argument("--database", default=DB_CONFIG['database'])
+    args = parser.parse_args(argv)
+    if args.transactions is None:
+        args.transactions = SCALE_PRESETS[args.scale]
+    if args.users is None:
+        args.users = users_for_scale(args.transactions)
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+    start = datetime.strptime(args.start_date, "%Y-%m-%d")
+    end = datetime.strptime(args.end_date, "%Y-%m-%d")
+    user_ids = [f"U{i:07d}" for i in range(1, args.users + 1)]
+
+    print(f"🌱 Generating {args.users:,} users and {args.transactions:,} transactions (seed={args.seed})")
+
+    if args.csv_dir:
+        os.makedirs(args.csv_dir, exist_ok=True)
+        write_csv(os.path.join(args.csv_dir, "profiles.csv"), PROFILE_COLUMNS,
+                  generate_profiles(args.users, rng, start))
+        count = write_csv(os.path.join(args.csv_dir, "transactions.csv"), TRANSACTION_COLUMNS,
+                          generate_transactions(args.transactions, user_ids, rng, start, end, args.skew))
+        print(f"✅ Wrote {count:,} transactions to {args.csv_dir}")
+    else:
+        seed_database(args, user_ids, rng, start, end)
+
+
+if __name__ == "__main__":
+    main()
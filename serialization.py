@@ -0,0 +1,135 @@
+"""Fast JSON responses and response compression for both services.
+
+``FastJSONResponse`` renders with orjson when it is installed (the stdlib
+``json`` module otherwise, with compact separators). Pydantic models,
+Decimals and named tuples in the content are handled by the ``default``
+hook, so hot endpoints can return one directly and skip FastAPI's
+``jsonable_encoder`` pass. Both apps also use it as their default
+response class.
+
+``CompressionMiddleware`` compresses response bodies of at least
+``RESPONSE_COMPRESSION_MIN_BYTES``. It uses brotli when the client
+accepts it and the ``brotli`` package is installed, and gzip otherwise.
+Server-sent event streams and already-encoded bodies pass through.
+
+Environment:
+    RESPONSE_COMPRESSION            "1" (default) or "0"
+    RESPONSE_COMPRESSION_MIN_BYTES  smallest body worth compressing (default 2048)
+"""
+import gzip
+import json
+import os
+from decimal import Decimal
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "1") != "0"
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "2048"))
+# Fast settings: these run on the request path, per response
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (tuple, set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def dumps(content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+else:
+    def dumps(content: Any) -> bytes:
+        return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    """``br``, ``gzip`` or "" for an Accept-Encoding header (q-values other than 0 are not ranked)"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0"):
+            accepted.add(coding.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return ""
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing large response bodies"""
+
+    def __init__(self, app, minimum_size: int = RESPONSE_COMPRESSION_MIN_BYTES, enabled: bool = RESPONSE_COMPRESSION):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", "")) \
+            if self.enabled and scope["type"] == "http" else ""
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+        chunks = []
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                headers = Headers(raw=start["headers"])
+                # Event streams must flush per event; encoded bodies are left alone
+                if headers.get("content-type", "").startswith("text/event-stream") or "content-encoding" in headers:
+                    passthrough = True
+                    await send(start)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            # Responses behind function middleware arrive in chunks: collect the whole body
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(chunks)
+            headers = MutableHeaders(raw=start["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if len(body) >= self.minimum_size:
+                body = compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,224 @@
+"""Pre-forked pool of warm stdio servers.
+
+A stdio MCP server is spawned per client, so the client waits for
+interpreter start, imports and the database connect before its first
+answer. With a pool, ``serve`` runs once as a parent process. It does the
+imports, then keeps ``size`` forked children waiting on a Unix socket,
+each already warmed (e.g. connected to MySQL).
+
+A client still spawns the usual server command. That process calls
+``attach`` before importing anything heavy: it connects to the socket and
+passes its own stdin, stdout and stderr to a waiting child over
+``SCM_RIGHTS``. The child then talks to the client directly, with no
+copying through the relay. The relay only waits for the child to finish
+and exits with its status, so the client still sees one process it can
+signal. Each child serves one client and exits, and the parent forks a
+replacement as soon as a child is taken.
+
+The socket is created with mode 0600, so only the pool's user can attach.
+``default_socket_path`` puts it in that user's runtime directory.
+
+Unix only. Only the standard library is imported here, so attaching stays
+cheap.
+"""
+import os
+import select
+import signal
+import socket
+import stat
+import struct
+import sys
+import time
+from typing import Callable
+
+_PID = struct.Struct("!i")
+_STATUS = struct.Struct("!i")
+_STOP_SIGNALS = {signal.SIGTERM, signal.SIGINT}
+
+# A child that dies before serving anyone is replaced no faster than this
+RESPAWN_BACKOFF_SECONDS = 1.0
+
+
+def default_socket_path() -> str:
+    """``$XDG_RUNTIME_DIR/mcp_server_pool.sock``, else a private directory under the temp dir"""
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    if not runtime_dir:
+        import tempfile  # only the pool needs it, not attach
+        runtime_dir = os.path.join(tempfile.gettempdir(), f"mcp-server-pool-{os.getuid()}")
+        try:
+            os.mkdir(runtime_dir, 0o700)
+        except FileExistsError:
+            pass
+        info = os.lstat(runtime_dir)
+        # A shared temp dir lets anyone create the directory first
+        if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+            raise PermissionError(f"{runtime_dir} is not a private directory owned by this user")
+    return os.path.join(runtime_dir, "mcp_server_pool.sock")
+
+
+def attach(socket_path: str) -> None:
+    """Hand this process's stdio to a warm pool server and exit with it.
+
+    Returns (doing nothing) when no pool is listening on ``socket_path``,
+    so the caller can start a server itself.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        socket.send_fds(sock, [b"fds"], [0, 1, 2])
+        pid = _PID.unpack(_recv_exact(sock, _PID.size))[0]
+    except OSError:
+        sock.close()
+        return
+
+    # Signals meant for the server reach the relay: pass them on
+    forwarded = None
+
+    def forward(signum, frame):
+        nonlocal forwarded
+        forwarded = signum
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(signum, forward)
+
+    # The child sends its exit status just before it exits
+    try:
+        status = _STATUS.unpack(_recv_exact(sock, _STATUS.size))[0]
+    except OSError:
+        status = None
+    if status is None and forwarded is not None:
+        # Killed by the signal passed on to it: die the same way
+        signal.signal(forwarded, signal.SIG_DFL)
+        os.kill(os.getpid(), forwarded)
+    os._exit(1 if status is None else status & 0xFF)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("pool server closed the connection")
+        data += chunk
+    return data
+
+
+def serve(socket_path: str, size: int, warm: Callable[[], object], run: Callable[[object], None]) -> None:
+    """Keep ``size`` forked servers waiting on ``socket_path`` until SIGTERM or SIGINT.
+
+    Each child calls ``warm()`` right after the fork. Once a client
+    attaches, its stdio is moved onto fds 0-2 and ``run(warm_result)``
+    serves it. Call this with no threads running: only the calling thread
+    survives a fork.
+    """
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # Created 0600 rather than chmod-ed after the bind, which would leave a window
+    umask = os.umask(0o177)
+    try:
+        listener.bind(socket_path)
+    finally:
+        os.umask(umask)
+    listener.listen(size * 4)
+    taken_r, taken_w = os.pipe()
+    idle = set()
+    stopping = False
+
+    def spawn():
+        # Blocked across the fork, so a stop signal cannot reach the child before
+        # it drops the parent's handler
+        signal.pthread_sigmask(signal.SIG_BLOCK, _STOP_SIGNALS)
+        pid = os.fork()
+        if pid:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, _STOP_SIGNALS)
+            idle.add(pid)
+            return
+        # Child: warm up, wait for one client, serve it, report the status, exit
+        status = 1
+        conn = None
+        try:
+            os.close(taken_r)
+            for signum in _STOP_SIGNALS:
+                signal.signal(signum, signal.SIG_DFL)
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, _STOP_SIGNALS)
+            state = warm()
+            conn, _ = listener.accept()
+            listener.close()
+            os.write(taken_w, _PID.pack(os.getpid()))
+            _, fds, _, _ = socket.recv_fds(conn, 16, 3)
+            for target, fd in enumerate(fds):
+                os.dup2(fd, target)
+                os.close(fd)
+            conn.sendall(_PID.pack(os.getpid()))
+            run(state)
+            status = 0
+        except BaseException as e:
+            print(f"pool server {os.getpid()} failed: {e!r}", file=sys.stderr)
+        finally:
+            try:
+                sys.stdout.flush()
+            except OSError:
+                pass
+            if conn is not None:
+                try:
+                    conn.sendall(_STATUS.pack(status))
+                except OSError:
+                    pass
+            os._exit(status)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+    for signum in _STOP_SIGNALS:
+        signal.signal(signum, stop)
+
+    for _ in range(size):
+        spawn()
+    last_respawn = 0.0
+    try:
+        while not stopping:
+            try:
+                readable, _, _ = select.select([taken_r], [], [], 0.5)
+            except InterruptedError:
+                continue
+            if readable:
+                # Each taken child is replaced at once, so clients never wait for a fork
+                data = os.read(taken_r, _PID.size * 64)
+                for (pid,) in _PID.iter_unpack(data[:len(data) - len(data) % _PID.size]):
+                    idle.discard(pid)
+                    if not stopping:
+                        spawn()
+            # Reap finished children; replace idle ones that died before serving
+            while True:
+                try:
+                    pid, _ = os.waitpid(-1, os.WNOHANG)
+                except ChildProcessError:
+                    break
+                if not pid:
+                    break
+                if pid in idle:
+                    idle.discard(pid)
+                    if stopping:
+                        continue
+                    time.sleep(max(0.0, last_respawn + RESPAWN_BACKOFF_SECONDS - time.monotonic()))
+                    last_respawn = time.monotonic()
+                    spawn()
+    finally:
+        # Idle servers go now; ones serving a client finish their session
+        for pid in idle:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in idle:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        listener.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
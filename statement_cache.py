@@ -0,0 +1,137 @@
+"""Per-connection cache of server-side prepared statements.
+
+mysql.connector's prepared cursors keep one statement each and only skip
+re-preparing when ``execute`` receives the *same string object* that was
+prepared. The cache therefore holds one prepared cursor per SQL text and
+hands back both the cursor and the canonical query object to execute.
+
+Caches are keyed weakly by their connection and only hold a weak reference
+back to it, so a connection that is dropped is not kept alive by its cache.
+Code that drops a connection calls ``drop_statement_cache`` first, which
+closes its prepared cursors and deallocates the statements on the server.
+"""
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Tuple
+
+import metrics
+
+DEFAULT_MAX_STATEMENTS = 512
+
+STATEMENT_CACHE_LOOKUPS = metrics.REGISTRY.counter(
+    "prepared_statement_cache_total", "Prepared statement cache lookups", ["result"]
+)
+STATEMENT_CACHE_SIZE = metrics.REGISTRY.gauge(
+    "prepared_statements_cached", "Prepared statements held across all connections"
+)
+
+
+class StatementCache:
+    """LRU of prepared cursors for one connection"""
+
+    def __init__(self, connection, max_statements: int = DEFAULT_MAX_STATEMENTS):
+        self._connection = weakref.ref(connection)
+        self.max_statements = max_statements
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._statements: "OrderedDict[str, Tuple[object, str]]" = OrderedDict()
+
+    def get(self, query: str) -> Tuple[object, str]:
+        """Return ``(cursor, operation)``; execute ``operation`` on ``cursor``"""
+        entry = self._statements.get(query)
+        if entry is not None:
+            self._statements.move_to_end(query)
+            self.hits += 1
+            STATEMENT_CACHE_LOOKUPS.inc(result="hit")
+            return entry
+
+        self.misses += 1
+        STATEMENT_CACHE_LOOKUPS.inc(result="miss")
+        connection = self._connection()
+        if connection is None:
+            raise ReferenceError("the statement cache's connection was closed")
+        entry = (connection.cursor(prepared=True), query)
+        self._statements[query] = entry
+
+        if len(self._statements) > self.max_statements:
+            _, (evicted, _) = self._statements.popitem(last=False)
+            self.evictions += 1
+            try:
+                evicted.close()  # Deallocates the statement on the server
+            except Exception:
+                pass
+        return entry
+
+    def discard(self, query: str):
+        """Drop a statement whose cursor is no longer usable"""
+        entry = self._statements.pop(query, None)
+        if entry is not None:
+            try:
+                entry[0].close()
+            except Exception:
+                pass
+
+    def clear(self):
+        """Close every prepared cursor"""
+        for query in list(self._statements):
+            self.discard(query)
+
+    def __len__(self) -> int:
+        return len(self._statements)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "statements": len(self._statements),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_caches: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+
+def statement_cache_for(connection, max_statements: int = DEFAULT_MAX_STATEMENTS) -> StatementCache:
+    """The statement cache belonging to ``connection``, created on first use"""
+    with _caches_lock:
+        cache = _caches.get(connection)
+        if cache is None:
+            cache = _caches[connection] = StatementCache(connection, max_statements)
+        return cache
+
+
+def drop_statement_cache(connection):
+    """Close and forget ``connection``'s prepared statements (before dropping the connection)"""
+    with _caches_lock:
+        cache = _caches.pop(connection, None)
+    if cache is not None:
+        cache.clear()
+
+
+def _collect_cache_size():
+    with _caches_lock:
+        STATEMENT_CACHE_SIZE.set(sum(len(c) for c in _caches.values()))
+
+
+metrics.REGISTRY.register_collector(_collect_cache_size)
+
+
+def all_cache_stats() -> dict:
+    """Hit-rate totals across every live connection"""
+    with _caches_lock:
+        caches = list(_caches.values())
+    hits = sum(c.hits for c in caches)
+    misses = sum(c.misses for c in caches)
+    return {
+        "connections": len(caches),
+        "statements": sum(len(c) for c in caches),
+        "hits": hits,
+        "misses": misses,
+        "evictions": sum(c.evictions for c in caches),
+        "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+    }
@@ -0,0 +1,51 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import access
+
+
+def admin_app():
+    app = FastAPI()
+    access.guard_admin_routes(app)
+
+    @app.get("/admin/user_directory")
+    async def user_directory():
+        return {"matches": ["alice@example.com"]}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+    return app
+
+
+def test_admin_routes_refuse_remote_clients_without_a_token():
+    client = TestClient(admin_app())  # its requests come from host "testclient"
+    assert client.get("/admin/user_directory").status_code == 403
+    assert client.get("/health").status_code == 200
+
+
+def test_admin_routes_serve_local_clients():
+    client = TestClient(admin_app(), client=("127.0.0.1", 50000))
+    assert client.get("/admin/user_directory").status_code == 200
+
+
+def test_admin_token_is_required_once_set(monkeypatch):
+    monkeypatch.setattr(access, "ADMIN_TOKEN", "secret")
+    client = TestClient(admin_app(), client=("127.0.0.1", 50000))
+    assert client.get("/admin/user_directory").status_code == 403
+    response = client.get("/admin/user_directory", headers={access.ADMIN_TOKEN_HEADER: "secret"})
+    assert response.status_code == 200
+
+
+def test_orchestrator_user_directory_is_guarded():
+    import orchestrator
+    response = TestClient(orchestrator.app).get("/admin/user_directory", params={"q": "alice"})
+    assert response.status_code == 403
+
+
+def test_mcp_server_admin_routes_are_guarded():
+    import mcp_server_sse
+    client = TestClient(mcp_server_sse.app)
+    for method, path in [("GET", "/admin/db"), ("GET", "/admin/query_stats"), ("DELETE", "/admin/query_stats"),
+                         ("POST", "/admin/columnar/refresh"), ("GET", "/admin/jobs")]:
+        assert client.request(method, path).status_code == 403, path
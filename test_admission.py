@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+
+import admission
+
+
+def limiter(limit=1, max_queue=10, max_wait=5.0):
+    return admission.ConcurrencyLimiter("test", "gate", limit, max_queue, max_wait)
+
+
+async def hold(gate, order, name, release):
+    async with gate.slot():
+        order.append(name)
+        await release.wait()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_slots_are_handed_over_in_arrival_order():
+    async def scenario():
+        gate = limiter()
+        order = []
+        releases = {name: asyncio.Event() for name in "abcd"}
+        tasks = {"a": asyncio.create_task(hold(gate, order, "a", releases["a"]))}
+        await settle()
+        for name in "bcd":
+            tasks[name] = asyncio.create_task(hold(gate, order, name, releases[name]))
+            await settle()
+        assert order == ["a"] and len(gate._waiters) == 3
+
+        for name in "abcd":
+            releases[name].set()
+            await settle()
+            if name == "a":
+                # A newcomer finds the slot already handed to the oldest waiter
+                late = asyncio.create_task(hold(gate, order, "late", asyncio.Event()))
+                await settle()
+                assert order == ["a", "b"]
+                late.cancel()
+        await asyncio.gather(*tasks.values())
+        assert order == ["a", "b", "c", "d"]
+        assert gate.in_flight == 0 and not gate._waiters
+    asyncio.run(scenario())
+
+
+def test_full_queue_rejects_at_once():
+    async def scenario():
+        gate = limiter(max_queue=1)
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(hold(gate, [], name, release)) for name in "ab"]
+        await settle()
+        with pytest.raises(admission.Rejected, match="at capacity"):
+            async with gate.slot():
+                pass
+        release.set()
+        await asyncio.gather(*tasks)
+        assert gate.in_flight == 0
+    asyncio.run(scenario())
+
+
+def test_queue_timeout_rejects_and_leaves_the_slot_free():
+    async def scenario():
+        gate = limiter(max_wait=0.01)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(gate, [], "a", release))
+        await settle()
+        with pytest.raises(admission.Rejected, match="queue wait exceeded"):
+            async with gate.slot():
+                pass
+        assert gate.in_flight == 1 and not gate._waiters
+        release.set()
+        await holder
+        assert gate.in_flight == 0
+    asyncio.run(scenario())
+
+
+def test_grant_racing_the_timeout_passes_the_slot_on(monkeypatch):
+    wait_for = asyncio.wait_for
+    gate = limiter()
+    release = asyncio.Event()
+    order = []
+
+    async def granted_as_it_times_out(awaitable, timeout):
+        # The holder hands its slot to this waiter just as the wait expires
+        awaitable.cancel()
+        while len(gate._waiters) < 2:
+            await asyncio.sleep(0)
+        release.set()
+        await holder
+        raise asyncio.TimeoutError
+
+    async def scenario():
+        nonlocal holder
+        holder = asyncio.create_task(hold(gate, order, "a", release))
+        await settle()
+        monkeypatch.setattr(admission.asyncio, "wait_for", granted_as_it_times_out)
+        racer = asyncio.create_task(gate.slot().__aenter__())
+        await settle()
+        monkeypatch.setattr(admission.asyncio, "wait_for", wait_for)
+        next_in_line = asyncio.create_task(hold(gate, order, "next", asyncio.Event()))
+
+        with pytest.raises(admission.Rejected, match="queue wait exceeded"):
+            await racer
+        await settle()
+        # The slot granted to the timed-out request went to the next waiter, not lost
+        assert order == ["a", "next"]
+        assert gate.in_flight == 1 and not gate._waiters
+        next_in_line.cancel()
+        await asyncio.gather(next_in_line, return_exceptions=True)
+        assert gate.in_flight == 0
+
+    holder = None
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        gate = limiter()
+        order = []
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(gate, order, "a", release))
+        await settle()
+        cancelled = asyncio.create_task(hold(gate, order, "cancelled", asyncio.Event()))
+        waiting = asyncio.create_task(hold(gate, order, "b", release))
+        await settle()
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        assert len(gate._waiters) == 1
+
+        release.set()
+        await asyncio.gather(holder, waiting)
+        assert order == ["a", "b"]
+        assert gate.in_flight == 0 and not gate._waiters
+    asyncio.run(scenario())
+
+
+def test_cancellation_racing_a_grant_never_leaks_the_slot():
+    async def scenario():
+        gate = limiter()
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(gate, [], "a", release))
+        await settle()
+        waiter = asyncio.create_task(hold(gate, [], "b", release))
+        await settle()
+
+        # The holder's exit grants the slot and the cancel lands before the waiter
+        # resumes. Whether the grant or the cancel wins depends on the Python
+        # version's wait_for; either way the slot must come back
+        holder.add_done_callback(lambda _: waiter.cancel())
+        release.set()
+        await asyncio.gather(holder, waiter, return_exceptions=True)
+        assert gate.in_flight == 0 and not gate._waiters
+
+        async with gate.slot():
+            assert gate.in_flight == 1
+    asyncio.run(scenario())
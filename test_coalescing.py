@@ -0,0 +1,103 @@
+import asyncio
+import threading
+
+import pytest
+
+import tool_core
+from benchmarks.fakes import FakeConnection
+from coalescing import SingleFlight
+from db import DatabaseRouter
+
+
+def test_followers_share_the_leaders_result():
+    async def scenario():
+        flight = SingleFlight("test")
+        started = asyncio.Event()
+        finish = asyncio.Event()
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            started.set()
+            await finish.wait()
+            return "result"
+
+        leader = asyncio.create_task(flight.run("key", "tool", call))
+        await started.wait()
+        followers = [asyncio.create_task(flight.run("key", "tool", call)) for _ in range(3)]
+        await asyncio.sleep(0)
+        finish.set()
+        assert await asyncio.gather(leader, *followers) == ["result"] * 4
+        assert calls == 1 and flight.followers == 3
+        assert flight.describe()["in_flight"] == 0
+    asyncio.run(scenario())
+
+
+def test_followers_share_the_leaders_error():
+    async def scenario():
+        flight = SingleFlight("test")
+        finish = asyncio.Event()
+
+        async def call():
+            await finish.wait()
+            raise ValueError("boom")
+
+        callers = [asyncio.create_task(flight.run("key", "tool", call)) for _ in range(2)]
+        await asyncio.sleep(0)
+        finish.set()
+        for result in await asyncio.gather(*callers, return_exceptions=True):
+            assert isinstance(result, ValueError)
+    asyncio.run(scenario())
+
+
+def test_leader_disconnecting_does_not_cancel_the_execution():
+    async def scenario():
+        flight = SingleFlight("test")
+        finish = asyncio.Event()
+
+        async def call():
+            await finish.wait()
+            return "result"
+
+        leader = asyncio.create_task(flight.run("key", "tool", call))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.run("key", "tool", call))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.gather(leader, return_exceptions=True)
+        finish.set()
+        assert await follower == "result"
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def fake_database(monkeypatch):
+    database = FakeConnection(users=5, transactions=200)
+    monkeypatch.setattr(tool_core, "db_router", DatabaseRouter(tool_core.DB_CONFIG, connect_fn=lambda config: database.session()))
+    return database
+
+
+def test_calls_arriving_while_the_query_runs_are_coalesced(monkeypatch, fake_database):
+    # Queries block until released, as a slow query would
+    release = threading.Event()
+    fake_database.on_execute = lambda elapsed: release.wait(5)
+    monkeypatch.setattr(tool_core, "tool_flight", SingleFlight("test"))
+    user_id = fake_database.user_ids[0]
+
+    async def scenario():
+        leader = asyncio.create_task(tool_core.call_tool_shared("get_transaction_summary", {"user_id": user_id}))
+        followers = []
+        for _ in range(3):
+            # Later loop iterations: the event loop stays free while the query runs
+            await asyncio.sleep(0.01)
+            followers.append(asyncio.create_task(
+                tool_core.call_tool_shared("get_transaction_summary", {"user_id": user_id})))
+        await asyncio.sleep(0.01)
+        assert tool_core.tool_concurrency.in_flight == 1
+        release.set()
+        results = await asyncio.gather(leader, *followers)
+        assert len(set(results)) == 1 and results[0].startswith("Transaction Summary")
+        assert tool_core.tool_flight.describe()["executions"] == 1
+        assert tool_core.tool_flight.describe()["coalesced"] == 3
+    asyncio.run(scenario())
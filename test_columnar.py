@@ -0,0 +1,51 @@
+import sqlite3
+
+import pytest
+
+import columnar
+
+pytest.importorskip("numpy")
+
+ROWS = [
+    ("T1", "U001", "2024-01-05 10:00:00", 12.5, "debit", "Latte", "completed", "Food", "Starbucks"),
+    ("T2", "U002", "2024-01-06 11:00:00", 30.0, "debit", "Lunch", "completed", "food", "STARBUCKS"),
+    ("T3", "U001", "2024-02-01 09:00:00", 99.0, "Debit", "Shoes", "completed", "Shopping", "Nike"),
+    ("T4", "U003", "2024-02-03 12:00:00", 500.0, "credit", "Salary", "completed", "Income", "Acme"),
+]
+
+
+@pytest.fixture
+def snapshot():
+    assert columnar._import_numpy()
+    return columnar.ColumnarSnapshot({name: list(values) for name, values in zip(columnar.COLUMNS, zip(*ROWS))}, 0.0)
+
+
+@pytest.fixture
+def sql():
+    # NOCASE stands in for MySQL's default case-insensitive collation
+    conn = sqlite3.connect(":memory:")
+    conn.execute(f"CREATE TABLE transactions ({', '.join(c + ' COLLATE NOCASE' for c in columnar.COLUMNS)})")
+    conn.executemany(f"INSERT INTO transactions VALUES ({', '.join('?' * len(columnar.COLUMNS))})", ROWS)
+    return conn
+
+
+@pytest.mark.parametrize("filters", [
+    {"category": "FOOD"},
+    {"merchant_name": "starbucks"},
+    {"transaction_type": "DEBIT", "min_amount": 20},
+    {"user_id": "u001"},
+    {"category": "travel"},
+])
+def test_filters_match_sql_regardless_of_case(snapshot, sql, filters):
+    where = " AND ".join("amount >= ?" if name == "min_amount" else f"{name} = ?" for name in filters)
+    expected = {row[0] for row in sql.execute(f"SELECT transaction_id FROM transactions WHERE {where}",
+                                              list(filters.values()))}
+    rows, total = snapshot.search(filters, 10)
+    assert {row["transaction_id"] for row in rows} == expected and total == len(expected)
+
+
+def test_group_by_merges_spellings_like_sql(snapshot, sql):
+    expected = sql.execute("SELECT COUNT(*), SUM(amount) FROM transactions GROUP BY category ORDER BY category").fetchall()
+    groups = snapshot.aggregate({}, ("category",), ("count", "sum"), 10)
+    assert [(g["count"], g["sum"]) for g in groups] == [tuple(row) for row in expected]
+    assert groups[0]["category"].casefold() == "food"
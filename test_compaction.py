@@ -0,0 +1,67 @@
+import compaction
+from compaction import compact_tool_result, estimate_tokens, parse_transaction_blocks
+
+
+def search_result(amounts):
+    blocks = [f"""
+Transaction ID: T{i:03d}
+User ID: U001
+Date: 2024-01-{i % 28 + 1:02d} 10:00:00
+Amount: ${amount:.2f} ({kind})
+Category: Food
+Description: Purchase number {i}
+Status: completed
+Merchant: Store {i}
+{'-' * 30}
+""" for i, (amount, kind) in enumerate(amounts)]
+    return f"Search Results (showing {len(amounts)} of {len(amounts)}):\n{'=' * 50}\n" + "".join(blocks)
+
+
+def test_transaction_blocks_parse_into_records():
+    header, records = parse_transaction_blocks(search_result([(12.5, "debit"), (100.0, "credit")]))
+    assert header == ["Search Results (showing 2 of 2):"]
+    assert records[0] == {"id": "T000", "user": "U001", "date": "2024-01-01 10:00:00", "amount": "12.50",
+                          "type": "debit", "category": "Food", "description": "Purchase number 0",
+                          "status": "completed", "merchant": "Store 0"}
+    assert records[1]["type"] == "credit"
+
+
+def test_rows_past_the_budget_roll_up_with_their_totals(monkeypatch):
+    monkeypatch.setitem(compaction.TOKEN_BUDGETS, "search_transactions", 120)
+    amounts = [(10.0, "debit"), (20.0, "credit")] * 20
+    result = compact_tool_result("search_transactions", search_result(amounts))
+
+    lines = result.text.splitlines()
+    assert lines[0] == "Search Results (showing 40 of 40):"
+    assert lines[1].startswith("id,user,date,amount,type")
+    shown = len(lines) - 3  # header, column names and the rollup line
+    assert 0 < shown < 40 and result.omitted_rows == 40 - shown
+    omitted = amounts[shown:]
+    credits = sum(a for a, kind in omitted if kind == "credit")
+    debits = sum(a for a, kind in omitted if kind == "debit")
+    assert lines[-1] == (f"...and {len(omitted)} more totalling ${credits + debits:,.2f}"
+                         f" (credits ${credits:,.2f}, debits ${debits:,.2f})")
+    assert result.compact_tokens <= 120 and result.tokens_saved > 0
+
+
+def test_first_row_is_kept_even_over_budget(monkeypatch):
+    monkeypatch.setitem(compaction.TOKEN_BUDGETS, "search_transactions", 30)
+    result = compact_tool_result("search_transactions", search_result([(1.0, "debit")] * 3))
+    assert result.omitted_rows == 2
+    assert result.text.splitlines()[-1] == "...and 2 more totalling $2.00"
+
+
+def test_other_results_are_cut_at_a_line_boundary(monkeypatch):
+    monkeypatch.setitem(compaction.TOKEN_BUDGETS, "get_profile", 40)
+    text = "\n".join(f"line {i}: " + "x" * 20 for i in range(20))
+    result = compact_tool_result("get_profile", text)
+    kept = result.text.splitlines()
+    assert kept[-1] == f"...and {20 - len(kept) + 1} more lines"
+    assert all(line in text.splitlines() for line in kept[:-1])
+    assert result.omitted_rows == 20 - len(kept) + 1
+
+
+def test_small_results_pass_through():
+    text = "User Profile Details:\n- User ID: U001"
+    result = compact_tool_result("get_profile", text)
+    assert result.text == text and result.original_tokens == estimate_tokens(text) and result.omitted_rows == 0
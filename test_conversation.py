@@ -0,0 +1,65 @@
+import asyncio
+from typing import NamedTuple
+
+from conversation import ConversationStore, clip, extractive_summary
+
+
+class Message(NamedTuple):
+    role: str
+    content: str
+
+
+def turns(count):
+    return [Message("user" if i % 2 == 0 else "assistant", f"message {i}") for i in range(count)]
+
+
+async def settle(conversation):
+    if conversation._folding is not None:
+        await conversation._folding
+
+
+def test_messages_leaving_the_window_are_folded_into_the_summary():
+    folded = []
+
+    async def summarize(summary, messages):
+        folded.append([m.content for m in messages])
+        return (summary + " " if summary else "") + f"{len(messages)} folded"
+
+    async def scenario():
+        store = ConversationStore(summarize, recent_messages=2, fold_batch=2)
+        conversation = store.get("c1")
+        store.append(conversation, *turns(3))
+        assert conversation._folding is None  # one message pending, below the batch
+        store.append(conversation, Message("user", "message 3"))
+        await settle(conversation)
+        assert folded == [["message 0", "message 1"]]
+        assert conversation.summary == "2 folded"
+        assert [m.content for m in conversation.messages] == ["message 2", "message 3"]
+        assert "Summary of earlier conversation: 2 folded" in conversation.prompt_history()
+    asyncio.run(scenario())
+
+
+def test_a_failed_summary_falls_back_to_extractive_lines():
+    async def summarize(summary, messages):
+        raise RuntimeError("LLM unavailable")
+
+    async def scenario():
+        store = ConversationStore(summarize, recent_messages=1, fold_batch=2)
+        conversation = store.get("c1")
+        store.append(conversation, *turns(3))
+        await settle(conversation)
+        assert conversation.summary == "user: message 0\nassistant: message 1"
+        assert not conversation.pending
+    asyncio.run(scenario())
+
+
+def test_extractive_summary_drops_the_oldest_lines_to_fit():
+    messages = [Message("user", "word " * 30) for _ in range(6)]
+    summary = extractive_summary("earliest line", messages, budget=60)
+    assert "earliest line" not in summary
+    assert len(summary) <= 60 * 4 + 2
+
+
+def test_clip_cuts_at_a_word_boundary():
+    assert clip("short", 10) == "short"
+    assert clip("alpha beta gamma delta", 3) == "alpha beta …"
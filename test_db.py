@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import pytest
+
+import db
+from benchmarks.fakes import FakeConnection
+from db import DatabaseRouter, WorkerConnections, bind_worker_connections
+
+
+@pytest.fixture
+def router():
+    database = FakeConnection(users=2, transactions=10)
+    nodes = {}
+    down = set()
+
+    def connect(config):
+        if config['port'] in down:
+            raise OSError("connection refused")
+        connection = database.session()
+        nodes[id(connection)] = config['port']
+        return connection
+
+    primary = {'host': 'localhost', 'user': 'u', 'password': 'p', 'database': 'd', 'port': 3306}
+    router = DatabaseRouter(primary, db.parse_replicas("localhost:3307", primary), connect_fn=connect)
+    router.port_of = lambda connection: nodes[id(connection)]
+    router.down = down
+    replica = router.replicas[0]
+    replica.last_lag_check = time.monotonic()  # the fake has no replication status to read
+    token = bind_worker_connections(WorkerConnections(router))
+    yield router
+    db._worker_connections.reset(token)
+
+
+def test_worker_leaves_a_replica_once_it_lags(router):
+    replica = router.replicas[0]
+    assert router.port_of(router.checkout_read()) == 3307
+    replica.lag_seconds = router.max_lag_seconds + 1
+    routed = db.DB_ROUTED.value(node="primary", reason="replica_fallback")
+    assert router.port_of(router.checkout_read()) == 3306
+    assert db.DB_ROUTED.value(node="primary", reason="replica_fallback") == routed + 1
+
+
+def test_worker_connection_is_reused_without_a_ping(router, monkeypatch):
+    connection = router.checkout_read()
+    monkeypatch.setattr(type(connection), "is_connected", lambda self: pytest.fail("pinged"))
+    assert router.checkout_read() is connection
+
+
+def test_worker_failures_count_against_the_nodes_breaker(router):
+    replica = router.replicas[0]
+    connection = router.checkout_read()
+    assert router.port_of(connection) == 3307
+    router.down.add(3307)
+    router.report_failure(connection)
+    assert replica.breaker.failures == 1
+    # Reconnects to the replica fail until its breaker opens; reads go to the primary meanwhile
+    for _ in range(db.DB_BREAKER_FAILURES - 1):
+        assert router.port_of(router.checkout_read()) == 3306
+    assert replica.breaker.state == "open"
+
+
+def test_a_replaced_router_rebinds_worker_connections(monkeypatch):
+    import tool_core
+
+    def router_over(database):
+        return DatabaseRouter(tool_core.DB_CONFIG, connect_fn=lambda config: database.session())
+
+    async def profiles(user_id):
+        calls = [tool_core.run_in_tool_worker(tool_core.execute_get_profile, user_id)
+                 for _ in range(tool_core.TOOL_MAX_CONCURRENCY)]
+        return await asyncio.gather(*calls)
+
+    first = FakeConnection(users=2, transactions=10)
+    second = FakeConnection(users=2, transactions=10)
+    second._sqlite.execute("UPDATE profiles SET user_name = 'Replacement'")
+    user_id = first.user_ids[0]
+    monkeypatch.setattr(tool_core, "db_router", router_over(first))
+    assert not any("Replacement" in result for result in asyncio.run(profiles(user_id)))
+    monkeypatch.setattr(tool_core, "db_router", router_over(second))
+    # Every worker thread, including those bound to the first router, reads through the replacement
+    assert all("Replacement" in result for result in asyncio.run(profiles(user_id)))
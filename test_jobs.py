@@ -0,0 +1,49 @@
+import threading
+import time
+
+from jobs import JobScheduler
+
+
+def test_interactive_job_starts_while_standard_and_analytics_fill_their_shares():
+    release = threading.Event()
+
+    def execute(job):
+        if job.priority != "interactive":
+            release.wait(5)
+        return job.tool_name
+
+    scheduler = JobScheduler(execute, workers=4, analytics_workers=2)
+    scheduler.start()
+    try:
+        background = [scheduler.submit("aggregate_transactions", {}, "analytics") for _ in range(2)]
+        background += [scheduler.submit("search_transactions", {}, "standard") for _ in range(3)]
+        interactive = scheduler.submit("get_profile", {"user_id": "U001"}, "interactive")
+        assert interactive.finished.wait(1), scheduler.describe()
+        assert interactive.result == "get_profile"
+        # Standard and analytics together never held more than workers - 1
+        running = scheduler.describe()["running"]
+        assert running["standard"] + running["analytics"] == 3
+        assert [job.status for job in background].count("queued") == 2
+    finally:
+        release.set()
+        scheduler.stop()
+    for job in background:
+        assert job.finished.wait(5)
+
+
+def test_analytics_keeps_its_own_share():
+    release = threading.Event()
+    scheduler = JobScheduler(lambda job: release.wait(5) and "done", workers=4, analytics_workers=1)
+    scheduler.start()
+    try:
+        jobs = [scheduler.submit("aggregate_transactions", {}, "analytics") for _ in range(3)]
+        standard = scheduler.submit("search_transactions", {}, "standard")
+        for _ in range(50):
+            if standard.status == "running":
+                break
+            time.sleep(0.01)
+        assert scheduler.describe()["running"] == {"interactive": 0, "standard": 1, "analytics": 1}
+        assert [job.status for job in jobs].count("queued") == 2
+    finally:
+        release.set()
+        scheduler.stop()
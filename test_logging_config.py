@@ -0,0 +1,39 @@
+import json
+import logging
+
+from logging_config import REDACTED, JSONFormatter, RedactionFilter, log_event
+
+
+def format_redacted(message, **extra):
+    record = logging.makeLogRecord({"name": "test", "levelno": logging.INFO, "levelname": "INFO", "msg": message, **extra})
+    assert RedactionFilter().filter(record)
+    return json.loads(JSONFormatter().format(record))
+
+
+def test_extra_attributes_are_redacted_like_fields():
+    entry = format_redacted("lookup", email="alice@example.com", user_id="U001",
+                            fields={"phone": "555-0100", "tool": "get_profile"})
+    assert entry["email"] == REDACTED and entry["phone"] == REDACTED
+    assert entry["user_id"] == "U001" and entry["tool"] == "get_profile"
+
+
+def test_pii_in_messages_is_masked():
+    entry = format_redacted("mail alice@example.com or call +1 555 010 0199")
+    assert "alice@example.com" not in entry["msg"] and "555" not in entry["msg"]
+
+
+def test_log_event_snapshots_mutable_fields():
+    records = []
+
+    class Capture(logging.Handler):
+        def emit(self, record):
+            records.append(record)
+
+    logger = logging.getLogger("test_log_event")
+    logger.setLevel(logging.INFO)
+    logger.addHandler(Capture())
+    logger.propagate = False
+    arguments = {"user_id": "me"}
+    log_event(logger, logging.INFO, "tool_call", arguments=arguments)
+    arguments["user_id"] = "U001"  # edited before the listener formats the record
+    assert records[0].fields["arguments"] == {"user_id": "me"}
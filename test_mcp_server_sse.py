@@ -0,0 +1,16 @@
+from fastapi.testclient import TestClient
+
+import mcp_server_sse
+import tool_core
+from benchmarks.fakes import FakeConnection
+from db import DatabaseRouter
+
+
+def test_directory_page_size_is_clamped(monkeypatch):
+    database = FakeConnection(users=5, transactions=10)
+    monkeypatch.setattr(tool_core, "db_router", DatabaseRouter(tool_core.DB_CONFIG, connect_fn=lambda c: database.session()))
+    client = TestClient(mcp_server_sse.app, client=("127.0.0.1", 50000))
+    for limit, rows in ((-1, 1), (0, 1), (3, 3), (10 ** 9, 5)):
+        response = client.get("/directory/users", params={"limit": limit})
+        assert response.status_code == 200
+        assert len(response.json()["rows"]) == rows
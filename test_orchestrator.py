@@ -0,0 +1,19 @@
+import asyncio
+
+import orchestrator
+from resilience import StaleCache, request_key
+
+
+def test_tool_errors_are_not_kept_as_last_known_good(monkeypatch):
+    monkeypatch.setattr(orchestrator, "tool_results", StaleCache())
+    answers = iter([(200, "Database error: Lost connection to MySQL server"), (200, "User Profile Details: ...")])
+
+    async def post(tool_name, arguments, read_your_writes=False):
+        return next(answers)
+    monkeypatch.setattr(orchestrator, "post_mcp_tool_call", post)
+
+    arguments = {"user_id": "U001"}
+    assert asyncio.run(orchestrator.call_mcp_tool("get_profile", arguments)).startswith("Database error")
+    assert orchestrator.tool_results.get(request_key("get_profile", arguments)) is None
+    asyncio.run(orchestrator.call_mcp_tool("get_profile", arguments))
+    assert orchestrator.tool_results.get(request_key("get_profile", arguments))[0] == "User Profile Details: ..."
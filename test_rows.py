@@ -0,0 +1,37 @@
+from datetime import datetime
+
+import pytest
+
+from rows import ResultSet, compile_layout, format_rows
+
+COLUMNS = ("transaction_id", "amount", "merchant_name", "transaction_date")
+RESULT = ResultSet(COLUMNS, [
+    ("T1", 12.5, "Cafe {Brackets}", datetime(2024, 1, 5, 10, 0)),
+    ("T2", 3.0, "Store", datetime(2024, 1, 6, 11, 30)),
+])
+
+
+def test_compiled_layout_matches_str_format():
+    layout = "{transaction_id}: ${amount:.2f} at {merchant_name!r} on {transaction_date:%Y-%m-%d} {{literal}}\n"
+    expected = "".join(layout.format(**row.as_dict()) for row in RESULT)
+    assert format_rows(layout, RESULT) == expected
+    assert compile_layout(layout, COLUMNS) is compile_layout(layout, COLUMNS)
+
+
+def test_format_rows_joins_with_the_separator():
+    assert format_rows("{transaction_id}", RESULT, separator=", ") == "T1, T2"
+    assert format_rows("{transaction_id}", ResultSet(COLUMNS, [])) == ""
+
+
+def test_unknown_layout_field_fails_at_compile_time():
+    with pytest.raises(KeyError):
+        compile_layout("{user_id}", COLUMNS)
+
+
+def test_rows_read_like_dicts():
+    row = RESULT.first()
+    assert row["amount"] == 12.5 and row.get("missing", "-") == "-" and "merchant_name" in row
+    assert list(row.keys()) == list(COLUMNS)
+    assert RESULT.column("transaction_id") == ["T1", "T2"]
+    assert [r["transaction_id"] for r in RESULT] == ["T1", "T2"] and len(RESULT) == 2
+    assert ResultSet(COLUMNS, []).first() is None and not ResultSet(COLUMNS, [])
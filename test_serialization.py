@@ -0,0 +1,80 @@
+import gzip
+import json
+from decimal import Decimal
+from typing import NamedTuple
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+import serialization
+from serialization import CompressionMiddleware, FastJSONResponse, choose_encoding
+
+BIG = {"rows": ["transaction %d" % i for i in range(500)]}
+
+
+def compressed_app():
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=1024, enabled=True)
+
+    @app.get("/big")
+    async def big():
+        return BIG
+
+    @app.get("/small")
+    async def small():
+        return {"status": "ok"}
+
+    @app.get("/events")
+    async def events():
+        async def stream():
+            for i in range(200):
+                yield f"data: {'x' * 20} {i}\n\n"
+        return StreamingResponse(stream(), media_type="text/event-stream")
+    return app
+
+
+def test_choose_encoding(monkeypatch):
+    monkeypatch.setattr(serialization, "brotli", None)
+    assert choose_encoding("gzip, deflate, br") == "gzip"
+    assert choose_encoding("*") == "gzip"
+    assert choose_encoding("gzip;q=0, identity") == ""
+    assert choose_encoding("") == ""
+    monkeypatch.setattr(serialization, "brotli", object())
+    assert choose_encoding("gzip, br") == "br"
+    assert choose_encoding("br;q=0, gzip") == "gzip"
+
+
+def test_large_bodies_are_gzipped():
+    client = TestClient(compressed_app())
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(json.dumps(BIG))
+    assert response.json() == BIG
+
+
+def test_small_bodies_and_event_streams_pass_through():
+    client = TestClient(compressed_app())
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers and small.json() == {"status": "ok"}
+    with client.stream("GET", "/events", headers={"Accept-Encoding": "gzip"}) as events:
+        assert "content-encoding" not in events.headers
+        body = b"".join(events.iter_raw())
+    assert body.startswith(b"data: ") and body.count(b"\n\n") == 200
+
+
+def test_clients_without_gzip_get_plain_bodies():
+    response = TestClient(compressed_app()).get("/big", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers and response.json() == BIG
+
+
+class Point(NamedTuple):
+    x: int
+    y: int
+
+
+def test_fast_json_renders_decimals_and_tuples():
+    body = FastJSONResponse({"total": Decimal("12.50"), "point": Point(1, 2), "tags": ("a",)}).body
+    assert json.loads(body) == {"total": 12.5, "point": [1, 2], "tags": ["a"]}
+    assert gzip.decompress(serialization.compress(body, "gzip")) == body
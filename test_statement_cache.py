@@ -0,0 +1,74 @@
+import gc
+import weakref
+
+from benchmarks.fakes import FakeConnection
+from statement_cache import StatementCache, drop_statement_cache, statement_cache_for
+
+
+class Cursor:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class Connection:
+    def cursor(self, prepared=False):
+        assert prepared
+        return Cursor()
+
+
+def test_same_query_reuses_its_prepared_cursor_and_string():
+    connection = Connection()
+    cache = StatementCache(connection)
+    query = "SELECT * FROM profiles WHERE user_id = %s"
+    cursor, operation = cache.get(query)
+    again, same_operation = cache.get("SELECT * FROM profiles WHERE user_id = %s")
+    assert again is cursor and same_operation is operation
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_statement_is_closed_beyond_the_limit():
+    connection = Connection()
+    cache = StatementCache(connection, max_statements=2)
+    first, _ = cache.get("q1")
+    second, _ = cache.get("q2")
+    cache.get("q1")
+    cache.get("q3")
+    assert second.closed and not first.closed
+    assert len(cache) == 2 and cache.evictions == 1
+
+
+def test_dropping_a_connection_closes_its_statements():
+    connection = Connection()
+    cursor, _ = statement_cache_for(connection).get("q1")
+    drop_statement_cache(connection)
+    assert cursor.closed
+    assert len(statement_cache_for(connection)) == 0
+
+
+def test_cache_does_not_keep_its_connection_alive():
+    database = FakeConnection(users=1, transactions=1)
+    session = database.session()
+    statement_cache_for(session).get("SELECT 1")
+    alive = weakref.ref(session)
+    del session
+    gc.collect()
+    assert alive() is None
+
+
+def test_run_query_prepares_each_query_once_per_connection(monkeypatch):
+    import tool_core
+    from db import DatabaseRouter
+
+    database = FakeConnection(users=3, transactions=10)
+    session = database.session()
+    monkeypatch.setattr(tool_core, "USE_PREPARED_STATEMENTS", True)
+    monkeypatch.setattr(tool_core, "db_router", DatabaseRouter(tool_core.DB_CONFIG, connect_fn=lambda config: session))
+    query = "SELECT user_id, user_name FROM profiles WHERE user_id = %s"
+    for user_id in database.user_ids:
+        row = tool_core.run_query("get_profile", query, (user_id,), fetch="one")
+        assert row["user_id"] == user_id
+    stats = statement_cache_for(session).stats()
+    assert (stats["statements"], stats["misses"], stats["hits"]) == (1, 1, 2)
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import columnar
+import tool_core
+from benchmarks.fakes import FakeConnection
+from db import DatabaseRouter
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeConnection(users=20, transactions=2000)
+    monkeypatch.setattr(tool_core, "db_router", DatabaseRouter(tool_core.DB_CONFIG, connect_fn=lambda c: database.session()))
+    return database
+
+
+def call(name, arguments):
+    return asyncio.run(tool_core.call_tool_text(name, arguments))
+
+
+def test_stdio_and_http_transports_answer_alike(database):
+    import mcp_server_sse
+    client = TestClient(mcp_server_sse.app)
+    for name, arguments in [("get_profile", {"user_id": database.user_ids[0]}),
+                            ("get_transactions", {"user_id": database.user_ids[1], "limit": "5"}),
+                            ("search_transactions", {"category": "Food", "limit": 3})]:
+        response = client.post("/call_tool", json={"tool_name": name, "arguments": arguments})
+        assert response.status_code == 200
+        assert response.json()["result"] == call(name, arguments)
+
+
+@pytest.mark.parametrize("name, arguments", [
+    ("search_transactions", {"category": "Food", "limit": 15}),
+    ("search_transactions", {"min_amount": 100, "max_amount": 400, "transaction_type": "debit"}),
+    ("search_transactions", {"start_date": "2024-03-01", "end_date": "2024-03-31", "limit": 50}),
+    ("aggregate_transactions", {"group_by": ["category"], "measures": ["count", "sum", "avg", "min", "max"]}),
+    ("aggregate_transactions", {"group_by": ["month", "transaction_type"], "measures": ["count", "p50", "p90"]}),
+    ("aggregate_transactions", {"group_by": ["merchant"], "category": "Food", "limit": 5}),
+])
+def test_snapshot_answers_match_sql(database, monkeypatch, name, arguments):
+    pytest.importorskip("numpy")
+    engine = columnar.ColumnarEngine(lambda: database.session(), enabled=True)
+    assert engine.refresh()
+    monkeypatch.setattr(tool_core, "columnar_engine", engine)
+
+    from_sql = call(name, {**arguments, "max_staleness_seconds": 0})
+    from_snapshot = call(name, {**arguments, "max_staleness_seconds": 3600})
+    assert "Source: analytics snapshot" in from_snapshot and "Source:" not in from_sql
+    snapshot_lines = [line for line in from_snapshot.splitlines() if not line.startswith("Source:")]
+    assert snapshot_lines == from_sql.splitlines()
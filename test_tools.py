@@ -0,0 +1,21 @@
+import pytest
+
+import tool_core
+from tools import InvalidArguments
+
+
+def test_limit_is_bounded():
+    tool = tool_core.tool_registry.get("search_transactions")
+    assert tool.validate({"limit": "5"})["limit"] == 5
+    assert tool.validate({"limit": tool_core.MAX_RESULT_LIMIT})["limit"] == tool_core.MAX_RESULT_LIMIT
+    with pytest.raises(InvalidArguments, match="limit must be at least 1"):
+        tool.validate({"limit": -1})
+    with pytest.raises(InvalidArguments, match="limit must be at most"):
+        tool.validate({"limit": tool_core.MAX_RESULT_LIMIT + 1})
+
+
+def test_every_limit_declares_its_bounds():
+    for tool in tool_core.tool_registry:
+        limit = tool.input_schema["properties"].get("limit")
+        if limit is not None:
+            assert limit["minimum"] == 1 and limit["maximum"] == tool_core.MAX_RESULT_LIMIT
@@ -0,0 +1,847 @@
+"""Tool execution shared by the MCP servers (SSE/HTTP in ``mcp_server_sse``, stdio in ``mcp_server``).
+
+Both transports serve the same ``tool_registry`` and run every call the
+same way: ``call_tool_shared`` coalesces identical concurrent calls, takes
+a slot from the concurrency gate and runs the call on a tool worker thread,
+and ``run_tool`` answers from the fallback caches while no database node is
+reachable. Each worker thread has its own event loop and database
+connections (``db.WorkerConnections``), so queries never block the
+server's event loop and the gate bounds the queries actually running.
+
+Queries go through ``run_query``. It reads over ``db_router`` connections
+(autocommit, replica routing, circuit breakers) as cached prepared
+statements, and records every query in the SQL profile and the tracing
+spans.
+
+Transport concerns stay in the servers: HTTP routes, per-user rate limits
+and background jobs in ``mcp_server_sse``, process startup in ``mcp_server``.
+Nothing here imports the web stack, so the stdio server can load it cheaply.
+"""
+import asyncio
+import atexit
+import contextvars
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Optional
+
+from mysql.connector import Error, InterfaceError, OperationalError
+
+import admission
+import columnar
+import metrics
+from coalescing import SingleFlight
+from db import (DatabaseRouter, WorkerConnections, bind_worker_connections,
+                parse_replicas, read_your_writes_requested)
+from logging_config import log_event
+from query_profiler import QueryProfiler
+from resilience import (STALE_RESULTS_SERVED, TOOL_ERROR_PREFIXES, StaleCache, request_key,
+                        stale_notice)
+from rows import ResultSet, format_rows
+from statement_cache import statement_cache_for
+from tools import InvalidArguments, ToolRegistry
+
+# Database configuration
+DB_CONFIG = {
+    'host': 'localhost',
+    'user': 'root',
+    'password': '12345678',
+    'database': 'chatbot_db',
+    'port': 3306
+}
+
+# Read replicas for tool queries, e.g. DB_REPLICAS="127.0.0.1:3307,127.0.0.1:3308@2"
+DB_REPLICAS = parse_replicas(os.getenv("DB_REPLICAS", ""), DB_CONFIG)
+
+# Cap on concurrent tool calls; up to TOOL_MAX_QUEUE more wait at most TOOL_MAX_QUEUE_WAIT_SECONDS
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", "32"))
+TOOL_MAX_QUEUE = int(os.getenv("TOOL_MAX_QUEUE", "128"))
+TOOL_MAX_QUEUE_WAIT_SECONDS = float(os.getenv("TOOL_MAX_QUEUE_WAIT_SECONDS", "5"))
+
+# Last good results kept per tool call, served marked stale while no database node is reachable
+TOOL_FALLBACK_CACHE_SIZE = int(os.getenv("TOOL_FALLBACK_CACHE_SIZE", "2000"))
+
+# Identical tool calls arriving while one is running share its execution and result
+TOOL_COALESCING = os.getenv("TOOL_COALESCING", "1") != "0"
+
+# Execute tool queries as cached server-side prepared statements (set to 0 for the text protocol)
+USE_PREPARED_STATEMENTS = os.getenv("USE_PREPARED_STATEMENTS", "1") != "0"
+
+# search_transactions filters: (argument, SQL condition, parameter conversion)
+# Relevance of a transaction to free text, served by the idx_transactions_text FULLTEXT index
+TEXT_MATCH = "MATCH(description, merchant_name) AGAINST (%s IN NATURAL LANGUAGE MODE)"
+
+SEARCH_FILTERS = (
+    ('user_id', "user_id = %s", None),
+    ('category', "category = %s", None),
+    ('min_amount', "amount >= %s", float),
+    ('max_amount', "amount <= %s", float),
+    ('start_date', "DATE(transaction_date) >= %s", None),
+    ('end_date', "DATE(transaction_date) <= %s", None),
+    ('transaction_type', "transaction_type = %s", None),
+    ('text', TEXT_MATCH, str.strip),
+)
+TEXT_FILTER = 1 << (len(SEARCH_FILTERS) - 1)
+
+# aggregate_transactions group-by dimensions and their SQL expressions
+AGGREGATE_DIMENSIONS = {
+    'category': "category",
+    'transaction_type': "transaction_type",
+    'merchant': "merchant_name",
+    'day': "DATE(transaction_date)",
+    'week': "YEARWEEK(transaction_date, 3)",
+    'month': "DATE_FORMAT(transaction_date, '%Y-%m')",
+}
+
+# aggregate_transactions measures; percentiles are written p50, p90, p99, ...
+AGGREGATE_MEASURES = {
+    'count': "COUNT(*)",
+    'sum': "SUM(amount)",
+    'avg': "AVG(amount)",
+    'min': "MIN(amount)",
+    'max': "MAX(amount)",
+}
+PERCENTILE_RE = re.compile(r"^p([1-9][0-9]?)$")
+
+# Per-transaction text layouts, compiled once per column order by rows.format_rows
+TRANSACTION_LAYOUT = """Transaction ID: {transaction_id}
+Date: {transaction_date}
+Amount: ${amount:.2f}
+Type: {transaction_type}
+Description: {description}
+Status: {status}
+Category: {category}
+Merchant: {merchant_name}"""
+
+SEARCH_RESULT_LAYOUT = f"""
+Transaction ID: {{transaction_id}}
+User ID: {{user_id}}
+Date: {{transaction_date}}
+Amount: ${{amount:.2f}} ({{transaction_type}})
+Category: {{category}}
+Description: {{description}}
+Status: {{status}}
+Merchant: {{merchant_name}}
+{'-'*30}
+"""
+
+SUMMARY_CATEGORY_LAYOUT = "\n  - {category}: {count} transactions, Total: ${total_amount:.2f}"
+SUMMARY_RECENT_LAYOUT = "\n  - {transaction_date}: ${amount:.2f} - {description} ({status})"
+
+logger = logging.getLogger("tool_core")
+
+db_router = DatabaseRouter(DB_CONFIG, DB_REPLICAS)
+
+# Per-phase latency spans (db_checkout, sql_execute, row_format, ...)
+tracer = metrics.Tracer("mcp-server")
+
+# SQL fingerprint statistics and slow-query log (/admin/query_stats, /admin/slow_queries)
+profiler = QueryProfiler()
+
+tool_concurrency = admission.ConcurrencyLimiter(
+    "mcp-server", "call_tool", TOOL_MAX_CONCURRENCY, TOOL_MAX_QUEUE, TOOL_MAX_QUEUE_WAIT_SECONDS
+)
+# Single-flight for every transport's tool calls; followers take no concurrency slot
+tool_flight = SingleFlight("mcp-server", TOOL_COALESCING)
+
+# Threads tool calls run on; a concurrency slot is needed to use one, so this many suffice
+tool_workers = ThreadPoolExecutor(max_workers=TOOL_MAX_CONCURRENCY, thread_name_prefix="tool-worker")
+_tool_worker = threading.local()
+_tool_worker_states = []  # (loop, connections) of every tool worker thread, closed at exit
+
+# Optional in-memory columnar snapshot for cross-user searches (COLUMNAR_ENGINE=1)
+columnar_engine = columnar.ColumnarEngine(lambda: db_router.open_dedicated_connection())
+
+def connect_to_database():
+    """Establish MySQL database connections to the primary and any replicas, and one tool worker's"""
+    connected = db_router.primary.connect()
+    for replica in db_router.replicas:
+        replica.connect()
+    if connected:
+        # The first tool call then finds a worker with its connection open
+        tool_workers.submit(_tool_worker_connections).result()
+    return connected
+
+def checkout_connection():
+    """Return a connection for a read-only tool query, routed across replicas"""
+    with tracer.span("db_checkout"):
+        connection = db_router.checkout_read()
+    if connection is None:
+        raise Error(msg="No database connection available")
+    return connection
+
+def _execute(connection, query: str, params: tuple):
+    """Run ``query`` on ``connection``; returns ``(columns, rows)``"""
+    if USE_PREPARED_STATEMENTS:
+        statements = statement_cache_for(connection)
+        cursor, operation = statements.get(query)
+        try:
+            cursor.execute(operation, params)
+            rows = cursor.fetchall()
+        except Error as e:
+            statements.discard(query)
+            if isinstance(e, (InterfaceError, OperationalError)):
+                db_router.report_failure(connection)
+            raise
+        return cursor.column_names, rows
+    cursor = connection.cursor()
+    try:
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        # Read before closing: a closed cursor forgets its description
+        return cursor.column_names, rows
+    except (InterfaceError, OperationalError):
+        db_router.report_failure(connection)
+        raise
+    finally:
+        cursor.close()
+
+def run_query(tool: str, query: str, params=(), fetch: str = "all"):
+    """Execute a query and return a ResultSet (or its first Row), recording it in the SQL profile.
+
+    Queries run as server-side prepared statements cached per connection, so
+    each distinct SQL text is parsed and planned once per connection.
+    Connections are not pinged first: a connection-level error is retried
+    once on a fresh checkout, as every tool query is a read.
+    """
+    connection = checkout_connection()
+    params = tuple(params)
+    with tracer.span("sql_execute"):
+        started = time.perf_counter()
+        try:
+            columns, rows = _execute(connection, query, params)
+        except (InterfaceError, OperationalError) as e:
+            logger.warning("Retrying %s on a new connection after: %s", tool, e)
+            connection = checkout_connection()
+            columns, rows = _execute(connection, query, params)
+        elapsed = time.perf_counter() - started
+        result = ResultSet(columns, rows)
+
+    profiler.record(tool, query, params, elapsed, len(rows), lambda: connection.cursor(dictionary=True))
+    if fetch == "one":
+        return result.first()
+    return result
+
+def parse_filters(arguments: dict) -> tuple[int, dict]:
+    """Filter shape bitmask and converted filter values present in ``arguments``"""
+    shape = 0
+    filters = {}
+    for bit, (name, _, convert) in enumerate(SEARCH_FILTERS):
+        value = arguments.get(name)
+        if value:
+            shape |= 1 << bit
+            filters[name] = convert(value) if convert else value
+    return shape, filters
+
+@lru_cache(maxsize=None)
+def filter_where(shape: int) -> str:
+    """WHERE clause for one filter shape (a bitmask over SEARCH_FILTERS)"""
+    return "WHERE 1=1" + "".join(
+        f" AND {condition}"
+        for bit, (_, condition, _) in enumerate(SEARCH_FILTERS)
+        if shape & (1 << bit)
+    )
+
+@lru_cache(maxsize=None)
+def search_queries(shape: int) -> tuple[str, str]:
+    """Row and count SQL for one search filter shape.
+
+    Text searches rank by relevance; their row query takes the text once more,
+    first, for the relevance column (MySQL evaluates the identical MATCH once).
+    """
+    where = filter_where(shape)
+    if shape & TEXT_FILTER:
+        rows = (f"SELECT *, {TEXT_MATCH} AS relevance FROM transactions {where} "
+                f"ORDER BY relevance DESC, transaction_date DESC LIMIT %s")
+    else:
+        rows = f"SELECT * FROM transactions {where} ORDER BY transaction_date DESC LIMIT %s"
+    return (
+        rows,
+        f"SELECT COUNT(*) as count FROM transactions {where}",
+    )
+
+@lru_cache(maxsize=256)
+def aggregate_query(shape: int, group_by: tuple, measures: tuple) -> str:
+    """Single-pass GROUP BY SQL for one filter shape, grouping and measure list.
+
+    Percentiles use nearest rank: ROW_NUMBER() over each group's amounts in a
+    derived table, then the smallest amount whose rank reaches p% of the group.
+    """
+    where = filter_where(shape)
+    keys = [f"{AGGREGATE_DIMENSIONS[d]} AS `{d}`" for d in group_by]
+    columns = []
+    for measure in measures:
+        percentile = PERCENTILE_RE.match(measure)
+        if percentile:
+            columns.append(f"MIN(CASE WHEN rn * 100 >= {percentile.group(1)} * n THEN amount END) AS `{measure}`")
+        else:
+            columns.append(f"{AGGREGATE_MEASURES[measure]} AS `{measure}`")
+    aliases = ", ".join(f"`{d}`" for d in group_by)
+    grouping = f" GROUP BY {aliases} ORDER BY {aliases}" if group_by else ""
+
+    if not any(PERCENTILE_RE.match(m) for m in measures):
+        return f"SELECT {', '.join(keys + columns)} FROM transactions {where}{grouping} LIMIT %s"
+    partition = f"PARTITION BY {', '.join(AGGREGATE_DIMENSIONS[d] for d in group_by)}" if group_by else ""
+    ranked = (
+        f"SELECT {', '.join(keys + ['amount'])}, "
+        f"ROW_NUMBER() OVER ({partition} ORDER BY amount) AS rn, "
+        f"COUNT(*) OVER ({partition}) AS n "
+        f"FROM transactions {where}"
+    )
+    select = ", ".join([f"`{d}`" for d in group_by] + columns)
+    return f"SELECT {select} FROM ({ranked}) ranked{grouping} LIMIT %s"
+
+# Tool definitions: MCP list_tools/call_tool (SSE and stdio), POST /call_tool, /jobs and GET /tools all dispatch through this registry
+tool_registry = ToolRegistry()
+
+# Properties shared by search_transactions and aggregate_transactions
+TRANSACTION_FILTER_PROPERTIES = {
+    "user_id": {
+        "type": "string",
+        "description": "Filter by user ID (optional). If not specified, cover all users."
+    },
+    "category": {
+        "type": "string",
+        "description": "Filter by category (e.g., 'food', 'shopping', 'travel')"
+    },
+    "min_amount": {
+        "type": "number",
+        "description": "Minimum transaction amount (e.g., 50)"
+    },
+    "max_amount": {
+        "type": "number",
+        "description": "Maximum transaction amount (e.g., 500)"
+    },
+    "start_date": {
+        "type": "string",
+        "description": "Start date in YYYY-MM-DD format"
+    },
+    "end_date": {
+        "type": "string",
+        "description": "End date in YYYY-MM-DD format"
+    },
+    "transaction_type": {
+        "type": "string",
+        "description": "Transaction type ('credit' or 'debit')"
+    },
+}
+# Upper bound on the ``limit`` argument of the listing tools
+MAX_RESULT_LIMIT = int(os.getenv("MAX_RESULT_LIMIT", "1000"))
+MAX_STALENESS_PROPERTY = {
+    "type": "number",
+    "description": "Accept results from an analytics snapshot up to this many seconds old (0 for live data only)"
+}
+
+@tool_registry.tool(
+    "get_profile",
+    "Get user profile details from the database by user ID. Use this when user asks about profile information, user details, or needs to lookup someone's information.",
+    {
+        "type": "object",
+        "properties": {
+            "user_id": {
+                "type": "string",
+                "description": "The unique user ID (e.g., 'U001', 'U002', 'U003')"
+            }
+        },
+        "required": ["user_id"]
+    }
+)
+async def get_profile_tool(arguments: dict) -> str:
+    return await execute_get_profile(arguments['user_id'])
+
+@tool_registry.tool(
+    "get_transactions",
+    "Get all transactions for a specific user. Use when user asks about transaction history, spending, or financial activity.",
+    {
+        "type": "object",
+        "properties": {
+            "user_id": {
+                "type": "string",
+                "description": "The user ID to get transactions for (e.g., 'U001', 'U002', 'U003')"
+            },
+            "limit": {
+                "type": "integer",
+                "description": "Maximum number of transactions to return (default: 10)",
+                "default": 10,
+                "minimum": 1,
+                "maximum": MAX_RESULT_LIMIT
+            }
+        },
+        "required": ["user_id"]
+    }
+)
+async def get_transactions_tool(arguments: dict) -> str:
+    return await execute_get_transactions(arguments['user_id'], arguments.get('limit', 10))
+
+@tool_registry.tool(
+    "get_transaction_summary",
+    "Get summary statistics of transactions for a user. Use when user asks for financial summary, spending overview, or transaction analytics.",
+    {
+        "type": "object",
+        "properties": {
+            "user_id": {
+                "type": "string",
+                "description": "The user ID to get transaction summary for (e.g., 'U001', 'U002', 'U003')"
+            }
+        },
+        "required": ["user_id"]
+    }
+)
+async def get_transaction_summary_tool(arguments: dict) -> str:
+    return await execute_transaction_summary(arguments['user_id'])
+
+@tool_registry.tool(
+    "search_transactions",
+    "Search transactions with various filters. Use when user asks for specific transactions by category, amount range, date range, type, or words in the description or merchant (e.g., 'coffee', 'Amazon').",
+    {
+        "type": "object",
+        "properties": {
+            **TRANSACTION_FILTER_PROPERTIES,
+            "text": {
+                "type": "string",
+                "description": "Free-text match on description and merchant, ranked by relevance (e.g., 'coffee', 'amazon')"
+            },
+            "limit": {
+                "type": "integer",
+                "description": "Maximum results to return (default: 20)",
+                "default": 20,
+                "minimum": 1,
+                "maximum": MAX_RESULT_LIMIT
+            },
+            "max_staleness_seconds": MAX_STALENESS_PROPERTY
+        }
+    }
+)
+async def search_transactions_tool(arguments: dict) -> str:
+    return await execute_search_transactions(arguments)
+
+@tool_registry.tool(
+    "aggregate_transactions",
+    "Compute totals, counts, averages or percentiles of transaction amounts grouped by category, type, merchant, day, week or month. Use for questions like 'spending per month by category' or 'average transaction by merchant' instead of fetching transactions and adding them up.",
+    {
+        "type": "object",
+        "properties": {
+            "group_by": {
+                "type": "array",
+                "items": {"type": "string", "enum": list(AGGREGATE_DIMENSIONS)},
+                "description": "Dimensions to group by, e.g. ['month', 'category']. Omit for a single total."
+            },
+            "measures": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Any of 'count', 'sum', 'avg', 'min', 'max' or a percentile like 'p50', 'p90' (default: ['count', 'sum'])"
+            },
+            **TRANSACTION_FILTER_PROPERTIES,
+            "text": {
+                "type": "string",
+                "description": "Only transactions whose description or merchant matches these words (e.g., 'coffee')"
+            },
+            "limit": {
+                "type": "integer",
+                "description": "Maximum groups to return (default: 100)",
+                "default": 100,
+                "minimum": 1,
+                "maximum": MAX_RESULT_LIMIT
+            },
+            "max_staleness_seconds": MAX_STALENESS_PROPERTY
+        }
+    }
+)
+async def aggregate_transactions_tool(arguments: dict) -> str:
+    return await execute_aggregate_transactions(arguments)
+
+# Core Execution Functions
+async def execute_get_profile(user_id: str) -> str:
+    """Execute get_profile query"""
+    try:
+        query = "SELECT * FROM profiles WHERE user_id = %s"
+        result = run_query("get_profile", query, (user_id,), fetch="one")
+        
+        if result:
+            with tracer.span("row_format"):
+                profile_text = f"""User Profile Details:
+- User ID: {result['user_id']}
+- Name: {result['user_name']}
+- Created Date: {result['created_date']}
+- Phone: {result['phone_number']}
+- Business: {result['business_name']}
+- Email: {result['email_id']}"""
+            log_event(logger, logging.DEBUG, "profile_fetched", user_id=user_id)
+            return profile_text
+        else:
+            return f"No profile found for user ID: {user_id}"
+            
+    except Error as e:
+        return f"Database error: {str(e)}"
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+async def execute_get_transactions(user_id: str, limit: int = 10) -> str:
+    """Execute get_transactions query"""
+    try:
+        # Get total count
+        count_query = "SELECT COUNT(*) as total FROM transactions WHERE user_id = %s"
+        count_result = run_query("get_transactions", count_query, (user_id,), fetch="one")
+        total_transactions = count_result['total']
+        
+        # Get transactions
+        query = """
+        SELECT * FROM transactions 
+        WHERE user_id = %s 
+        ORDER BY transaction_date DESC 
+        LIMIT %s
+        """
+        transactions = run_query("get_transactions", query, (user_id, int(limit)))
+        
+        if transactions:
+            with tracer.span("row_format"):
+                response_text = f"""Found {total_transactions} transactions for user {user_id}. Showing {len(transactions)} most recent:
+
+{'='*50}
+""" + format_rows(TRANSACTION_LAYOUT, transactions, separator="\n\n")
+            return response_text
+        else:
+            return f"No transactions found for user ID: {user_id}"
+            
+    except Error as e:
+        return f"Database error: {str(e)}"
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+async def execute_transaction_summary(user_id: str) -> str:
+    """Execute transaction summary query"""
+    try:
+        # Get summary statistics
+        summary_query = """
+        SELECT 
+            COUNT(*) as total_transactions,
+            SUM(CASE WHEN transaction_type = 'credit' THEN amount ELSE 0 END) as total_credits,
+            SUM(CASE WHEN transaction_type = 'debit' THEN amount ELSE 0 END) as total_debits,
+            MIN(transaction_date) as first_transaction,
+            MAX(transaction_date) as last_transaction,
+            AVG(amount) as average_amount,
+            COUNT(DISTINCT category) as unique_categories
+        FROM transactions 
+        WHERE user_id = %s
+        """
+        summary = run_query("get_transaction_summary", summary_query, (user_id,), fetch="one")
+        
+        if summary and summary['total_transactions'] > 0:
+            # Get transactions by category
+            category_query = """
+            SELECT category, COUNT(*) as count, SUM(amount) as total_amount
+            FROM transactions 
+            WHERE user_id = %s 
+            GROUP BY category 
+            ORDER BY total_amount DESC
+            """
+            categories = run_query("get_transaction_summary", category_query, (user_id,))
+            
+            # Get recent transactions
+            recent_query = """
+            SELECT transaction_date, amount, description, status
+            FROM transactions 
+            WHERE user_id = %s 
+            ORDER BY transaction_date DESC 
+            LIMIT 5
+            """
+            recent = run_query("get_transaction_summary", recent_query, (user_id,))
+            
+            # Format summary
+            with tracer.span("row_format"):
+                response_text = f"""Transaction Summary for User {user_id}:
+            
+📊 Overview:
+- Total Transactions: {summary['total_transactions']}
+- Total Credits: ${summary['total_credits'] or 0:.2f}
+- Total Debits: ${summary['total_debits'] or 0:.2f}
+- Net Balance: ${(summary['total_credits'] or 0) - (summary['total_debits'] or 0):.2f}
+- Average Transaction: ${summary['average_amount'] or 0:.2f}
+- First Transaction: {summary['first_transaction']}
+- Last Transaction: {summary['last_transaction']}
+- Unique Categories: {summary['unique_categories']}
+
+📈 Spending by Category:"""
+                
+                response_text += format_rows(SUMMARY_CATEGORY_LAYOUT, categories)
+                
+                response_text += "\n\n🕐 Recent Transactions:"
+                response_text += format_rows(SUMMARY_RECENT_LAYOUT, recent)
+            
+            return response_text
+        else:
+            return f"No transactions found for user ID: {user_id}"
+            
+    except Error as e:
+        return f"Database error: {str(e)}"
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+async def execute_search_transactions(arguments: dict) -> str:
+    """Execute search transactions query"""
+    try:
+        user_id = arguments.get('user_id')
+        category = arguments.get('category')
+        min_amount = arguments.get('min_amount')
+        max_amount = arguments.get('max_amount')
+        start_date = arguments.get('start_date')
+        end_date = arguments.get('end_date')
+        transaction_type = arguments.get('transaction_type')
+        text = arguments.get('text')
+        limit = arguments.get('limit', 20)
+        
+        # Pick the cached SQL for this combination of filters (at most 2^8 shapes)
+        shape, filters = parse_filters(arguments)
+        params = list(filters.values())
+        
+        # Cross-user searches scan the whole table: answer them from the columnar
+        # snapshot when it is fresh enough for this request
+        snapshot = None
+        if not user_id and not read_your_writes_requested():
+            max_staleness = arguments.get('max_staleness_seconds', columnar.MAX_STALENESS_SECONDS)
+            snapshot = columnar_engine.fresh_snapshot(float(max_staleness))
+        
+        source_text = ""
+        transactions = None
+        if snapshot is not None:
+            try:
+                with tracer.span("columnar_scan"):
+                    transactions, total_count = snapshot.search(filters, int(limit))
+                columnar.COLUMNAR_QUERIES.inc(tool="search_transactions")
+                source_text = f"Source: analytics snapshot ({snapshot.age_seconds:.0f}s old)\n"
+            except columnar.UnsupportedQuery:
+                transactions = None
+        if transactions is None:
+            query, count_query = search_queries(shape)
+            
+            row_params = params + [int(limit)]
+            if shape & TEXT_FILTER:
+                row_params.insert(0, filters['text'])
+            transactions = run_query("search_transactions", query, row_params)
+            
+            # Get count
+            count_result = run_query("search_transactions", count_query, params, fetch="one")
+            total_count = count_result['count']
+        
+        if transactions:
+            with tracer.span("row_format"):
+                # Format search results
+                filters = []
+                if user_id: filters.append(f"User: {user_id}")
+                if category: filters.append(f"Category: {category}")
+                if min_amount: filters.append(f"Min Amount: ${min_amount}")
+                if max_amount: filters.append(f"Max Amount: ${max_amount}")
+                if start_date: filters.append(f"From: {start_date}")
+                if end_date: filters.append(f"To: {end_date}")
+                if transaction_type: filters.append(f"Type: {transaction_type}")
+                if text: filters.append(f"Text: {text} (ranked by relevance)")
+                
+                filter_text = " | ".join(filters) if filters else "No filters"
+                
+                response_text = f"""🔍 Transaction Search Results:
+Filters: {filter_text}
+Total Matching: {total_count}
+Showing: {len(transactions)} transactions
+{source_text}
+{'='*50}
+""" + format_rows(SEARCH_RESULT_LAYOUT, transactions)
+            return response_text
+        else:
+            return "No transactions found matching the criteria"
+            
+    except Error as e:
+        return f"Database error: {str(e)}"
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+def format_filters(filters: dict) -> str:
+    """Human-readable filter list for tool results"""
+    labels = {
+        'user_id': "User: {}", 'category': "Category: {}", 'min_amount': "Min Amount: ${}",
+        'max_amount': "Max Amount: ${}", 'start_date': "From: {}", 'end_date': "To: {}",
+        'transaction_type': "Type: {}", 'text': "Text: {}",
+    }
+    return " | ".join(labels[name].format(value) for name, value in filters.items()) or "No filters"
+
+def format_aggregate_value(column: str, value) -> str:
+    if value is None:
+        return "-"
+    if column == "week":
+        return f"{int(value) // 100}-W{int(value) % 100:02d}"
+    if column == "count":
+        return str(value)
+    if column in AGGREGATE_MEASURES or PERCENTILE_RE.match(column):
+        return f"{float(value):.2f}"
+    return str(value)
+
+async def execute_aggregate_transactions(arguments: dict) -> str:
+    """Execute aggregate transactions query"""
+    try:
+        group_by = tuple(arguments.get('group_by') or ())
+        measures = tuple(arguments.get('measures') or ("count", "sum"))
+        limit = int(arguments.get('limit', 100))
+        
+        unknown = [d for d in group_by if d not in AGGREGATE_DIMENSIONS]
+        if unknown:
+            return f"Error: unknown group_by dimension(s): {', '.join(unknown)}. Use: {', '.join(AGGREGATE_DIMENSIONS)}"
+        unknown = [m for m in measures if m not in AGGREGATE_MEASURES and not PERCENTILE_RE.match(m)]
+        if unknown:
+            return f"Error: unknown measure(s): {', '.join(unknown)}. Use count, sum, avg, min, max or p1-p99"
+        if len(set(group_by)) != len(group_by) or len(set(measures)) != len(measures):
+            return "Error: group_by and measures must not repeat"
+        
+        shape, filters = parse_filters(arguments)
+        
+        # Cross-user aggregates scan the whole table, like cross-user searches
+        snapshot = None
+        if not filters.get('user_id') and not read_your_writes_requested():
+            max_staleness = arguments.get('max_staleness_seconds', columnar.MAX_STALENESS_SECONDS)
+            snapshot = columnar_engine.fresh_snapshot(float(max_staleness))
+        
+        source_text = ""
+        rows = None
+        if snapshot is not None:
+            try:
+                with tracer.span("columnar_scan"):
+                    rows = snapshot.aggregate(filters, group_by, measures, limit)
+                columnar.COLUMNAR_QUERIES.inc(tool="aggregate_transactions")
+                source_text = f"Source: analytics snapshot ({snapshot.age_seconds:.0f}s old)\n"
+            except columnar.UnsupportedQuery:
+                rows = None
+        if rows is None:
+            query = aggregate_query(shape, group_by, measures)
+            rows = run_query("aggregate_transactions", query, list(filters.values()) + [limit])
+        
+        if not rows or (not group_by and 'count' in measures and not rows[0]['count']):
+            return "No transactions found matching the criteria"
+        
+        with tracer.span("row_format"):
+            columns = group_by + measures
+            lines = [" | ".join(columns)]
+            for row in rows:
+                lines.append(" | ".join(format_aggregate_value(c, row[c]) for c in columns))
+            
+            limit_text = " (limit reached, narrow the filters or raise limit)" if len(rows) >= limit else ""
+            response_text = f"""📊 Transaction Aggregates:
+Filters: {format_filters(filters)}
+Group By: {', '.join(group_by) or 'none'}
+Groups: {len(rows)}{limit_text}
+{source_text}
+""" + "\n".join(lines)
+        return response_text
+            
+    except Error as e:
+        return f"Database error: {str(e)}"
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+# Last good result per tool call (see TOOL_FALLBACK_CACHE_SIZE)
+fallback_results = StaleCache(TOOL_FALLBACK_CACHE_SIZE)
+
+class ToolUnavailable(Exception):
+    """No database node is reachable and no cached answer exists"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Database unavailable and no cached result; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+async def run_tool(tool_name: str, arguments: dict) -> str:
+    """Run a tool on validated arguments; while every database breaker is open, answer from caches, marked stale"""
+    key = request_key(tool_name, arguments)
+    handler = tool_registry.get(tool_name).handler
+    if db_router.read_available():
+        result = await handler(arguments)
+        if not result.startswith(TOOL_ERROR_PREFIXES):
+            fallback_results.put(key, result)
+        return result
+    
+    # Cross-user scans can still be answered from the columnar snapshot, whatever its age
+    snapshot = columnar_engine.snapshot if columnar_engine.enabled else None
+    if snapshot is not None and tool_name in ("search_transactions", "aggregate_transactions") \
+            and not arguments.get('user_id'):
+        result = await handler({**arguments, 'max_staleness_seconds': float('inf')})
+        if not result.startswith(TOOL_ERROR_PREFIXES):
+            STALE_RESULTS_SERVED.inc(source="columnar")
+            return stale_notice(snapshot.age_seconds, "database unavailable") + "\n" + result
+    
+    cached = fallback_results.get(key)
+    if cached is not None:
+        STALE_RESULTS_SERVED.inc(source="tool_result_cache")
+        result, age = cached
+        return stale_notice(age, "database unavailable") + "\n" + result
+    raise ToolUnavailable(db_router.retry_after())
+
+def _tool_worker_connections() -> WorkerConnections:
+    """The current tool worker thread's connections (the read one opened), created on first use"""
+    if not hasattr(_tool_worker, "connections"):
+        _tool_worker.loop = asyncio.new_event_loop()
+        _tool_worker.connections = WorkerConnections(db_router)
+        _tool_worker_states.append((_tool_worker.loop, _tool_worker.connections))
+        _tool_worker.connections.warm()
+    return _tool_worker.connections
+
+@atexit.register
+def _close_tool_workers():
+    # Runs after the executor has joined its threads
+    for loop, connections in _tool_worker_states:
+        connections.close()
+        loop.close()
+
+def _run_on_tool_worker(func: Callable, args: tuple):
+    """Call ``func`` on the current tool worker thread, over its own loop and connections"""
+    bind_worker_connections(_tool_worker_connections())
+    result = func(*args)
+    if asyncio.iscoroutine(result):
+        result = _tool_worker.loop.run_until_complete(result)
+    return result
+
+async def run_in_tool_worker(func: Callable, *args):
+    """``func(*args)`` (awaited if a coroutine function) on a tool worker thread.
+
+    The caller's context (trace, read consistency) is kept. Hold a
+    ``tool_concurrency`` slot around it: the pool only has that many threads.
+    """
+    context = contextvars.copy_context()
+    future = asyncio.get_running_loop().run_in_executor(
+        tool_workers, context.run, _run_on_tool_worker, func, args
+    )
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        # A running query cannot be interrupted: keep the caller's slot until it ends
+        await asyncio.wait([future])
+        raise
+
+async def call_tool_shared(tool_name: str, arguments: dict) -> str:
+    """Run a tool under a concurrency slot, sharing the result with identical calls in flight"""
+    key = request_key(tool_name, arguments) + (":rw" if read_your_writes_requested() else "")
+
+    async def execute():
+        async with tool_concurrency.slot():
+            return await run_in_tool_worker(run_tool, tool_name, arguments)
+    return await tool_flight.run(key, tool_name, execute)
+
+async def call_tool_text(name: str, arguments: Optional[dict],
+                         admit: Optional[Callable[[str, dict], None]] = None) -> str:
+    """Answer an MCP call_tool request: validate, ``admit`` (may raise admission.Rejected), run.
+
+    Failures the caller can act on come back as "Error: ..." text.
+    """
+    tool = tool_registry.get(name)
+    if tool is None:
+        raise ValueError(f"Unknown tool: {name}")
+    try:
+        arguments = tool.validate(arguments or {})
+        if admit is not None:
+            admit(name, arguments)
+        return await call_tool_shared(name, arguments)
+    except InvalidArguments as e:
+        return f"Error: {e}"
+    except admission.Rejected as e:
+        return f"Error: {e}; retry after {e.retry_after:.1f}s"
+    except ToolUnavailable as e:
+        return f"Error: {e}"
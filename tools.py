@@ -0,0 +1,251 @@
+"""Tool registry shared by the MCP servers, and the catalog clients keep of it.
+
+A server declares each tool once, on its handler:
+
+    registry = ToolRegistry()
+
+    @registry.tool("get_profile", "Get user profile details ...", {...JSON schema...})
+    async def get_profile(arguments: dict) -> str:
+        ...
+
+The registry serves the MCP ``list_tools`` answer and ``GET /tools``,
+dispatches by name through a dict, and validates arguments with a checker
+compiled from the schema when the tool is registered: required properties,
+JSON types (numeric strings are accepted for numbers, as LLMs often quote
+them), numeric ``minimum``/``maximum``, enums, and schema defaults filled
+in. Validation is the subset of JSON Schema the tool definitions use;
+properties the schema does not declare are passed through unchanged.
+
+``schema_hash`` changes whenever a definition does. Servers send it in the
+``X-Tool-Schema-Hash`` response header, and ``ToolCatalog`` (the client
+side) refetches the tool list when it sees a hash it does not have.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("tools")
+
+TOOL_SCHEMA_HASH_HEADER = "X-Tool-Schema-Hash"
+
+Handler = Callable[[Dict[str, Any]], Awaitable[str]]
+Validator = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+class InvalidArguments(ValueError):
+    """Tool arguments do not match the tool's input schema"""
+
+
+def _number(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return value
+
+
+def _integer(value: Any) -> Any:
+    value = _number(value)
+    if value is None or not float(value).is_integer():
+        return None
+    return int(value)
+
+
+_CONVERTERS: Dict[str, Callable[[Any], Any]] = {
+    "string": lambda value: value if isinstance(value, str) else None,
+    "number": _number,
+    "integer": _integer,
+    "boolean": lambda value: value if isinstance(value, bool) else None,
+    "object": lambda value: value if isinstance(value, dict) else None,
+}
+
+
+def _compile_value(name: str, schema: Dict[str, Any]) -> Callable[[Any], Any]:
+    """Converter for one value: returns it normalised or raises ``InvalidArguments``"""
+    kind = schema.get("type")
+    enum = schema.get("enum")
+    if kind == "array":
+        item = _compile_value(f"{name} item", schema.get("items") or {})
+
+        def convert_array(value):
+            if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+                value = [value]  # a lone value where a list was expected
+            if not isinstance(value, list):
+                raise InvalidArguments(f"{name} must be an array")
+            return [item(v) for v in value]
+        return convert_array
+
+    convert = _CONVERTERS.get(kind)
+    allowed = frozenset(enum) if enum else None
+    numeric = kind in ("number", "integer")
+    minimum = schema.get("minimum") if numeric else None
+    maximum = schema.get("maximum") if numeric else None
+
+    def convert_value(value):
+        if convert is not None:
+            converted = convert(value)
+            if converted is None:
+                raise InvalidArguments(f"{name} must be of type {kind}")
+            value = converted
+        if minimum is not None and value < minimum:
+            raise InvalidArguments(f"{name} must be at least {minimum}")
+        if maximum is not None and value > maximum:
+            raise InvalidArguments(f"{name} must be at most {maximum}")
+        if allowed is not None and value not in allowed:
+            raise InvalidArguments(f"{name} must be one of: {', '.join(map(str, enum))}")
+        return value
+    return convert_value
+
+
+def compile_validator(schema: Optional[Dict[str, Any]]) -> Validator:
+    """Argument checker for an ``object`` input schema, built once per tool"""
+    schema = schema or {}
+    properties = schema.get("properties") or {}
+    converters = {name: _compile_value(name, spec) for name, spec in properties.items()}
+    required = tuple(schema.get("required") or ())
+    defaults = tuple((name, spec["default"]) for name, spec in properties.items() if "default" in spec)
+
+    def validate(arguments: Dict[str, Any]) -> Dict[str, Any]:
+        if not isinstance(arguments, dict):
+            raise InvalidArguments("arguments must be an object")
+        # A null optional argument means the same as leaving it out
+        valid = {name: value for name, value in arguments.items() if value is not None}
+        for name in required:
+            if name not in valid or valid[name] == "":
+                raise InvalidArguments(f"{name} is required")
+        for name, value in valid.items():
+            convert = converters.get(name)
+            if convert is not None:
+                valid[name] = convert(value)
+        for name, default in defaults:
+            valid.setdefault(name, default)
+        return valid
+    return validate
+
+
+class Tool:
+    """One registered tool: its MCP definition, handler and compiled validator"""
+
+    __slots__ = ("name", "description", "input_schema", "handler", "validate")
+
+    def __init__(self, name: str, description: str, input_schema: Dict[str, Any], handler: Handler):
+        self.name = name
+        self.description = description
+        self.input_schema = input_schema
+        self.handler = handler
+        self.validate = compile_validator(input_schema)
+
+    def definition(self) -> Dict[str, Any]:
+        return {"name": self.name, "description": self.description, "inputSchema": self.input_schema}
+
+
+class ToolRegistry:
+    """Tools by name, registered with the ``tool`` decorator"""
+
+    def __init__(self, version: int = 1):
+        self.version = version
+        self._tools: Dict[str, Tool] = {}
+        self._hash: Optional[str] = None
+
+    def tool(self, name: str, description: str, input_schema: Dict[str, Any]) -> Callable[[Handler], Handler]:
+        def register(handler: Handler) -> Handler:
+            if name in self._tools:
+                raise ValueError(f"Tool {name!r} is already registered")
+            self._tools[name] = Tool(name, description, input_schema, handler)
+            self._hash = None
+            return handler
+        return register
+
+    def get(self, name: str) -> Optional[Tool]:
+        return self._tools.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def __iter__(self):
+        return iter(self._tools.values())
+
+    def names(self) -> List[str]:
+        return list(self._tools)
+
+    def definitions(self) -> List[Dict[str, Any]]:
+        return [tool.definition() for tool in self._tools.values()]
+
+    @property
+    def schema_hash(self) -> str:
+        """``v<version>-<digest of every definition>``, recomputed only after a registration"""
+        if self._hash is None:
+            canonical = json.dumps(self.definitions(), sort_keys=True, separators=(",", ":"))
+            self._hash = f"v{self.version}-{hashlib.sha256(canonical.encode()).hexdigest()[:16]}"
+        return self._hash
+
+    def describe(self) -> Dict[str, Any]:
+        """The ``GET /tools`` body"""
+        return {"version": self.version, "schema_hash": self.schema_hash, "tools": self.definitions()}
+
+
+class ToolCatalog:
+    """A client's cached copy of a server's tool list, refetched when its schema hash changes.
+
+    ``fetch`` returns ``(schema_hash, tool definitions)``. Until the first
+    fetch succeeds the catalog is empty; after a failed refresh it keeps the
+    last list and retries after ``retry_seconds``.
+    """
+
+    def __init__(self, fetch: Callable[[], Awaitable[Tuple[str, List[Dict[str, Any]]]]],
+                 retry_seconds: float = 5.0, on_change: Optional[Callable[["ToolCatalog"], None]] = None):
+        self.fetch = fetch
+        self.retry_seconds = retry_seconds
+        self.on_change = on_change
+        self.schema_hash: Optional[str] = None
+        self.tools: List[Dict[str, Any]] = []
+        self.schemas: Dict[str, Optional[Dict[str, Any]]] = {}
+        self.fetched_at: Optional[float] = None
+        self._stale = True
+        self._failed_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def observe(self, schema_hash: Optional[str]):
+        """Note the hash a server response carried; a new one marks the catalog stale"""
+        if schema_hash and schema_hash != self.schema_hash:
+            self._stale = True
+
+    async def get(self) -> List[Dict[str, Any]]:
+        """The tool definitions, fetching them first if stale (one fetch for concurrent callers)"""
+        if self._stale and time.monotonic() - self._failed_at >= self.retry_seconds:
+            async with self._lock:
+                if self._stale:
+                    await self._refresh()
+        return self.tools
+
+    async def _refresh(self):
+        try:
+            schema_hash, tools = await self.fetch()
+        except Exception as e:
+            self._failed_at = time.monotonic()
+            logger.warning("Fetching the tool list failed: %s", e)
+            return
+        changed = schema_hash != self.schema_hash
+        self.schema_hash = schema_hash
+        self.tools = tools
+        self.schemas = {tool["name"]: tool.get("inputSchema") for tool in tools}
+        self.fetched_at = time.time()
+        self._stale = False
+        if changed:
+            logger.info("Tool list %s: %s", schema_hash, ", ".join(self.schemas))
+            if self.on_change:
+                self.on_change(self)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "schema_hash": self.schema_hash,
+            "tools": list(self.schemas),
+            "stale": self._stale,
+            "fetched_at": self.fetched_at,
+        }
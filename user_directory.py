@@ -0,0 +1,282 @@
+"""In-memory directory of user profiles for resolving user references locally.
+
+The orchestrator loads ``user_id``, name, business and e-mail for every
+profile from the MCP server at startup and then pulls only profiles updated
+(``profiles.updated_at``) since the newest one it has. Deleted profiles
+only drop out with the next full load. Lookups normalise the query ("Acme's owner" -> "acme",
+"U003" -> the same key as "U0000003") and combine:
+
+- exact matches on the user ID or its zero-stripped form,
+- prefix matches over a sorted key list (bisect), and
+- trigram similarity for typos, via an inverted trigram index. Candidates
+  come only from the query's rarest trigrams: a key reaching
+  ``MIN_SIMILARITY`` must share at least one of them (prefix filtering),
+  so common trigrams such as "u00" are never scanned. At most
+  ``MAX_CANDIDATES`` keys are scored, which bounds ID-like queries where
+  every trigram is common.
+
+A reference is only rewritten when the best match is confident and clearly
+ahead of the runner-up; otherwise the tool receives what the LLM produced.
+"""
+import bisect
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import metrics
+
+MIN_SCORE = 0.6
+MIN_MARGIN = 0.1
+# Trigram (Jaccard) similarity below this is not considered a match
+MIN_SIMILARITY = 0.5
+# Keys scored per lookup; bounds latency when every trigram is common
+MAX_CANDIDATES = 500
+# Prefix matches examined per lookup (short prefixes can match many keys)
+PREFIX_SCAN_LIMIT = 200
+
+STOP_WORDS = {
+    "the", "of", "user", "users", "owner", "account", "profile", "customer",
+    "for", "from", "at", "with", "named", "called", "id",
+}
+
+_POSSESSIVE_RE = re.compile(r"'s\b|’s\b")
+_NON_WORD_RE = re.compile(r"[^a-z0-9@.]+")
+_ID_RE = re.compile(r"^([a-z]+)([0-9oil]+)$")
+# Letters commonly typed for digits inside an ID
+_ID_DIGITS = str.maketrans("oil", "011")
+
+DIRECTORY_ENTRIES = metrics.REGISTRY.gauge("user_directory_entries", "Profiles in the user directory")
+DIRECTORY_LOOKUPS = metrics.REGISTRY.counter(
+    "user_directory_lookups_total", "User reference lookups by outcome", ["result"]
+)
+DIRECTORY_LOOKUP_SECONDS = metrics.REGISTRY.histogram(
+    "user_directory_lookup_seconds", "User reference lookup latency"
+)
+
+
+class UserEntry(NamedTuple):
+    user_id: str
+    user_name: str
+    business_name: str
+    email_id: str
+
+
+class Match(NamedTuple):
+    user_id: str
+    score: float
+    matched: str
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop possessives, punctuation and filler words"""
+    text = _POSSESSIVE_RE.sub("", (text or "").lower())
+    words = [w for w in _NON_WORD_RE.split(text) if w and w not in STOP_WORDS]
+    return " ".join(words)
+
+
+def id_key(user_id: str) -> Optional[str]:
+    """``U0000003``, ``u003``, ``U3`` and ``U000O003`` all map to ``u3``"""
+    match = _ID_RE.match(user_id.strip().lower())
+    if not match or not any(c.isdigit() for c in match.group(2)):
+        return None
+    return f"{match.group(1)}{int(match.group(2).translate(_ID_DIGITS))}"
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@lru_cache(maxsize=65536)
+def _key_trigrams(key: str) -> frozenset:
+    return frozenset(trigrams(key))
+
+
+def _keys_for(entry: UserEntry) -> List[str]:
+    keys = {entry.user_id.lower()}
+    for value in (entry.user_name, entry.business_name):
+        value = normalize(value)
+        if value:
+            keys.add(value)
+            keys.update(value.split())
+    if entry.email_id:
+        email = entry.email_id.lower()
+        keys.add(email)
+        keys.add(email.split("@")[0])
+    return [k for k in keys if k]
+
+
+class UserDirectory:
+    """Prefix and trigram index over profiles"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, UserEntry] = {}
+        self._by_id_key: Dict[str, str] = {}
+        self._key_users: Dict[str, Set[str]] = {}  # key -> user_ids
+        self._keys: List[str] = []  # sorted distinct keys, for prefix lookup
+        self._postings: Dict[str, Set[str]] = defaultdict(set)  # trigram -> keys
+        self.watermark: Optional[str] = None  # newest updated_at loaded
+        self.loaded_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._entries
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def get(self, user_id: str) -> Optional[UserEntry]:
+        return self._entries.get(user_id)
+
+    def _index(self, entry: UserEntry, bulk: bool = False):
+        self._entries[entry.user_id] = entry
+        key = id_key(entry.user_id)
+        if key:
+            self._by_id_key[key] = entry.user_id
+        for k in _keys_for(entry):
+            users = self._key_users.get(k)
+            if users is None:
+                users = self._key_users[k] = set()
+                if not bulk:
+                    bisect.insort(self._keys, k)  # bulk loads sort once at the end
+                for gram in trigrams(k):
+                    self._postings[gram].add(k)
+            users.add(entry.user_id)
+
+    def _unindex(self, entry: UserEntry):
+        for k in _keys_for(entry):
+            users = self._key_users.get(k)
+            if users is None:
+                continue
+            users.discard(entry.user_id)
+            if not users:
+                del self._key_users[k]
+                i = bisect.bisect_left(self._keys, k)
+                if i < len(self._keys) and self._keys[i] == k:
+                    del self._keys[i]
+                for gram in trigrams(k):
+                    self._postings[gram].discard(k)
+
+    def upsert(self, rows: Iterable[Sequence], bulk: bool = False) -> int:
+        """Add or update ``(user_id, user_name, business_name, email_id, updated_at)`` rows"""
+        changed = 0
+        with self._lock:
+            for row in rows:
+                entry = UserEntry(row[0], row[1] or "", row[2] or "", row[3] or "")
+                previous = self._entries.get(entry.user_id)
+                if previous == entry:
+                    continue
+                if previous is not None:
+                    self._unindex(previous)
+                self._index(entry, bulk=bulk)
+                changed += 1
+                if len(row) > 4 and row[4] and (self.watermark is None or str(row[4]) > self.watermark):
+                    self.watermark = str(row[4])
+            if bulk:
+                self._keys = sorted(self._key_users)
+            self.loaded_at = time.time()
+        DIRECTORY_ENTRIES.set(len(self._entries))
+        return changed
+
+    def replace_all(self, rows: Iterable[Sequence]) -> int:
+        """Rebuild from a full load, dropping profiles that no longer exist"""
+        fresh = UserDirectory()
+        fresh.upsert(rows, bulk=True)
+        with self._lock:
+            self._entries = fresh._entries
+            self._by_id_key = fresh._by_id_key
+            self._key_users = fresh._key_users
+            self._keys = fresh._keys
+            self._postings = fresh._postings
+            self.watermark = fresh.watermark
+            self.loaded_at = time.time()
+        DIRECTORY_ENTRIES.set(len(self._entries))
+        return len(self._entries)
+
+    def lookup(self, query: str, limit: int = 5) -> List[Match]:
+        """Best matches for a user ID, name, business or e-mail, highest score first"""
+        started = time.perf_counter()
+        scores: Dict[str, Match] = {}
+
+        def offer(k: str, score: float):
+            # A key shared by many users is ambiguous: ``limit`` of them show that
+            for user_id in islice(self._key_users.get(k, ()), limit):
+                current = scores.get(user_id)
+                if current is None or score > current.score:
+                    scores[user_id] = Match(user_id, round(score, 3), k)
+
+        raw = (query or "").strip()
+        with self._lock:
+            key = id_key(raw)
+            if raw in self._entries:
+                scores[raw] = Match(raw, 1.0, "user_id")
+                q = ""
+            elif key and key in self._by_id_key:
+                # The same ID with different zero padding is decisive
+                user_id = self._by_id_key[key]
+                scores[user_id] = Match(user_id, 0.95, "user_id")
+                q = ""
+            else:
+                q = normalize(raw)
+
+            if q:
+                i = bisect.bisect_left(self._keys, q)
+                end = min(i + PREFIX_SCAN_LIMIT, len(self._keys))
+                while i < end and self._keys[i].startswith(q):
+                    k = self._keys[i]
+                    offer(k, 1.0 if k == q else 0.7 + 0.25 * len(q) / len(k))
+                    i += 1
+
+                grams = trigrams(q)
+                needed = math.ceil(MIN_SIMILARITY * len(grams))
+                rarest = sorted(grams, key=lambda g: len(self._postings.get(g, ())))
+                candidates = set()
+                for gram in rarest[:len(grams) - needed + 1]:
+                    keys = self._postings.get(gram, ())
+                    room = MAX_CANDIDATES - len(candidates)
+                    if len(keys) > room:
+                        candidates.update(islice(keys, room))
+                        break
+                    candidates.update(keys)
+                for k in candidates:
+                    key_grams = _key_trigrams(k)
+                    count = len(grams & key_grams)
+                    similarity = count / (len(grams) + len(key_grams) - count)
+                    if similarity >= MIN_SIMILARITY:
+                        offer(k, 0.45 + 0.5 * similarity)
+
+        matches = sorted(scores.values(), key=lambda m: m.score, reverse=True)[:limit]
+        DIRECTORY_LOOKUP_SECONDS.observe(time.perf_counter() - started)
+        return matches
+
+    def resolve(self, query: str, min_score: float = MIN_SCORE, min_margin: float = MIN_MARGIN) -> Optional[str]:
+        """The user ID ``query`` confidently refers to, or None"""
+        if query in self._entries:
+            DIRECTORY_LOOKUPS.inc(result="exact")
+            return query
+        matches = self.lookup(query, limit=2)
+        if matches and matches[0].score >= min_score and (
+            len(matches) == 1 or matches[0].score - matches[1].score >= min_margin
+        ):
+            DIRECTORY_LOOKUPS.inc(result="resolved")
+            return matches[0].user_id
+        DIRECTORY_LOOKUPS.inc(result="ambiguous" if matches else "unresolved")
+        return None
+
+    def describe(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "keys": len(self._key_users),
+            "trigrams": len(self._postings),
+            "watermark": self.watermark,
+            "loaded_at": self.loaded_at,
+        }